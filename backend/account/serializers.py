@@ -19,10 +19,14 @@ class OptionModulesPairSerializer(serializers.ModelSerializer):
         return ModuleSerializer([obj.module_a, obj.module_b], many=True).data
 
     def get_selected_module(self, obj):
+        # listings pass every selection of the student as {pair_number: module_id}
+        if 'selections' in self.context:
+            return self.context['selections'].get(obj.pair_number)
+
         user = self.context['request'].user
         data = OptionalModule.objects.filter(
             student=user,
             pair_number=obj.pair_number
         ).first()
-        return str(data.selected_module.id) if data else None
+        return str(data.selected_module_id) if data else None
 
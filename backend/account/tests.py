@@ -1,3 +1,80 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from module.models import Module, OptionModulesPair
+
+from .models import OptionalModule
+
+User = get_user_model()
+
+
+class OptionalModulesTest(TestCase):
+    url = '/student/optional-module/'
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(email='student@example.com', password='pass', is_active=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.pairs = []
+        for number in (1, 2, 3):
+            self.pairs.append(OptionModulesPair.objects.create(
+                module_a=Module.objects.create(module_name=f'A{number}'),
+                module_b=Module.objects.create(module_name=f'B{number}'),
+                pair_number=number,
+            ))
+
+    def select(self, *selections):
+        return self.client.patch(self.url, {'selections': [
+            {'pair_number': pair_number, 'selected_module': str(module_id)}
+            for pair_number, module_id in selections
+        ]}, format='json')
+
+    def selected(self):
+        return dict(OptionalModule.objects.filter(student=self.user).values_list('pair_number', 'selected_module_id'))
+
+    def test_upsert_replaces_existing_selection(self):
+        first, second = self.pairs[:2]
+        self.assertEqual(self.select((1, first.module_a_id), (2, second.module_a_id)).status_code, 200)
+        self.assertEqual(self.select((1, first.module_b_id)).status_code, 200)
+
+        self.assertEqual(self.selected(), {1: first.module_b_id, 2: second.module_a_id})
+        self.assertEqual(OptionalModule.objects.filter(student=self.user).count(), 2)
+
+    def test_invalid_selections_change_nothing(self):
+        first = self.pairs[0]
+        self.select((1, first.module_a_id))
+
+        for selections, errors in (
+            ([(1, uuid.uuid4())], {'1': 'Module is not part of this pair'}),
+            ([(1, self.pairs[1].module_a_id)], {'1': 'Module is not part of this pair'}),
+            ([(9, first.module_b_id)], {'9': 'Unknown pair'}),
+        ):
+            response = self.select(*selections)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['errors'], errors)
+
+        response = self.select((1, 'not-a-uuid'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.selected(), {1: first.module_a_id})
+
+    def test_listing_queries(self):
+        self.select((2, self.pairs[1].module_b_id))
+        # the student's selections, then the pairs with both modules
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [pair['selected_module'] for pair in response.json()],
+            [None, str(self.pairs[1].module_b_id), None],
+        )
 
-# Create your tests here.
+        # the pairs are served from the cache afterwards
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
@@ -3,6 +3,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 
+from django.db import transaction
+
+from module import catalogue
 from module.models import (
     OptionModulesPair,
     Module,
@@ -11,15 +14,28 @@ from module.models import (
 from .models import OptionalModule
 from .serializers import OptionModulesPairSerializer, ModuleSerializer
 
+import uuid
+
 class OptionalModulesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        data = OptionModulesPair.objects.all().order_by('pair_number')
-        serializer = OptionModulesPairSerializer(
-            data, many=True, context={'request': request}
-        )
-        return Response(serializer.data)
+        selections = {
+            pair_number: str(module_id)
+            for pair_number, module_id in OptionalModule.objects.filter(
+                student=request.user
+            ).values_list('pair_number', 'selected_module_id')
+        }
+        # the pairs are catalogue data, only the selections are per student
+        etag = catalogue.etag_for(request, [catalogue.CATALOGUE], variant=sorted(selections.items()))
+
+        def build():
+            data = OptionModulesPair.objects.select_related('module_a', 'module_b').order_by('pair_number')
+            return OptionModulesPairSerializer(
+                data, many=True, context={'request': request, 'selections': selections}
+            ).data
+
+        return catalogue.cached_response(request, etag, build)
 
     def patch(self, request):
         user = request.user
@@ -31,14 +47,45 @@ class OptionalModulesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # last selection wins if a pair is sent twice
+        chosen = {}
         for item in selections:
-            pair_number = item['pair_number']
-            module_id = item['selected_module']
+            try:
+                chosen[int(item['pair_number'])] = str(uuid.UUID(str(item['selected_module'])))
+            except (KeyError, TypeError, ValueError):
+                return Response(
+                    {"detail": "Each selection needs a pair_number and a selected_module id"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        pairs = {
+            pair_number: (str(module_a_id), str(module_b_id))
+            for pair_number, module_a_id, module_b_id in OptionModulesPair.objects.filter(
+                pair_number__in=chosen
+            ).values_list('pair_number', 'module_a_id', 'module_b_id')
+        }
+
+        errors = {}
+        for pair_number, module_id in chosen.items():
+            if pair_number not in pairs:
+                errors[pair_number] = "Unknown pair"
+            elif module_id not in pairs[pair_number]:
+                errors[pair_number] = "Module is not part of this pair"
+        if errors:
+            return Response(
+                {"detail": "Invalid selections", "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            OptionalModule.objects.update_or_create(
-                student=user,
-                pair_number=pair_number,
-                defaults={"selected_module_id": module_id}
+        with transaction.atomic():
+            OptionalModule.objects.bulk_create(
+                [
+                    OptionalModule(student=user, pair_number=pair_number, selected_module_id=module_id)
+                    for pair_number, module_id in chosen.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['student', 'pair_number'],
+                update_fields=['selected_module'],
             )
 
         return Response(
@@ -0,0 +1,120 @@
+import csv
+import io
+import time
+
+from django.db import transaction
+from django.db.models import Max
+
+from module import decks, stats
+from module.models import Module, Questions
+
+REQUIRED_COLUMNS = ("question", "correct_answer")
+TEXT_COLUMNS = {
+    "question": "question_text",
+    "option1": "option1",
+    "option2": "option2",
+    "option3": "option3",
+    "option4": "option4",
+}
+CORRECT_ANSWERS = {choice.value for choice in Questions.AnswerChoice}
+
+
+class CSVImportError(Exception):
+    pass
+
+
+class QuestionCSVImporter:
+    """Stream a questions CSV into a module with batched bulk inserts
+
+    Rows are parsed one at a time from the binary file, validated, given an
+    ``order`` continuing from the module's current maximum and inserted in
+    batches. Invalid rows are reported and skipped, the rest are imported.
+    """
+
+    def __init__(self, module, batch_size=1000, max_errors=100, on_progress=None):
+        self.module = module
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.on_progress = on_progress
+
+        self.parsed = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, fileobj):
+        started = time.perf_counter()
+        reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+
+        missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise CSVImportError(f"Missing columns: {', '.join(missing)}")
+
+        with transaction.atomic():
+            # lock the module so concurrent imports/creates cannot take the same orders
+            Module.objects.select_for_update().filter(pk=self.module.pk).first()
+            last_order = Questions.objects.filter(module=self.module).aggregate(
+                Max("order")
+            )["order__max"] or 0
+
+            batch = []
+            # header is line 1, so data rows start at 2
+            for line, row in enumerate(reader, start=2):
+                question = self.build_question(line, row, last_order + len(batch) + 1)
+                if question is None:
+                    continue
+
+                batch.append(question)
+                if len(batch) >= self.batch_size:
+                    last_order = self.flush(batch, last_order)
+                    batch = []
+
+            self.flush(batch, last_order)
+            # bulk_create skips the post_save signal that counts single questions
+            stats.record_questions(self.module.id, self.inserted)
+
+        decks.invalidate(self.module.id)
+
+        seconds = time.perf_counter() - started
+        return {
+            "rows": self.parsed,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "seconds": round(seconds, 3),
+            "rows_per_second": int(self.inserted / seconds) if seconds else self.inserted,
+        }
+
+    def build_question(self, line, row, order):
+        # Skip empty rows
+        if not (row.get("question") or "").strip():
+            return None
+
+        self.parsed += 1
+
+        correct = (row.get("correct_answer") or "").strip()
+        if correct not in CORRECT_ANSWERS:
+            return self.reject(line, f"Invalid correct_answer: {correct}")
+
+        values = {}
+        for column, field in TEXT_COLUMNS.items():
+            value = (row.get(column) or "").strip()
+            if len(value) > Questions._meta.get_field(field).max_length:
+                return self.reject(line, f"{column} is longer than 255 characters")
+            values[field] = value
+
+        return Questions(module=self.module, correct_answer=correct, order=order, **values)
+
+    def reject(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": line, "error": message})
+        return None
+
+    def flush(self, batch, last_order):
+        if batch:
+            Questions.objects.bulk_create(batch)
+            self.inserted += len(batch)
+            if self.on_progress:
+                self.on_progress(self)
+        return last_order + len(batch)
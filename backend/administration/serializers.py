@@ -4,6 +4,8 @@ from django.db.models.functions import Coalesce
 
 from rest_framework import serializers
 
+from .tasks import get_progress
+
 from module.models import (
     CustomTime,
     Module,
@@ -11,7 +13,7 @@ from module.models import (
     OptionModulesPair,
 )
 
-from .models import SynopticModule
+from .models import SynopticModule, ImportJob
 
 User = get_user_model()
 
@@ -190,3 +192,32 @@ class SynopticModuleSerializer(serializers.ModelSerializer):
         synoptic_module = SynopticModule.objects.create()
         synoptic_module.modules.set(Module.objects.filter(id__in=module_ids))
         return synoptic_module
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    module_name = serializers.CharField(source='module.module_name', read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            'id',
+            'module',
+            'module_name',
+            'status',
+            'rows_parsed',
+            'rows_inserted',
+            'rows_failed',
+            'errors',
+            'message',
+            'created_at',
+            'started_at',
+            'finished_at',
+        )
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.status == ImportJob.Status.RUNNING:
+            # live counters published by the worker while the import runs
+            data.update(get_progress(instance.id) or {})
+        return data
@@ -0,0 +1,64 @@
+from celery import shared_task
+from django.core.cache import caches
+from django.utils import timezone
+
+import logging
+
+from core.cache import STATS
+
+from .importers import QuestionCSVImporter
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# The import runs in a single transaction, so live counters are published
+# to the cache (visible to the status endpoint at once) rather than the row.
+PROGRESS_KEY = "import_job_progress:{job_id}"
+
+
+def get_progress(job_id):
+    return caches[STATS].get(PROGRESS_KEY.format(job_id=job_id))
+
+
+@shared_task
+def run_question_import(job_id):
+    job = ImportJob.objects.select_related('module').get(id=job_id)
+    job.status = ImportJob.Status.RUNNING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    progress_key = PROGRESS_KEY.format(job_id=job_id)
+
+    def publish(importer):
+        caches[STATS].set(progress_key, {
+            'rows_parsed': importer.parsed,
+            'rows_inserted': importer.inserted,
+            'rows_failed': importer.failed,
+        }, timeout=60 * 60)
+
+    importer = QuestionCSVImporter(job.module, on_progress=publish)
+    try:
+        with job.file.open('rb') as fileobj:
+            result = importer.run(fileobj)
+    except Exception as exc:
+        logger.error(f"Question import {job_id} failed: {exc}")
+        job.status = ImportJob.Status.FAILED
+        job.message = str(exc)
+        job.rows_parsed = job.rows_inserted = 0
+        job.rows_failed = importer.failed
+        job.errors = importer.errors
+    else:
+        logger.info(f"Question import {job_id} inserted {result['inserted']} rows in {result['seconds']}s")
+        job.status = ImportJob.Status.COMPLETED
+        job.message = f"{result['inserted']} questions imported ({result['rows_per_second']} rows/s)"
+        job.rows_parsed = result['rows']
+        job.rows_inserted = result['inserted']
+        job.rows_failed = result['failed']
+        job.errors = result['errors']
+
+    job.finished_at = timezone.now()
+    job.save()
+    caches[STATS].delete(progress_key)
+
+    # the upload is no longer needed once its rows are in the database
+    job.file.delete(save=True)
@@ -1,3 +1,365 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date, datetime
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.cache import STATS
+from module import decks
+from module.models import Module, ModuleStats, Questions, QuizAttend, QuizAttendDaily
+from student import reviews
+from student.models import StudentStats
+
+from .importers import QuestionCSVImporter
+from .models import ImportJob
+from .tasks import PROGRESS_KEY, get_progress, run_question_import
+from .timeseries import _bucket_key, accuracy_series, bucket_starts
+
+User = get_user_model()
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class BucketStartsTest(SimpleTestCase):
+    def test_months_roll_over_the_year(self):
+        self.assertEqual(
+            bucket_starts('month', 3, now=aware(2026, 1, 31, 23, 30)),
+            [aware(2025, 11, 1), aware(2025, 12, 1), aware(2026, 1, 1)],
+        )
+
+    def test_months_from_the_31st(self):
+        # stepping back whole months, not 30-day periods, never skips February
+        self.assertEqual(
+            bucket_starts('month', 3, now=aware(2026, 3, 31, 12)),
+            [aware(2026, 1, 1), aware(2026, 2, 1), aware(2026, 3, 1)],
+        )
+        self.assertEqual(len(bucket_starts('month', 12, now=aware(2026, 12, 31))), 12)
+        self.assertEqual(bucket_starts('month', 12, now=aware(2026, 12, 31))[0], aware(2026, 1, 1))
+
+    def test_days_and_hours(self):
+        self.assertEqual(
+            bucket_starts('day', 2, now=aware(2026, 1, 1, 0, 15)),
+            [aware(2025, 12, 31), aware(2026, 1, 1)],
+        )
+        self.assertEqual(
+            bucket_starts('hour', 3, now=aware(2026, 1, 1, 1, 45)),
+            [aware(2025, 12, 31, 23), aware(2026, 1, 1, 0), aware(2026, 1, 1, 1)],
+        )
+
+    def test_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            bucket_starts('week', 4)
+
+    def test_bucket_keys(self):
+        moment = aware(2026, 2, 3, 14, 5)
+        self.assertEqual(_bucket_key(moment, 'hour'), (2026, 2, 3, 14))
+        self.assertEqual(_bucket_key(moment, 'day'), (2026, 2, 3))
+        self.assertEqual(_bucket_key(moment, 'month'), (2026, 2))
+        # DateField buckets match the datetime bucket starts
+        self.assertEqual(_bucket_key(date(2026, 2, 3), 'day'), _bucket_key(aware(2026, 2, 3), 'day'))
+        self.assertEqual(_bucket_key(date(2026, 2, 1), 'month'), (2026, 2))
+
+
+class AccuracySeriesTest(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(email='student@example.com', password='pass', is_active=True)
+        self.module = Module.objects.create(module_name='Algebra')
+
+    def attempt(self, created_at, correct, attempted):
+        quiz = QuizAttend.objects.create(
+            student=self.student, module=self.module, total_questions=attempted,
+            attempted_questions=attempted, correct_answers=correct,
+        )
+        QuizAttend.objects.filter(id=quiz.id).update(created_at=created_at)
+
+    def test_months_are_zero_filled(self):
+        self.attempt(aware(2025, 11, 30, 23, 59), 1, 4)
+        self.attempt(aware(2026, 1, 1), 3, 4)
+        self.attempt(aware(2026, 1, 31, 12), 1, 4)
+        # before the first bucket
+        self.attempt(aware(2025, 10, 31, 23, 59), 4, 4)
+
+        self.assertEqual(
+            accuracy_series(QuizAttend.objects.all(), 'month', 3, now=aware(2026, 1, 31, 13)),
+            [(aware(2025, 11, 1), 250), (aware(2025, 12, 1), 0), (aware(2026, 1, 1), 500)],
+        )
+
+    def test_hours(self):
+        self.attempt(aware(2025, 12, 31, 23, 10), 1, 2)
+        self.attempt(aware(2026, 1, 1, 1, 0), 2, 2)
+        self.assertEqual(
+            accuracy_series(QuizAttend.objects.all(), 'hour', 3, now=aware(2026, 1, 1, 1, 30), scale=100),
+            [(aware(2025, 12, 31, 23), 50), (aware(2026, 1, 1, 0), 0), (aware(2026, 1, 1, 1), 100)],
+        )
+
+    def test_days_from_rollups(self):
+        for day, correct in ((date(2025, 12, 30), 1), (date(2026, 1, 1), 3)):
+            QuizAttendDaily.objects.create(
+                day=day, module=self.module, student=self.student,
+                attempted_questions=4, correct_answers=correct,
+            )
+        self.assertEqual(
+            accuracy_series(QuizAttendDaily.objects.all(), 'day', 3, now=aware(2026, 1, 1, 8), date_field='day'),
+            [(aware(2025, 12, 30), 250), (aware(2025, 12, 31), 0), (aware(2026, 1, 1), 750)],
+        )
+
+
+class DashboardSubjectsTest(TestCase):
+    """Placeholder modules never show up as subjects"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', is_active=True, is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.module = Module.objects.create(module_name='Algebra')
+        self.placeholder = reviews.review_module()
+
+    def test_admin_dashboard(self):
+        body = self.client.get('/admin-api/dashboard/').json()
+        self.assertEqual([subject['subject'] for subject in body['subject_performance']], ['Algebra'])
+        self.assertEqual(body['quiz_stats']['total_subjects'], 1)
+
+    def test_student_dashboard(self):
+        QuizAttend.objects.create(
+            student=self.admin, module=self.placeholder, total_questions=4,
+            attempted_questions=4, correct_answers=2,
+        )
+        body = self.client.get('/admin-api/student-detail/', {'user_id': str(self.admin.id)}).json()
+        self.assertEqual([subject['subject'] for subject in body['subject_performance']], ['Algebra'])
+
+
+class KeysetPagingTest(TestCase):
+    """Cursor pages never skip or repeat rows with tied sort keys"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', is_active=True, is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.module = Module.objects.create(module_name='Algebra')
+
+        self.xp = {str(self.admin.id): 0}
+        for i, xp in enumerate([30, 30, 30, 10, 10, None]):
+            student = User.objects.create_user(email=f'student{i}@example.com', password='pass', is_active=True)
+            if xp is not None:
+                StudentStats.objects.create(student=student, total_xp=xp, attempt_count=1)
+                QuizAttendDaily.objects.create(
+                    day=timezone.localdate(), module=self.module, student=student, attempts=1, xp_gained=xp,
+                )
+            self.xp[str(student.id)] = xp or 0
+
+    def walk(self, url, params):
+        seen, response = [], self.client.get(url, {**params, 'pagination': 'cursor', 'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertLessEqual(len(body['results']), 2)
+            seen.extend(body['results'])
+            if not body['next']:
+                return seen
+            response = self.client.get(body['next'])
+
+    def test_students_by_stored_xp(self):
+        expected = sorted(self.xp, key=lambda user_id: (self.xp[user_id], user_id), reverse=True)
+        for params in ({}, {'duration': 'weekly'}):
+            students = self.walk('/admin-api/student-list/', params)
+            self.assertEqual([student['id'] for student in students], expected)
+            self.assertEqual([student['xp'] for student in students], [self.xp[user_id] for user_id in expected])
+        self.assertEqual(students[0]['active_subjects'], 1)
+
+    def test_questions_with_search(self):
+        for i in range(5):
+            Questions.objects.create(
+                module=self.module, question_text=f"river {i}",
+                option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+            )
+        questions = self.walk('/admin-api/questions/', {'module': str(self.module.id), 'search': 'option1'})
+        self.assertEqual([question['question_text'] for question in questions], [f"river {i}" for i in range(5)])
+
+        response = self.client.get('/admin-api/questions/', {
+            'module': str(self.module.id), 'search': 'river', 'pagination': 'cursor',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.json())
+
+
+def csv_file(*rows, header='question,option1,option2,option3,option4,correct_answer'):
+    return io.BytesIO('\n'.join((header, *rows)).encode())
+
+
+class QuestionCSVImportTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', is_active=True, is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.module = Module.objects.create(module_name='Algebra')
+        for i in range(2):
+            Questions.objects.create(
+                module=self.module, question_text=f"existing {i}",
+                option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+            )
+
+    def test_rows_are_reported_and_skipped(self):
+        result = QuestionCSVImporter(self.module).run(csv_file(
+            'one,a,b,c,d,option1',
+            'two,a,b,c,d,option5',
+            ',,,,,',
+            f"{'x' * 256},a,b,c,d,option2",
+            'three,a,b,c,d,option3',
+        ))
+        self.assertEqual((result['rows'], result['inserted'], result['failed']), (4, 2, 2))
+        # line numbers count the header, blank rows are skipped without an error
+        self.assertEqual(result['errors'], [
+            {'row': 3, 'error': 'Invalid correct_answer: option5'},
+            {'row': 5, 'error': 'question is longer than 255 characters'},
+        ])
+
+    def test_orders_follow_existing_questions(self):
+        QuestionCSVImporter(self.module).run(csv_file('one,a,b,c,d,option1', 'bad,a,b,c,d,', 'two,a,b,c,d,option2'))
+        self.assertEqual(
+            list(Questions.objects.filter(module=self.module).order_by('order').values_list('question_text', 'order')),
+            [('existing 0', 1), ('existing 1', 2), ('one', 3), ('two', 4)],
+        )
+
+    def test_rows_are_inserted_in_batches(self):
+        progress = []
+        importer = QuestionCSVImporter(
+            self.module, batch_size=2, on_progress=lambda importer: progress.append(importer.inserted),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = importer.run(csv_file(*(f"q{i},a,b,c,d,option1" for i in range(5))))
+
+        self.assertEqual(result['inserted'], 5)
+        self.assertEqual(progress, [2, 4, 5])
+        table = Questions._meta.db_table
+        inserts = [query for query in queries if query['sql'].startswith(f'INSERT INTO "{table}"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_upload_updates_stats_and_deck(self):
+        version = decks.content_version(self.module.id)
+        upload = csv_file('one,a,b,c,d,option1', 'two,a,b,c,d,option2')
+        upload.name = 'questions.csv'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/admin-api/upload-csv/{self.module.id}/', {'file': upload})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['inserted'], 2)
+        self.assertEqual(ModuleStats.objects.get(module=self.module).question_count, 4)
+        self.assertNotEqual(decks.content_version(self.module.id), version)
+
+    def test_upload_rejects_missing_columns(self):
+        upload = csv_file('one,option1', header='question,answer')
+        upload.name = 'questions.csv'
+        response = self.client.post(f'/admin-api/upload-csv/{self.module.id}/', {'file': upload})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Missing columns: correct_answer'})
+
+
+class ImportJobTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage = override_settings(MEDIA_ROOT=media_root)
+        storage.enable()
+        self.addCleanup(storage.disable)
+
+        self.admin = User.objects.create_user(
+            email='admin@example.com', password='pass', is_active=True, is_staff=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.module = Module.objects.create(module_name='Algebra')
+
+    def upload(self, *rows, **kwargs):
+        upload = csv_file(*rows, **kwargs)
+        upload.name = 'questions.csv'
+        # the task is queued on commit, and run by hand below
+        response = self.client.post(f'/admin-api/upload-csv/{self.module.id}/background/', {'file': upload})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], ImportJob.Status.PENDING)
+        return ImportJob.objects.get(id=response.json()['id'])
+
+    def status(self, job):
+        response = self.client.get(f'/admin-api/import-jobs/{job.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_lifecycle(self):
+        job = self.upload(*(f"q{i},a,b,c,d,option1" for i in range(3)), 'bad,a,b,c,d,option9')
+        seen = []
+        flush = QuestionCSVImporter.flush
+
+        def flush_and_look(importer, batch, last_order):
+            last_order = flush(importer, batch, last_order)
+            seen.append(self.status(job))
+            return last_order
+
+        with mock.patch.object(QuestionCSVImporter, 'flush', flush_and_look):
+            run_question_import(str(job.id))
+
+        # while running, the status shows the counters the worker publishes
+        self.assertEqual(seen[0]['status'], ImportJob.Status.RUNNING)
+        self.assertEqual(
+            (seen[0]['rows_parsed'], seen[0]['rows_inserted'], seen[0]['rows_failed']), (4, 3, 1)
+        )
+
+        body = self.status(job)
+        self.assertEqual(body['status'], ImportJob.Status.COMPLETED)
+        self.assertEqual((body['rows_parsed'], body['rows_inserted'], body['rows_failed']), (4, 3, 1))
+        self.assertEqual(body['errors'], [{'row': 5, 'error': 'Invalid correct_answer: option9'}])
+        self.assertIsNotNone(body['finished_at'])
+        self.assertIsNone(get_progress(job.id))
+        job.refresh_from_db()
+        self.assertFalse(job.file)
+        self.assertEqual(Questions.objects.filter(module=self.module).count(), 3)
+
+    def test_progress_only_merged_while_running(self):
+        job = ImportJob.objects.create(module=self.module, status=ImportJob.Status.RUNNING)
+        caches[STATS].set(PROGRESS_KEY.format(job_id=job.id), {'rows_parsed': 7, 'rows_inserted': 5, 'rows_failed': 2})
+        self.assertEqual(
+            {field: self.status(job)[field] for field in ('rows_parsed', 'rows_inserted', 'rows_failed')},
+            {'rows_parsed': 7, 'rows_inserted': 5, 'rows_failed': 2},
+        )
+
+        ImportJob.objects.filter(id=job.id).update(status=ImportJob.Status.COMPLETED, rows_inserted=6)
+        self.assertEqual(self.status(job)['rows_inserted'], 6)
+
+    def test_failed_import(self):
+        job = self.upload('one,option1', header='question,answer')
+        with self.assertLogs('administration.tasks', 'ERROR'):
+            run_question_import(str(job.id))
+
+        body = self.status(job)
+        self.assertEqual(body['status'], ImportJob.Status.FAILED)
+        self.assertEqual(body['message'], 'Missing columns: correct_answer')
+        self.assertEqual((body['rows_parsed'], body['rows_inserted']), (0, 0))
+        self.assertFalse(Questions.objects.filter(module=self.module).exists())
+
+    def test_every_row_rejected(self):
+        job = self.upload('one,a,b,c,d,', 'two,a,b,c,d,option0')
+        run_question_import(str(job.id))
+
+        body = self.status(job)
+        self.assertEqual(body['status'], ImportJob.Status.COMPLETED)
+        self.assertEqual((body['rows_parsed'], body['rows_inserted'], body['rows_failed']), (2, 0, 2))
+        self.assertEqual([error['row'] for error in body['errors']], [2, 3])
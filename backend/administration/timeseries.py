@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMonth
+from django.utils import timezone
+
+TRUNC = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'month': TruncMonth,
+}
+
+
+def bucket_starts(granularity, count, now=None):
+    """Start of the last ``count`` buckets, oldest first, the last one containing ``now``"""
+    now = timezone.localtime(now or timezone.now())
+
+    if granularity == 'hour':
+        current = now.replace(minute=0, second=0, microsecond=0)
+        return [current - timedelta(hours=i) for i in range(count - 1, -1, -1)]
+
+    if granularity == 'day':
+        today = now.date()
+        return [
+            timezone.make_aware(datetime.combine(today - timedelta(days=i), datetime.min.time()))
+            for i in range(count - 1, -1, -1)
+        ]
+
+    if granularity == 'month':
+        starts = []
+        for i in range(count - 1, -1, -1):
+            # whole calendar months back from the current one
+            year, month = divmod(now.year * 12 + now.month - 1 - i, 12)
+            starts.append(timezone.make_aware(datetime(year, month + 1, 1)))
+        return starts
+
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def _bucket_key(value, granularity):
+    # Trunc* yields aware datetimes for DateTimeFields and dates for DateFields
+    if isinstance(value, datetime):
+        value = timezone.localtime(value)
+        hour = value.hour
+    else:
+        hour = 0
+
+    if granularity == 'hour':
+        return (value.year, value.month, value.day, hour)
+    if granularity == 'day':
+        return (value.year, value.month, value.day)
+    return (value.year, value.month)
+
+
+def accuracy_series(
+    queryset,
+    granularity,
+    count,
+    now=None,
+    date_field='created_at',
+    correct_field='correct_answers',
+    attempted_field='attempted_questions',
+    scale=1000,
+):
+    """Accuracy per bucket as ``[(bucket_start, value), ...]`` from one GROUP BY query
+
+    ``value`` is correct / attempted scaled by ``scale`` (0 for empty buckets).
+    """
+    starts = bucket_starts(granularity, count, now)
+
+    rows = (
+        queryset
+        .filter(**{f'{date_field}__gte': starts[0]})
+        .annotate(bucket=TRUNC[granularity](date_field))
+        .values('bucket')
+        .annotate(correct=Sum(correct_field), attempted=Sum(attempted_field))
+        .order_by()
+    )
+    totals = {
+        _bucket_key(row['bucket'], granularity): (row['correct'] or 0, row['attempted'] or 0)
+        for row in rows
+    }
+
+    series = []
+    for start in starts:
+        correct, attempted = totals.get(_bucket_key(start, granularity), (0, 0))
+        value = int(correct / attempted * scale) if attempted else 0
+        series.append((start, value))
+    return series
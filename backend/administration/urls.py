@@ -19,6 +19,7 @@ from .views import (
     UnblockUserView,
 
     AdminDashboardView,
+    CacheStatsView,
 
     ModuleStatsView,
     ModuleUpdateView,
@@ -30,6 +31,9 @@ from .views import (
 
     DownloadDemoCSVView,
     UploadQuestionsCSVView,
+    UploadQuestionsCSVJobView,
+    ImportJobListView,
+    ImportJobDetailView,
 
     CreateSynopticModuleView,
 )
@@ -65,6 +69,10 @@ urlpatterns = [
 
     path('demo-csv/', DownloadDemoCSVView.as_view(), name='Demo CSV'),
     path('upload-csv/<uuid:module_id>/', UploadQuestionsCSVView.as_view(), name='Upload CSV'),
+    path('upload-csv/<uuid:module_id>/background/', UploadQuestionsCSVJobView.as_view(), name='Upload CSV Background'),
+    path('import-jobs/', ImportJobListView.as_view(), name='Import Jobs'),
+    path('import-jobs/<uuid:id>/', ImportJobDetailView.as_view(), name='Import Job'),
 
     path('dashboard/', AdminDashboardView.as_view(), name='Block User'),
+    path('cache-stats/', CacheStatsView.as_view(), name='Cache Stats'),
 ]
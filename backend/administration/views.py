@@ -4,7 +4,7 @@ from rest_framework import permissions, status, generics
 from rest_framework.exceptions import ValidationError
 
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum, Q, Value, IntegerField, Avg, FloatField, Max, ExpressionWrapper, F
+from django.db.models import Count, Sum, Q, Value, IntegerField, Avg, FloatField, Max, ExpressionWrapper, F, OuterRef, Subquery
 from django.db.models.functions import Coalesce, ExtractMonth
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -18,6 +18,7 @@ from calendar import month_abbr
 from module.models import (
     CustomTime,
     QuizAttend,
+    QuizAttendDaily,
     Module,
     Questions,
     OptionModulesPair,
@@ -39,12 +40,22 @@ from .serializers import (
     OptionModulesPairSerializer,
 
     SynopticModuleSerializer,
+
+    ImportJobSerializer,
 )
 
-from .models import SynopticModule
+from core import cache
+from core.pagination import KeysetPaginationMixin
+from module.catalogue import CatalogueCacheMixin
+from student import leaderboard
+from student.stats import get_student_stats
+
+from .importers import QuestionCSVImporter, CSVImportError
+from .models import SynopticModule, ImportJob
+from .tasks import run_question_import
+from .timeseries import accuracy_series
 
 import os
-import csv
 
 User = get_user_model()
 
@@ -67,7 +78,7 @@ class ChangePasswordView(APIView):
 
 # quiz duration views
 
-class CustomTimeListView(generics.ListCreateAPIView):
+class CustomTimeListView(CatalogueCacheMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     serializer_class = CustomTimeSerializer
 
@@ -82,9 +93,19 @@ class CustomTimeView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # student management views
-class StudentManageListView(generics.ListAPIView):
+class StudentManageListView(KeysetPaginationMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAdminUser]
     serializer_class = StudentManageSerializer
+    order_fields = {
+        'xp': '-xp',
+        'quiz_attempts': '-quiz_attempts',
+        'active_subjects': '-active_subjects'
+    }
+
+    def get_keyset_ordering(self):
+        # id breaks ties so the cursor position is unique
+        order_by = self.request.query_params.get('order_by')
+        return (self.order_fields.get(order_by, '-xp'), '-id')
 
     def get_queryset(self):
         qs = User.objects.all()
@@ -109,43 +130,46 @@ class StudentManageListView(generics.ListAPIView):
             else:  # yearly
                 start_date = now - timedelta(days=365)
 
-            count_filter = Q(quizattend__created_at__gte=start_date)
-            sum_filter = Q(quizattend__created_at__gte=start_date)
-            module_filter = Q(quizattend__created_at__gte=start_date)
+            # daily rollup rows, so windows start at the beginning of a day
+            rollup_filter = Q(quiz_daily_rollups__day__gte=timezone.localdate(start_date))
+
+            # Annotate with coalesced values so nulls become 0
+            qs = qs.annotate(
+                quiz_attempts=Coalesce(
+                    Sum('quiz_daily_rollups__attempts', filter=rollup_filter),
+                    Value(0),
+                    output_field=IntegerField()
+                ),
+                xp=Coalesce(
+                    Sum('quiz_daily_rollups__xp_gained', filter=rollup_filter),
+                    Value(0),
+                    output_field=IntegerField()
+                ),
+                active_subjects=Coalesce(
+                    Count('quiz_daily_rollups__module', filter=rollup_filter, distinct=True),
+                    Value(0),
+                    output_field=IntegerField()
+                ),
+            )
         else:
-            # all-time (no time filter)
-            count_filter = Q()
-            sum_filter = Q()
-            module_filter = Q()
-
-        # Annotate with coalesced values so nulls become 0
-        qs = qs.annotate(
-            quiz_attempts=Coalesce(
-                Count('quizattend', filter=count_filter, distinct=True),
-                Value(0),
-                output_field=IntegerField()
-            ),
-            xp=Coalesce(
-                Sum('quizattend__xp_gained', filter=sum_filter),
-                Value(0),
-                output_field=IntegerField()
-            ),
-            active_subjects=Coalesce(
-                Count('quizattend__module', filter=module_filter, distinct=True),
-                Value(0),
-                output_field=IntegerField()
-            ),
-        )
+            # all-time totals are stored on StudentStats, so pages seek on
+            # plain columns and only the students shown count their subjects
+            subjects = (
+                QuizAttendDaily.objects.filter(student=OuterRef('pk'))
+                .order_by()
+                .values('student')
+                .annotate(count=Count('module', distinct=True))
+                .values('count')
+            )
+            qs = qs.annotate(
+                quiz_attempts=Coalesce(F('stats__attempt_count'), Value(0), output_field=IntegerField()),
+                xp=Coalesce(F('stats__total_xp'), Value(0), output_field=IntegerField()),
+                active_subjects=Coalesce(Subquery(subjects), Value(0), output_field=IntegerField()),
+            )
 
         # Allowed order fields map -> annotated names (descending)
-        allowed = {
-            'xp': '-xp',
-            'quiz_attempts': '-quiz_attempts',
-            'active_subjects': '-active_subjects'
-        }
-
-        if order_by in allowed:
-            qs = qs.order_by(allowed[order_by])
+        if order_by in self.order_fields:
+            qs = qs.order_by(self.order_fields[order_by])
         else:
             qs = qs.order_by('-xp')  # top XP by default
 
@@ -234,16 +258,10 @@ class StudentDashboardView(APIView):
     def get_profile_data(self, user):
         """Get user profile including XP and rank"""
         # Get total XP
-        total_xp = QuizAttend.objects.filter(student=user).aggregate(
-            total_xp=Sum('xp_gained')
-        )['total_xp'] or 0
+        total_xp = get_student_stats(user).total_xp
         
         # Calculate rank (users with more XP + 1)
-        users_with_more_xp = QuizAttend.objects.values('student').annotate(
-            student_xp=Sum('xp_gained')
-        ).filter(student_xp__gt=total_xp).count()
-        
-        rank = users_with_more_xp + 1
+        rank = leaderboard.read(lambda board: board.rank_for_score(total_xp))
         
         return {
             'full_name': user.full_name,
@@ -255,49 +273,17 @@ class StudentDashboardView(APIView):
     
     def get_monthly_accuracy(self, user):
         """Get average accuracy data for the last 12 months"""
-        monthly_data = []
-        current_date = timezone.now()
-        
-        for i in range(11, -1, -1):  # Last 12 months
-            # Calculate month boundaries
-            target_date = current_date - timedelta(days=30 * i)
-            month_start = target_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            # Get next month's first day
-            if month_start.month == 12:
-                month_end = month_start.replace(year=month_start.year + 1, month=1, day=1)
-            else:
-                month_end = month_start.replace(month=month_start.month + 1, day=1)
-            
-            # Query quizzes for this month
-            month_quizzes = QuizAttend.objects.filter(
-                student=user,
-                created_at__gte=month_start,
-                created_at__lt=month_end
-            ).aggregate(
-                total_correct=Sum('correct_answers'),
-                total_attempted=Sum('attempted_questions')
-            )
-            
-            # Calculate accuracy (scaled to match chart values ~700-1300)
-            if month_quizzes['total_attempted'] and month_quizzes['total_attempted'] > 0:
-                accuracy_percent = (month_quizzes['total_correct'] / 
-                                  month_quizzes['total_attempted'])
-                accuracy_value = int(accuracy_percent * 1000)  # Scale to chart range
-            else:
-                accuracy_value = 0
-            
-            monthly_data.append({
-                'month': month_abbr[month_start.month],
-                'value': accuracy_value
-            })
-        
-        return monthly_data
+        series = accuracy_series(QuizAttend.objects.filter(student=user), 'month', 12)
+
+        return [
+            {'month': month_abbr[month_start.month], 'value': value}
+            for month_start, value in series
+        ]
     
     def get_subject_performance(self, user):
         """Get performance percentage for each subject/module"""
         subject_performance = []
-        modules = Module.objects.all()
+        modules = Module.objects.listed()
         
         for module in modules:
             # Get all quizzes for this module
@@ -374,6 +360,12 @@ class AdminDashboardView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    def attempts_since(self, date_from, period):
+        """Raw attempts for the last day, daily rollup rows for longer windows"""
+        if period == 'day':
+            return QuizAttend.objects.filter(created_at__gte=date_from)
+        return QuizAttendDaily.objects.filter(day__gte=timezone.localdate(date_from))
+
     def get_student_stats(self, period):
         """Get student statistics"""
         # Calculate date range based on period
@@ -394,9 +386,7 @@ class AdminDashboardView(APIView):
         ).count()
         
         # Active students (took quiz in period)
-        active_students = User.objects.filter(
-            quizattend__created_at__gte=date_from
-        ).distinct().count()
+        active_students = self.attempts_since(date_from, period).values('student').distinct().count()
         
         # Inactive students
         inactive_students = total_students - active_students
@@ -411,7 +401,7 @@ class AdminDashboardView(APIView):
     def get_quiz_stats(self, period):
         """Get quiz statistics"""
         # Total subjects
-        total_subjects = Module.objects.count()
+        total_subjects = Module.objects.listed().count()
         
         # Calculate date range
         now = timezone.now()
@@ -421,9 +411,7 @@ class AdminDashboardView(APIView):
             date_from = now - timedelta(days=30)
         
         # Quiz participants in period
-        quiz_participants = QuizAttend.objects.filter(
-            created_at__gte=date_from
-        ).values('student').distinct().count()
+        quiz_participants = self.attempts_since(date_from, period).values('student').distinct().count()
         
         return {
             'total_subjects': total_subjects,
@@ -432,106 +420,47 @@ class AdminDashboardView(APIView):
     
     def get_average_accuracy(self, period):
         """Get average accuracy based on period (day/month/year)"""
-        accuracy_data = []
-        current_date = timezone.now()
-        
         if period == 'day':
-            # Last 24 hours, hourly breakdown
-            for i in range(23, -1, -1):
-                hour_start = current_date - timedelta(hours=i)
-                hour_end = hour_start + timedelta(hours=1)
-                
-                hour_quizzes = QuizAttend.objects.filter(
-                    created_at__gte=hour_start,
-                    created_at__lt=hour_end
-                ).aggregate(
-                    total_correct=Sum('correct_answers'),
-                    total_attempted=Sum('attempted_questions')
-                )
-                
-                if hour_quizzes['total_attempted'] and hour_quizzes['total_attempted'] > 0:
-                    accuracy_value = int((hour_quizzes['total_correct'] / 
-                                        hour_quizzes['total_attempted']) * 1000)
-                else:
-                    accuracy_value = 0
-                
-                accuracy_data.append({
-                    'month': f"{hour_start.hour}:00",
-                    'value': accuracy_value
-                })
-        
-        elif period == 'year':
+            # Last 24 hours, hourly breakdown from the raw attempts
+            return [
+                {'month': f"{hour_start.hour}:00", 'value': value}
+                for hour_start, value in accuracy_series(QuizAttend.objects.all(), 'hour', 24)
+            ]
+
+        rollups = QuizAttendDaily.objects.all()
+
+        if period == 'year':
             # Last 12 months
-            for i in range(11, -1, -1):
-                target_date = current_date - timedelta(days=30 * i)
-                month_start = target_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                
-                if month_start.month == 12:
-                    month_end = month_start.replace(year=month_start.year + 1, month=1, day=1)
-                else:
-                    month_end = month_start.replace(month=month_start.month + 1, day=1)
-                
-                month_quizzes = QuizAttend.objects.filter(
-                    created_at__gte=month_start,
-                    created_at__lt=month_end
-                ).aggregate(
-                    total_correct=Sum('correct_answers'),
-                    total_attempted=Sum('attempted_questions')
-                )
-                
-                if month_quizzes['total_attempted'] and month_quizzes['total_attempted'] > 0:
-                    accuracy_value = int((month_quizzes['total_correct'] / 
-                                        month_quizzes['total_attempted']) * 1000)
-                else:
-                    accuracy_value = 0
-                
-                accuracy_data.append({
-                    'label': month_abbr[month_start.month],
-                    'value': accuracy_value
-                })
-        
-        else:  # month (default) - last 30 days
-            for i in range(29, -1, -1):
-                day_start = (current_date - timedelta(days=i)).replace(hour=0, minute=0, second=0, microsecond=0)
-                day_end = day_start + timedelta(days=1)
-                
-                day_quizzes = QuizAttend.objects.filter(
-                    created_at__gte=day_start,
-                    created_at__lt=day_end
-                ).aggregate(
-                    total_correct=Sum('correct_answers'),
-                    total_attempted=Sum('attempted_questions')
-                )
-                
-                if day_quizzes['total_attempted'] and day_quizzes['total_attempted'] > 0:
-                    accuracy_value = int((day_quizzes['total_correct'] / 
-                                        day_quizzes['total_attempted']) * 1000)
-                else:
-                    accuracy_value = 0
-                
-                accuracy_data.append({
-                    'label': day_start.strftime('%d'),
-                    'value': accuracy_value
-                })
-        
-        return accuracy_data
+            return [
+                {'label': month_abbr[month_start.month], 'value': value}
+                for month_start, value in accuracy_series(rollups, 'month', 12, date_field='day')
+            ]
+
+        # month (default) - last 30 days
+        return [
+            {'label': day_start.strftime('%d'), 'value': value}
+            for day_start, value in accuracy_series(rollups, 'day', 30, date_field='day')
+        ]
     
     def get_subject_performance(self):
         """Get overall subject performance across all students"""
         subject_performance = []
-        modules = Module.objects.all()
-        
-        for module in modules:
-            # Get all quizzes for this module
-            module_quizzes = QuizAttend.objects.filter(
-                module=module
-            ).aggregate(
+        modules = Module.objects.listed()
+
+        # totals for every module in one grouped query
+        totals = {
+            row['module']: row
+            for row in QuizAttendDaily.objects.values('module').annotate(
                 total_correct=Sum('correct_answers'),
                 total_attempted=Sum('attempted_questions')
-            )
+            ).order_by()
+        }
+        
+        for module in modules:
+            module_quizzes = totals.get(module.id, {})
             
             # Calculate accuracy
-            if module_quizzes['total_attempted'] and module_quizzes['total_attempted'] > 0:
+            if module_quizzes.get('total_attempted'):
                 accuracy = int(
                     (module_quizzes['total_correct'] / 
                      module_quizzes['total_attempted']) * 100
@@ -565,23 +494,31 @@ class ModuleStatsView(generics.RetrieveAPIView):
         module = self.get_object()
         student = request.user
 
-        queryset = QuizAttend.objects.filter(module=module, student=student)
+        queryset = QuizAttendDaily.objects.filter(module=module, student=student)
 
-        quiz_attempted = queryset.count()
-        average_score = queryset.aggregate(avg=Avg('score'))['avg'] or 0
-        top_score = queryset.aggregate(max=Max('score'))['max'] or 0
+        totals = queryset.aggregate(
+            attempts=Sum('attempts'),
+            score=Sum('score'),
+            top=Max('top_score'),
+        )
+        quiz_attempted = totals['attempts'] or 0
+        average_score = totals['score'] / quiz_attempted if quiz_attempted else 0
+        top_score = totals['top'] or 0
 
         # Monthly accuracy: (correct / attempted * 100)
         monthly_data = (
             queryset
-            .annotate(month=ExtractMonth('created_at'))
+            .annotate(month=ExtractMonth('day'))
             .values('month')
             .annotate(
-                accuracy=Avg(
-                    ExpressionWrapper(
-                        F('correct_answers') * 100.0 / F('attempted_questions'),
-                        output_field=FloatField()
-                    )
+                correct=Sum('correct_answers'),
+                attempted=Sum('attempted_questions'),
+            )
+            .filter(attempted__gt=0)
+            .annotate(
+                accuracy=ExpressionWrapper(
+                    F('correct') * 100.0 / F('attempted'),
+                    output_field=FloatField()
                 )
             )
             .order_by('month')
@@ -679,42 +616,66 @@ class UploadQuestionsCSVView(APIView):
         if not csv_file.name.endswith('.csv'):
             return Response({"error": "File must be a .csv"}, status=status.HTTP_400_BAD_REQUEST)
 
-        decoded_file = csv_file.read().decode('utf-8').splitlines()
-        reader = csv.DictReader(decoded_file)
+        try:
+            result = QuestionCSVImporter(module).run(csv_file.file)
+        except (CSVImportError, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "message": f"{result['inserted']} questions imported successfully.",
+            **result,
+        }, status=status.HTTP_201_CREATED)
+
+
+class UploadQuestionsCSVJobView(APIView):
+    """Store the upload and import it in a Celery worker"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, module_id):
+        module = get_object_or_404(Module, id=module_id)
+
+        csv_file = request.FILES.get('file')
+        if not csv_file:
+            return Response({"error": "CSV file is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        created_count = 0
+        if not csv_file.name.endswith('.csv'):
+            return Response({"error": "File must be a .csv"}, status=status.HTTP_400_BAD_REQUEST)
 
         with transaction.atomic():
-            for idx, row in enumerate(reader, start=1):
-
-                # Skip empty rows
-                if not row.get("question") or row.get("question").strip() == "":
-                    continue
-
-                correct = row.get("correct_answer")
-                if correct not in ["option1", "option2", "option3", "option4"]:
-                    return Response(
-                        {"error": f"Invalid correct_answer at row {idx}: {correct}"},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                Questions.objects.create(
-                    module=module,
-                    question_text=row.get("question").strip(),
-                    option1=row.get("option1", "").strip(),
-                    option2=row.get("option2", "").strip(),
-                    option3=row.get("option3", "").strip(),
-                    option4=row.get("option4", "").strip(),
-                    correct_answer=correct
-                )
+            job = ImportJob.objects.create(module=module, file=csv_file, created_by=request.user)
+            transaction.on_commit(lambda: run_question_import.delay(str(job.id)))
 
-                created_count += 1
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
-        return Response({"message": f"{created_count} questions imported successfully."},
-                        status=status.HTTP_201_CREATED)
+
+class ImportJobListView(generics.ListAPIView):
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = ImportJobSerializer
+
+    def get_queryset(self):
+        queryset = ImportJob.objects.select_related('module').order_by('-created_at')
+        module_id = self.request.query_params.get('module')
+        if module_id:
+            queryset = queryset.filter(module_id=module_id)
+        return queryset
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = ImportJobSerializer
+    queryset = ImportJob.objects.select_related('module')
+    lookup_field = 'id'
 
 
 class CreateSynopticModuleView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     serializer_class = SynopticModuleSerializer
     queryset = SynopticModule.objects.all()
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counters per cache alias, for sizing the caches"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.counters(), status=status.HTTP_200_OK)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_alter_useraccount_profile_pic'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['user', 'created_at'], name='otp_user_created'),
+        ),
+    ]
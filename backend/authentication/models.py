@@ -96,4 +96,8 @@ class OTP(models.Model):
         verbose_name_plural = _("One-Time Passwords")
         indexes = [
             models.Index(fields=['created_at']),  
+            # live codes of one user, see authentication.otp.DatabaseOTPStore. Not
+            # (user, otp): a submitted code is compared with every live code in
+            # constant time rather than looked up by value.
+            models.Index(fields=['user', 'created_at'], name='otp_user_created'),
         ]
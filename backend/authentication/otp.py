@@ -0,0 +1,138 @@
+import hmac
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import cache
+
+from .models import OTP
+from .utils import generate_otp
+
+# One-time passwords live in the store named by settings.OTP_STORE. Issuing a
+# code replaces the user's earlier ones, so each code gets at most
+# max_attempts guesses. A code is checked with hmac.compare_digest against
+# the user's live codes, and verifications are counted per user in the
+# rate-limit cache: after max_attempts the user has to ask for a new code.
+
+ATTEMPTS_KEY = "otp_attempts:{user_id}"
+
+
+class TooManyAttempts(Exception):
+    pass
+
+
+class BaseOTPStore:
+    def __init__(self, validity_minutes=None, max_attempts=5):
+        if validity_minutes is None:
+            validity_minutes = getattr(settings, 'OTP_VALIDITY_DURATION', 5)
+        self.validity = timedelta(minutes=validity_minutes)
+        self.max_attempts = max_attempts
+
+    @property
+    def timeout(self):
+        return int(self.validity.total_seconds())
+
+    def save_code(self, user_id, otp):
+        """Store ``otp`` as the user's only code"""
+        raise NotImplementedError
+
+    def live_codes(self, user_id):
+        """The user's unexpired codes"""
+        raise NotImplementedError
+
+    def delete_codes(self, user_id):
+        raise NotImplementedError
+
+    def issue(self, user):
+        """Store a new code for ``user``, invalidating earlier ones, and return it
+
+        The attempt count starts over with the new code.
+        """
+        otp = generate_otp()
+        self.save_code(user.pk, otp)
+        caches[cache.RATE_LIMIT].delete(ATTEMPTS_KEY.format(user_id=user.pk))
+        return otp
+
+    def verify(self, user, otp):
+        """True, consuming all of the user's codes, if ``otp`` is one of them
+
+        Raises TooManyAttempts once the user made ``max_attempts`` tries
+        since the last code was issued.
+        """
+        if self._count_attempt(user.pk) > self.max_attempts:
+            raise TooManyAttempts
+
+        otp = str(otp).encode()
+        matched = False
+        for code in self.live_codes(user.pk):
+            # no early exit, so the time taken does not tell which code matched
+            matched |= hmac.compare_digest(code.encode(), otp)
+
+        if matched:
+            self.clear(user)
+        return matched
+
+    def clear(self, user):
+        self.delete_codes(user.pk)
+        caches[cache.RATE_LIMIT].delete(ATTEMPTS_KEY.format(user_id=user.pk))
+
+    def _count_attempt(self, user_id):
+        # counted before checking, so parallel guesses cannot share one attempt
+        limits = caches[cache.RATE_LIMIT]
+        key = ATTEMPTS_KEY.format(user_id=user_id)
+        limits.add(key, 0, timeout=self.timeout)
+        try:
+            return limits.incr(key)
+        except ValueError:
+            limits.set(key, 1, timeout=self.timeout)
+            return 1
+
+
+class CacheOTPStore(BaseOTPStore):
+    """Codes kept in the rate-limit cache, expiring with their key"""
+    CODES_KEY = "otp:{user_id}"
+
+    def save_code(self, user_id, otp):
+        caches[cache.RATE_LIMIT].set(
+            self.CODES_KEY.format(user_id=user_id), [(otp, time.time() + self.timeout)], timeout=self.timeout
+        )
+
+    def live_codes(self, user_id):
+        now = time.time()
+        codes = caches[cache.RATE_LIMIT].get(self.CODES_KEY.format(user_id=user_id), [])
+        return [code for code, expires_at in codes if expires_at > now]
+
+    def delete_codes(self, user_id):
+        caches[cache.RATE_LIMIT].delete(self.CODES_KEY.format(user_id=user_id))
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """Codes kept in the OTP table, expired rows are removed by purge_expired()"""
+
+    def save_code(self, user_id, otp):
+        with transaction.atomic():
+            OTP.objects.filter(user_id=user_id).delete()
+            OTP.objects.create(user_id=user_id, otp=otp)
+
+    def live_codes(self, user_id):
+        return list(
+            OTP.objects.filter(user_id=user_id, created_at__gt=timezone.now() - self.validity)
+            .values_list('otp', flat=True)
+        )
+
+    def delete_codes(self, user_id):
+        OTP.objects.filter(user_id=user_id).delete()
+
+    def purge_expired(self):
+        """Delete expired codes, returns how many"""
+        return OTP.objects.filter(created_at__lte=timezone.now() - self.validity).delete()[0]
+
+
+def get_otp_store():
+    config = settings.OTP_STORE
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
@@ -0,0 +1,13 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.authentication import invalidate_user
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # bans, password changes and deletions must reach token authentication
+    invalidate_user(instance.pk)
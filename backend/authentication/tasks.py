@@ -6,6 +6,8 @@ from datetime import timedelta
 
 import logging
 
+from .otp import DatabaseOTPStore
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,3 +30,11 @@ def send_password_reset_email_task(self, user_email, full_name, otp):
         logger.error(f"Failed to send password reset OTP email to {user_email}: {exc}")
         raise self.retry(exc=exc, countdown=10)  # retry after 10s
 
+
+
+@shared_task
+def purge_expired_otps():
+    # the table holds codes of the database store, and any issued before
+    # the cache store was configured
+    purged = DatabaseOTPStore().purge_expired()
+    logger.info(f"Purged {purged} expired OTPs")
@@ -1,3 +1,84 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .models import OTP
+from .otp import CacheOTPStore, DatabaseOTPStore, TooManyAttempts
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        admin = User.objects.create_user(
+            email='admin@example.com', password='pass', full_name='Admin', is_active=True, is_staff=True
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(admin)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/student/time-list/')
+        self.assertEqual(response.status_code, 200)
+        return [q for q in context.captured_queries if 'authentication_useraccount' in q['sql']]
+
+    def test_user_is_cached_until_banned(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin_client.post('/admin-api/ban-user/', {'user_id': str(self.user.id)})
+        self.assertEqual(self.client.get('/student/time-list/').status_code, 401)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin_client.post('/admin-api/unban-user/', {'user_id': str(self.user.id)})
+        self.assertEqual(self.client.get('/student/time-list/').status_code, 200)
+
+
+class OTPStoreTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(email='student@example.com', password='pass', full_name='Student')
+
+    def test_verify_consumes_codes_and_limits_attempts(self):
+        for store in (CacheOTPStore(max_attempts=3), DatabaseOTPStore(max_attempts=3)):
+            otp = store.issue(self.user)
+            self.assertFalse(store.verify(self.user, 'nope'))
+            self.assertTrue(store.verify(self.user, otp))
+            self.assertFalse(store.verify(self.user, otp))
+
+            otp = store.issue(self.user)
+            for _ in range(3):
+                self.assertFalse(store.verify(self.user, 'nope'))
+            with self.assertRaises(TooManyAttempts):
+                store.verify(self.user, otp)
+
+    def test_new_code_replaces_earlier_ones(self):
+        for store in (CacheOTPStore(), DatabaseOTPStore()):
+            first = store.issue(self.user)
+            second = store.issue(self.user)
+            while second == first:
+                second = store.issue(self.user)
+            self.assertEqual(store.live_codes(self.user.pk), [second])
+            self.assertFalse(store.verify(self.user, first))
+            self.assertTrue(store.verify(self.user, second))
+
+    def test_expired_codes(self):
+        store = DatabaseOTPStore(validity_minutes=0)
+        otp = store.issue(self.user)
+        self.assertFalse(store.verify(self.user, otp))
+        self.assertEqual(store.purge_expired(), 1)
+        self.assertFalse(OTP.objects.exists())
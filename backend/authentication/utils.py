@@ -1,5 +1,5 @@
 from datetime import timezone, datetime, timedelta
-import random
+import secrets
 import jwt
 
 JWT_SECRET = "secret_key"
@@ -7,7 +7,7 @@ JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_DELTA = timedelta(minutes=10)
 
 def generate_otp(length=6):
-    return str(random.randint(10**(length-1), (10**length)-1))
+    return str(10**(length-1) + secrets.randbelow(9 * 10**(length-1)))
 
 def create_otp_token(payload):
     now = datetime.now(timezone.utc)
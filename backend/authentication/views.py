@@ -2,7 +2,6 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import generics, status, permissions
 
-from django.utils.timezone import now
 from django.contrib.auth import get_user_model, authenticate
 from django.shortcuts import get_object_or_404
 from django.db import transaction
@@ -22,12 +21,9 @@ from .tasks import (
     send_password_reset_email_task,
 )
 
-from .models import (
-    OTP
-)
+from .otp import TooManyAttempts, get_otp_store
 
 from .utils import (
-    generate_otp,
     create_otp_token,
     decode_otp_token
 )
@@ -78,13 +74,8 @@ class RegisterView(APIView):
         try:
             with transaction.atomic():
                 user = serializer.save()
-                otp = generate_otp()
+                get_otp_store().issue(user)
 
-                OTP.objects.create(
-                    user=user,
-                    otp=otp,
-                    created_at=now()
-                )
                 verificationToken = create_otp_token(user.id)
 
                 response = Response(
@@ -121,13 +112,7 @@ class ForgetPassView(APIView):
         
         user = get_object_or_404(User, email=email)
 
-        otp = generate_otp()
-
-        OTP.objects.create(
-            user=user,
-            otp=otp,
-            created_at=now()
-        )
+        otp = get_otp_store().issue(user)
 
         send_password_reset_email_task.delay(
             user.email,
@@ -169,17 +154,18 @@ class ForgetPassOTPVerifyView(APIView):
 
         user = get_object_or_404(User, id=user_id)
 
-        otp_instance = user.otps.filter(otp=otp).first()
-        if not otp_instance or not otp_instance.is_valid():
+        # a matching OTP is consumed so it cannot be reused
+        try:
+            verified = get_otp_store().verify(user, otp)
+        except TooManyAttempts:
+            return Response({"error": "Too many attempts. Request a new OTP."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if not verified:
             return Response({"error": "Invalid or expired OTP."}, status=status.HTTP_400_BAD_REQUEST)
         
         # If OTP is valid, generate a verified token indicating that the OTP step is complete.
         verified_payload = {"user_id": str(user.id), "verified": True}
         verified_token = create_otp_token(verified_payload)
         
-        # Optionally, delete the used OTP instance to prevent reuse.
-        otp_instance.delete()
-        
         response = Response(
             {
                 "msg": "OTP verified. You can now reset your password.",
@@ -234,8 +220,7 @@ class ResendForgetPassOTPView(APIView):
         user_id = decoded.get("user_id")
         user = get_object_or_404(User, id=user_id)
 
-        otp = generate_otp()
-        OTP.objects.create(user=user, otp=otp, created_at=now())
+        otp = get_otp_store().issue(user)
 
         send_password_reset_email_task.delay(user.email, user.full_name, otp)
 
@@ -294,13 +279,15 @@ class VerifyOTP(APIView):
         except User.DoesNotExist:
             return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        otp_instance = user.otps.filter(otp=otp).first()
-        if not otp_instance or not otp_instance.is_valid():
+        try:
+            verified = get_otp_store().verify(user, otp)
+        except TooManyAttempts:
+            return Response({"error": "Too many attempts. Request a new OTP."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        if not verified:
             return Response({"error": "Invalid OTP."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Activate the user and clear OTPs
+        # Activate the user, verify() already cleared the OTPs
         user.is_active = True
-        user.otps.all().delete()
         user.save()
 
         # Generate tokens
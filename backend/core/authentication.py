@@ -0,0 +1,93 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.http import JsonResponse
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core import cache
+
+# Users resolved from tokens are cached for USER_CACHE_TIMEOUT seconds under
+# a per-user version that authentication.signals bumps whenever the account
+# is saved or deleted, so bans and password changes apply on the next request.
+USER_VERSION = "jwt_user:{user_id}"
+USER_CACHE_TIMEOUT = 60
+
+
+def invalidate_user(user_id):
+    """Drop the cached user once the current transaction commits"""
+    cache.bump(DEFAULT_CACHE_ALIAS, USER_VERSION.format(user_id=user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reads the token's user from the cache before the database"""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = cache.versioned_key(DEFAULT_CACHE_ALIAS, USER_VERSION.format(user_id=user_id))
+        user = cache.lookup(DEFAULT_CACHE_ALIAS, key)
+        if user is None:
+            # inactive or unknown users raise here and are never cached
+            user = super().get_user(validated_token)
+            caches[DEFAULT_CACHE_ALIAS].set(key, user, USER_CACHE_TIMEOUT)
+            return user
+
+        # the revoke claim belongs to the token, not the cached user
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """CachedJWTAuthentication for async views"""
+
+    async def aauthenticate(self, request):
+        """The user for the request's bearer token, or None if there is no valid one"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        try:
+            validated_token = self.get_validated_token(raw_token)
+            # the same cached lookup as the sync views
+            return await sync_to_async(self.get_user)(validated_token)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+
+
+def async_jwt_required(view):
+    """Async view decorator: 401 unless the request carries a valid JWT, else sets ``request.user``
+
+    Like DRF's APIView the view is CSRF exempt, it is authenticated by the
+    bearer token rather than a session cookie.
+    """
+    authentication = AsyncJWTAuthentication()
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await authentication.aauthenticate(request)
+        if user is None:
+            response = JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=401
+            )
+            response["WWW-Authenticate"] = authentication.authenticate_header(request)
+            return response
+        request.user = user
+        return await view(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
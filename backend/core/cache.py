@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+
+# Named aliases configured in settings.CACHES
+CATALOGUE = "catalogue"
+QUIZ_DECKS = "quiz-decks"
+STATS = "stats"
+RATE_LIMIT = "rate-limit"
+
+ALIASES = (DEFAULT_CACHE_ALIAS, CATALOGUE, QUIZ_DECKS, STATS, RATE_LIMIT)
+
+VERSION_KEY = "version:{name}"
+LOCK_KEY = "lock:{key}"
+COUNTER_KEY = "cache_counter:{alias}:{event}"
+
+# hits and misses are counted per process and added to shared counters in
+# the default cache every FLUSH_EVERY events, so every worker contributes
+FLUSH_EVERY = 100
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def record(alias, hit):
+    event = "hits" if hit else "misses"
+    with _counts_lock:
+        _counts[(alias, event)] += 1
+        if sum(_counts.values()) < FLUSH_EVERY:
+            return
+        pending = dict(_counts)
+        _counts.clear()
+    _flush(pending)
+
+
+def _flush(pending):
+    shared = caches[DEFAULT_CACHE_ALIAS]
+    for (alias, event), count in pending.items():
+        key = COUNTER_KEY.format(alias=alias, event=event)
+        shared.add(key, 0, timeout=None)
+        try:
+            shared.incr(key, count)
+        except ValueError:
+            shared.set(key, count, timeout=None)
+
+
+def counters():
+    """Hits, misses and hit rate per alias, across every process that flushed"""
+    with _counts_lock:
+        pending = dict(_counts)
+
+    shared = caches[DEFAULT_CACHE_ALIAS]
+    totals = shared.get_many([
+        COUNTER_KEY.format(alias=alias, event=event)
+        for alias in ALIASES for event in ("hits", "misses")
+    ])
+
+    report = {}
+    for alias in ALIASES:
+        hits, misses = (
+            totals.get(COUNTER_KEY.format(alias=alias, event=event), 0) + pending.get((alias, event), 0)
+            for event in ("hits", "misses")
+        )
+        report[alias] = {
+            "backend": settings.CACHES.get(alias, {}).get("BACKEND"),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return report
+
+
+def lookup(alias, key):
+    """``caches[alias].get(key)``, counted as a hit or a miss"""
+    value = caches[alias].get(key)
+    record(alias, value is not None)
+    return value
+
+
+def version(alias, name):
+    """Current value of the ``name`` version counter in ``alias``"""
+    cache = caches[alias]
+    key = VERSION_KEY.format(name=name)
+    value = cache.get(key)
+    if value is None:
+        # start from a clock value so a lost key never reuses an old version
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump(alias, name, on_commit=True):
+    """Move ``name`` to a new version, after the current transaction commits by default"""
+    def incr():
+        cache = caches[alias]
+        key = VERSION_KEY.format(name=name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+    if on_commit:
+        transaction.on_commit(incr)
+    else:
+        incr()
+
+
+def versioned_key(alias, name, *parts):
+    """Key under the current version of ``name``, so a bump orphans every older entry"""
+    return ":".join([name, str(version(alias, name)), *map(str, parts)])
+
+
+def get_or_compute(alias, key, compute, timeout=DEFAULT_TIMEOUT, lock_timeout=10):
+    """Cached value of ``key``, computing it with ``compute()`` on a miss
+
+    Only one caller across all processes computes a missing key at a time;
+    the others poll for its result for up to ``lock_timeout`` seconds before
+    computing it themselves. ``compute`` must not return None.
+    """
+    cache = caches[alias]
+    value = lookup(alias, key)
+    if value is not None:
+        return value
+
+    lock_key = LOCK_KEY.format(key=key)
+    if cache.add(lock_key, 1, timeout=lock_timeout):
+        try:
+            value = compute()
+            cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + lock_timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        time.sleep(delay)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        delay = min(delay * 2, 0.2)
+
+    value = compute()
+    cache.set(key, value, timeout=timeout)
+    return value
+
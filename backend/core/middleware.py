@@ -0,0 +1,103 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .profiling import record_queries
+
+logger = logging.getLogger("core.queries")
+
+DEFAULTS = {
+    "ENABLED": False,
+    # flag a request once one query shape repeats this many times
+    "SIMILAR_THRESHOLD": 5,
+    "SLOWEST": 3,
+    "SERVER_TIMING": True,
+}
+
+
+class QueryProfilerMiddleware:
+    """Per-request query count, DB time, repeated query shapes and slowest statements
+
+    Enabled with ``QUERY_PROFILER = {"ENABLED": True}``. Results go to the
+    ``Server-Timing`` header and the ``core.queries`` logger, and a warning is
+    logged for views that repeat one query shape ``SIMILAR_THRESHOLD`` times.
+    Runs natively in both sync and async middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.options = {**DEFAULTS, **getattr(settings, "QUERY_PROFILER", {})}
+        if not self.options["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries(slowest=self.options["SLOWEST"]) as recorder:
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        # connections are per thread, and the async ORM and sync_to_async run
+        # the request's queries in one thread, so the recorder is attached there
+        queries = record_queries(slowest=self.options["SLOWEST"])
+        recorder = await sync_to_async(queries.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+        return self.report(request, response, recorder)
+
+    def report(self, request, response, recorder):
+        """Log the recorded queries and add the Server-Timing header"""
+        view = self.view_name(request)
+        similar = recorder.similar(self.options["SIMILAR_THRESHOLD"])
+        db_ms = recorder.duration * 1000
+
+        profile = {
+            "method": request.method,
+            "path": request.path,
+            "view": view,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "db_ms": round(db_ms, 2),
+            "duplicates": recorder.duplicates(),
+            "slowest": [
+                {"ms": round(elapsed * 1000, 2), "sql": sql} for elapsed, sql in recorder.slowest
+            ],
+        }
+        logger.info(
+            "%s %s queries=%d db_ms=%.2f duplicates=%d",
+            request.method, request.path, recorder.count, db_ms, profile["duplicates"],
+            extra={"query_profile": profile},
+        )
+        for shape, count in similar:
+            logger.warning(
+                "Possible N+1 in %s: %d similar queries: %s", view, count, shape,
+                extra={"query_profile": profile, "query_shape": shape, "query_count": count},
+            )
+
+        if self.options["SERVER_TIMING"]:
+            metrics = [f'db;dur={db_ms:.2f};desc="{recorder.count} queries"']
+            if recorder.slowest:
+                metrics.append(f"db-slowest;dur={recorder.slowest[0][0] * 1000:.2f}")
+            if similar:
+                metrics.append(f'db-similar;desc="{similar[0][1]} x same query"')
+            existing = response.get("Server-Timing")
+            response["Server-Timing"] = ", ".join(([existing] if existing else []) + metrics)
+
+        return response
+
+    def view_name(self, request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return request.path
+        # class-based views are named by their class, like ResolverMatch does
+        func = getattr(match.func, "view_class", match.func)
+        return f"{func.__module__}.{func.__qualname__}"
@@ -0,0 +1,117 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination that seeks past the last row seen instead of using OFFSET
+
+    The cursor holds the sort key of the last row on the page, so every page
+    is one indexed range scan with no COUNT(*). The ordering comes from
+    ``view.get_keyset_ordering()``/``view.keyset_ordering`` and must end in a
+    unique column (usually ``id``) so the sort key is total.
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-id',)
+
+    def get_ordering(self, view):
+        if hasattr(view, 'get_keyset_ordering'):
+            return tuple(view.get_keyset_ordering())
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.seek(position))
+
+        rows = list(queryset[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_position = self.position_of(rows[-1]) if self.has_next else None
+        return rows
+
+    def seek(self, position):
+        """Rows strictly after ``position`` in the ordering"""
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def position_of(self, row):
+        position = []
+        for field in self.ordering:
+            value = getattr(row, field.lstrip('-'))
+            if isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            elif not isinstance(value, (int, float, str, type(None))):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (binascii.Error, ValueError, UnicodeError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor')
+        return position
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, encoded
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.encode_cursor(self.next_position) if self.has_next else None,
+            'results': data,
+        })
+
+
+class KeysetPaginationMixin:
+    """Opt-in keyset pagination with ``?pagination=cursor`` (or any ``cursor``)"""
+    keyset_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.keyset_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,72 @@
+import heapq
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+# literals and IN lists are replaced so queries differing only in their
+# parameters share one shape, which is what an N+1 loop produces
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_RE = re.compile(r"\bIN \([^)]*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def query_shape(sql):
+    """``sql`` with its literals and IN lists normalised away"""
+    shape = _STRING_RE.sub("?", sql)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _IN_RE.sub("IN (...)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` that counts, times and groups queries"""
+
+    def __init__(self, slowest=3):
+        self.slowest_limit = slowest
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self._slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.shapes[query_shape(sql)] += 1
+
+            entry = (elapsed, self.count, sql)
+            if len(self._slowest) < self.slowest_limit:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        """``[(seconds, sql), ...]``, slowest first"""
+        return [(elapsed, sql) for elapsed, _, sql in sorted(self._slowest, reverse=True)]
+
+    def similar(self, threshold):
+        """Query shapes issued at least ``threshold`` times, most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def duplicates(self):
+        """Number of queries that repeated an earlier shape"""
+        return sum(count - 1 for count in self.shapes.values())
+
+
+@contextmanager
+def record_queries(slowest=3):
+    """Record every query run on any database connection inside the block"""
+    recorder = QueryRecorder(slowest=slowest)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
@@ -5,6 +5,7 @@ import cloudinary.uploader
 import cloudinary.api
 import environ
 import os
+import sys
 
 env = environ.Env()
 environ.Env.read_env()
@@ -22,6 +23,8 @@ SECRET_KEY = env('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+TESTING = 'test' in sys.argv
+
 ALLOWED_HOSTS = [
     "*"
 ]
@@ -91,8 +94,16 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
+    'core.middleware.QueryProfilerMiddleware',
 ]
 
+# per-request query profiling, off unless QUERY_PROFILER=true
+QUERY_PROFILER = {
+    'ENABLED': env.bool('QUERY_PROFILER', default=False),
+    'SIMILAR_THRESHOLD': 5,
+    'SLOWEST': 3,
+}
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -175,6 +186,10 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# uploaded files, e.g. CSVs waiting for a background import
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -184,7 +199,7 @@ AUTH_USER_MODEL = "authentication.UserAccount"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -222,6 +237,79 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+CELERY_BEAT_SCHEDULE = {
+    'repair-quiz-attend-daily': {
+        'task': 'module.tasks.repair_quiz_attend_daily',
+        'schedule': timedelta(hours=1),
+        'kwargs': {'days': 3},
+    },
+    'update-question-stats': {
+        'task': 'module.tasks.update_question_stats',
+        'schedule': timedelta(minutes=5),
+    },
+    'purge-expired-otps': {
+        'task': 'authentication.tasks.purge_expired_otps',
+        'schedule': timedelta(hours=1),
+    },
+}
+
+# XP leaderboard (sorted set in Redis, in-process when running tests)
+LEADERBOARD = {
+    'BACKEND': 'student.leaderboard.RedisLeaderboard',
+    'OPTIONS': {
+        'url': env('LEADERBOARD_REDIS_URL', default='redis://localhost:6379/1'),
+        'key': 'leaderboard:xp',
+    },
+}
+
+if TESTING:
+    LEADERBOARD = {'BACKEND': 'student.leaderboard.MemoryLeaderboard'}
+
+# one-time password storage, see authentication.otp; codes expire with their
+# key in the rate-limit cache, DatabaseOTPStore keeps them in the OTP table
+OTP_STORE = {
+    'BACKEND': 'authentication.otp.CacheOTPStore',
+    'OPTIONS': {'max_attempts': 5},
+}
+
+# cache aliases, see core.cache; each gets its own key prefix and
+# connection pool on the shared Redis, and a local-memory store in tests
+CACHE_REDIS_URL = env('CACHE_REDIS_URL', default='redis://localhost:6379/2')
+CACHE_TIMEOUTS = {
+    'default': 300,
+    'catalogue': 60 * 60 * 24,
+    # versioned keys are never stale, the TTL frees decks of old versions
+    'quiz-decks': 60 * 60 * 6,
+    'stats': 300,
+    'rate-limit': 60 * 60,
+}
+
+if TESTING:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': alias,
+            'TIMEOUT': timeout,
+        }
+        for alias, timeout in CACHE_TIMEOUTS.items()
+    }
+else:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'KEY_PREFIX': alias,
+            'TIMEOUT': timeout,
+            'OPTIONS': {
+                'max_connections': env.int('CACHE_MAX_CONNECTIONS', default=50),
+                'socket_timeout': 1,
+                'socket_connect_timeout': 1,
+                'health_check_interval': 30,
+            },
+        }
+        for alias, timeout in CACHE_TIMEOUTS.items()
+    }
+
 # email setup
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.hostinger.com'
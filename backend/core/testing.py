@@ -0,0 +1,27 @@
+from contextlib import contextmanager
+
+from .profiling import record_queries
+
+
+class QueryProfileAssertionsMixin:
+    """TestCase assertions on the queries recorded by ``core.profiling``"""
+
+    @contextmanager
+    def assertQueryProfile(self, max_queries=None, max_similar=None):
+        """Fail if the block runs more than ``max_queries`` queries, or repeats
+        one query shape more than ``max_similar`` times"""
+        with record_queries(slowest=0) as recorder:
+            yield recorder
+
+        if max_queries is not None and recorder.count > max_queries:
+            self.fail(
+                f"{recorder.count} queries executed, expected at most {max_queries}:\n"
+                + "\n".join(f"{count} x {shape}" for shape, count in recorder.shapes.most_common())
+            )
+        if max_similar is not None:
+            similar = recorder.similar(max_similar + 1)
+            if similar:
+                self.fail(
+                    f"Query repeated more than {max_similar} times:\n"
+                    + "\n".join(f"{count} x {shape}" for shape, count in similar)
+                )
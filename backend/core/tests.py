@@ -0,0 +1,64 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from . import cache
+
+
+class CacheHelpersTest(SimpleTestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        cache._counts.clear()
+
+    def compute_counter(self, value):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return value
+        return compute, calls
+
+    def test_get_or_compute_computes_once(self):
+        compute, calls = self.compute_counter('deck')
+        self.assertEqual(cache.get_or_compute(cache.QUIZ_DECKS, 'key', compute), 'deck')
+        self.assertEqual(cache.get_or_compute(cache.QUIZ_DECKS, 'key', compute), 'deck')
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(caches[cache.QUIZ_DECKS].get(cache.LOCK_KEY.format(key='key')))
+
+    def test_waiter_takes_the_lock_holders_result(self):
+        decks = caches[cache.QUIZ_DECKS]
+        decks.add(cache.LOCK_KEY.format(key='key'), 1)
+        threading.Timer(0.05, decks.set, args=('key', 'from holder')).start()
+
+        compute, calls = self.compute_counter('from waiter')
+        self.assertEqual(cache.get_or_compute(cache.QUIZ_DECKS, 'key', compute, lock_timeout=5), 'from holder')
+        self.assertEqual(calls, [])
+
+    def test_waiter_computes_after_lock_timeout(self):
+        caches[cache.QUIZ_DECKS].add(cache.LOCK_KEY.format(key='key'), 1)
+        compute, calls = self.compute_counter('from waiter')
+        self.assertEqual(cache.get_or_compute(cache.QUIZ_DECKS, 'key', compute, lock_timeout=0.1), 'from waiter')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(caches[cache.QUIZ_DECKS].get('key'), 'from waiter')
+
+    def test_bump_moves_versioned_keys(self):
+        first = cache.versioned_key(cache.CATALOGUE, 'name', 'page')
+        self.assertEqual(cache.versioned_key(cache.CATALOGUE, 'name', 'page'), first)
+
+        cache.bump(cache.CATALOGUE, 'name', on_commit=False)
+        second = cache.versioned_key(cache.CATALOGUE, 'name', 'page')
+        self.assertNotEqual(second, first)
+        self.assertEqual(cache.version(cache.CATALOGUE, 'name'), cache.version(cache.CATALOGUE, 'name'))
+
+    def test_counters_include_flushed_and_pending_events(self):
+        caches[cache.STATS].set('present', 1)
+        for _ in range(cache.FLUSH_EVERY):
+            cache.lookup(cache.STATS, 'present')
+        cache.lookup(cache.STATS, 'missing')
+
+        report = cache.counters()[cache.STATS]
+        self.assertEqual((report['hits'], report['misses']), (cache.FLUSH_EVERY, 1))
+        self.assertEqual(report['hit_rate'], round(cache.FLUSH_EVERY / (cache.FLUSH_EVERY + 1), 4))
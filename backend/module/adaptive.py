@@ -0,0 +1,167 @@
+import random
+import threading
+
+from django.db.models import Sum
+
+from . import decks
+from .models import QuestionStats, QuizAttendDaily
+from .question_stats import stats_version
+
+# Adaptive quizzes sample questions without replacement, weighted towards
+# harder questions. Each module keeps a Fenwick tree over its deck weights in
+# process memory, rebuilt when the deck or its QuestionStats change, so a
+# draw of k questions costs O(k log n) however large the module is.
+
+# weights are integers so removing and restoring picks never drifts
+WEIGHT_SCALE = 1000
+
+_local_samplers = {}
+_samplers_lock = threading.Lock()
+
+
+def question_weight(difficulty):
+    """Sampling weight for a question of smoothed ``difficulty`` (QuestionStats.difficulty)
+
+    The floor keeps easy questions in rotation.
+    """
+    return int((0.25 + difficulty) * WEIGHT_SCALE)
+
+
+class FenwickTree:
+    """Prefix sums over integer weights with O(log n) update and search"""
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.tree = [0] + list(weights)
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[index]
+        self.top_bit = 1 << self.size.bit_length() if self.size else 0
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def total(self):
+        total, index = 0, self.size
+        while index:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, value):
+        """Smallest index whose prefix sum exceeds ``value`` (0 <= value < total)"""
+        position, step = 0, self.top_bit
+        while step:
+            following = position + step
+            if following <= self.size and self.tree[following] <= value:
+                position = following
+                value -= self.tree[following]
+            step >>= 1
+        return position
+
+
+class ModuleSampler:
+    def __init__(self, question_ids, weights):
+        self.question_ids = question_ids
+        self.weights = weights
+        self.tree = FenwickTree(weights)
+        self.lock = threading.Lock()
+
+    def sample(self, k, rng=random):
+        """Up to ``k`` distinct question ids, each drawn in proportion to its weight"""
+        k = min(k, len(self.question_ids))
+        picked = []
+        with self.lock:
+            try:
+                total = self.tree.total()
+                for _ in range(k):
+                    index = self.tree.find(rng.randrange(total))
+                    picked.append(index)
+                    self.tree.add(index, -self.weights[index])
+                    total -= self.weights[index]
+            finally:
+                # put the picks back so the shared tree is unchanged
+                for index in picked:
+                    self.tree.add(index, self.weights[index])
+        return [self.question_ids[index] for index in picked]
+
+
+def get_sampler(module_id):
+    module_id = str(module_id)
+    version = (decks.content_version(module_id), stats_version(module_id))
+
+    local = _local_samplers.get(module_id)
+    if local and local[0] == version:
+        return local[1]
+
+    with _samplers_lock:
+        local = _local_samplers.get(module_id)
+        if local and local[0] == version:
+            return local[1]
+
+        question_ids = decks.get_deck(module_id)
+        difficulty = {
+            str(stats.question_id): stats.difficulty
+            for stats in QuestionStats.objects.filter(module_id=module_id).only("question_id", "attempts", "correct")
+        }
+        # unseen questions count as medium difficulty
+        unseen = QuestionStats().difficulty
+        weights = [question_weight(difficulty.get(pk, unseen)) for pk in question_ids]
+        sampler = ModuleSampler(question_ids, weights)
+        _local_samplers[module_id] = (version, sampler)
+        return sampler
+
+
+def weak_module_weights(student, module_ids):
+    """Weight per module, higher where the student's accuracy is lower
+
+    Used by synoptic quizzes to split the questions between their modules.
+    """
+    accuracy = {
+        row["module_id"]: (row["correct"] or 0, row["attempted"] or 0)
+        for row in QuizAttendDaily.objects.filter(student=student, module_id__in=module_ids)
+        .values("module_id")
+        .annotate(correct=Sum("correct_answers"), attempted=Sum("attempted_questions"))
+    }
+    weights = {}
+    for module_id in module_ids:
+        correct, attempted = accuracy.get(module_id, (0, 0))
+        weights[module_id] = 1.5 - (correct + 1) / (attempted + 2)
+    return weights
+
+
+def draw(module_ids, quantity=None, module_weights=None, rng=random):
+    """Difficulty-weighted sample over the modules' decks
+
+    With several modules, each question first picks a module in proportion
+    to ``module_weights`` (uniform by default) among those with questions
+    left, then a question from that module's sampler. A single module has
+    nothing to split, so its questions are weighted by difficulty alone
+    and ``module_weights`` does not apply.
+    """
+    samplers = {module_id: get_sampler(module_id) for module_id in module_ids}
+    available = {module_id: len(sampler.question_ids) for module_id, sampler in samplers.items()}
+    total = sum(available.values())
+    k = total if quantity is None else min(quantity, total)
+
+    if len(samplers) == 1:
+        (sampler,) = samplers.values()
+        return sampler.sample(k, rng)
+
+    module_weights = module_weights or {}
+    allocation = dict.fromkeys(samplers, 0)
+    for _ in range(k):
+        candidates = [module_id for module_id in samplers if allocation[module_id] < available[module_id]]
+        chosen = rng.choices(candidates, [module_weights.get(module_id, 1.0) for module_id in candidates])[0]
+        allocation[chosen] += 1
+
+    question_ids = []
+    for module_id, count in allocation.items():
+        if count:
+            question_ids.extend(samplers[module_id].sample(count, rng))
+    rng.shuffle(question_ids)
+    return question_ids
@@ -3,8 +3,14 @@ from .models import (
     Module,
     Questions,
     OptionModulesPair,
+    QuizAttendDaily,
+    ModuleStats,
+    QuestionStats,
 )
 
 admin.site.register(Module)
 admin.site.register(Questions)
 admin.site.register(OptionModulesPair)
+admin.site.register(QuizAttendDaily)
+admin.site.register(ModuleStats)
+admin.site.register(QuestionStats)
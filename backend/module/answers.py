@@ -0,0 +1,79 @@
+import uuid
+
+# Per-question results of a session attempt are stored on QuizAttend instead
+# of one row per answer: ``served_questions`` is the question UUIDs packed as
+# 16 bytes each, and ``answers`` packs one 2-bit result code per served
+# question, four to a byte with the first question in the low bits.
+
+ID_SIZE = 16
+
+UNANSWERED = 0
+CORRECT = 1
+WRONG = 2
+SKIPPED = 3
+
+# byte value -> the four codes it holds, so decoding never shifts bits per answer
+DECODE_TABLE = [tuple((byte >> shift) & 3 for shift in (0, 2, 4, 6)) for byte in range(256)]
+
+
+def pack_ids(question_ids):
+    return b"".join(uuid.UUID(str(pk)).bytes for pk in question_ids)
+
+
+def unpack_ids(blob):
+    blob = bytes(blob)
+    return [str(uuid.UUID(bytes=blob[i:i + ID_SIZE])) for i in range(0, len(blob), ID_SIZE)]
+
+
+def id_count(blob):
+    return len(blob) // ID_SIZE
+
+
+def empty_codes(count):
+    """Packed codes for ``count`` unanswered questions"""
+    return bytes((count + 3) // 4)
+
+
+def unpack_codes(blob, count):
+    """The first ``count`` codes of a packed blob"""
+    codes = []
+    for byte in bytes(blob):
+        codes.extend(DECODE_TABLE[byte])
+    return codes[:count]
+
+
+def set_code(packed, index, code):
+    """Set one code in a ``bytearray`` of packed codes"""
+    shift = (index & 3) << 1
+    packed[index >> 2] = (packed[index >> 2] & ~(3 << shift)) | (code << shift)
+
+
+def count_codes(blob, count):
+    """``(correct, wrong, skipped)`` in a packed blob"""
+    codes = unpack_codes(blob, count)
+    return codes.count(CORRECT), codes.count(WRONG), codes.count(SKIPPED)
+
+
+def tally(rows, totals=None):
+    """Add ``(served_questions, answers)`` rows to ``{question id bytes: [attempts, correct]}``
+
+    Answered questions count as attempts, skipped and unanswered ones do not.
+    Keys stay as raw 16-byte ids until the end so millions of attempts can
+    be folded in without building a UUID per answer.
+    """
+    totals = {} if totals is None else totals
+    for served, answers in rows:
+        served = bytes(served)
+        index = 0
+        for byte in bytes(answers):
+            for code in DECODE_TABLE[byte]:
+                if code == CORRECT or code == WRONG:
+                    entry = totals.get(served[index:index + ID_SIZE])
+                    if entry is None:
+                        entry = totals[served[index:index + ID_SIZE]] = [0, 0]
+                    entry[0] += 1
+                    if code == CORRECT:
+                        entry[1] += 1
+                index += ID_SIZE
+    return totals
+
@@ -0,0 +1,34 @@
+import threading
+
+# Deleting a Module or a user cascades to their questions and attempts. The
+# per-row post_delete receivers that keep derived counters in step skip rows
+# whose parent is marked here; receivers on the parent adjust the counters
+# once for the whole cascade instead. Marks are set in the parent's
+# pre_delete and removed in its post_delete, which Django sends after the
+# dependent rows are gone.
+
+_local = threading.local()
+
+
+def _marks():
+    if not hasattr(_local, 'marks'):
+        _local.marks = {}
+    return _local.marks
+
+
+def _key(model, pk):
+    return (model._meta.label, str(pk))
+
+
+def start(model, pk, data=None):
+    """Mark ``model`` row ``pk`` as being deleted, keeping ``data`` for finish()"""
+    _marks()[_key(model, pk)] = data
+
+
+def finish(model, pk):
+    """Clear the mark and return the data given to start()"""
+    return _marks().pop(_key(model, pk), None)
+
+
+def deleting(model, pk):
+    return _key(model, pk) in _marks()
@@ -0,0 +1,99 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from core import cache
+
+# Catalogue responses (modules, quiz durations, question quantities, optional
+# pairs) are cached whole under version counters that signals bump on every
+# change. The ETag is derived from the versions, so a client revalidating an
+# unchanged catalogue gets a 304 without a database query or serialization.
+CATALOGUE = "catalogue"
+MODULE_STATS = "module_stats"
+
+RESPONSE_KEY = "catalogue_response:{etag}"
+
+# Counters moved by quiz traffic (attempts, top scores) do not bump a version,
+# listings showing them change ETag once per bucket of this many seconds
+STATS_BUCKET_SECONDS = 60
+
+
+def version(name=CATALOGUE):
+    return cache.version(cache.CATALOGUE, name)
+
+
+def bump(name=CATALOGUE):
+    """Invalidate every response cached under ``name`` once the transaction commits"""
+    cache.bump(cache.CATALOGUE, name)
+
+
+def stats_bucket():
+    return int(time.time() // STATS_BUCKET_SECONDS)
+
+
+def etag_for(request, names, variant=""):
+    """Strong ETag for ``request`` under the current versions of ``names``"""
+    versions = ":".join(str(version(name)) for name in names)
+    digest = hashlib.sha1(f"{request.get_full_path()}|{versions}|{variant}".encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def not_modified(request, etag):
+    tags = parse_etags(request.headers.get("If-None-Match", ""))
+    # If-None-Match uses weak comparison
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def json_response(body, etag):
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    # clients may keep the body but must revalidate it before use
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def cached_response(request, etag, build, timeout=DEFAULT_TIMEOUT):
+    """304 if the client holds ``etag``, else the cached body, else ``build()`` rendered and cached
+
+    ``build`` returns the response data, or a DRF Response which is only
+    cached when it is a 200.
+    """
+    if not_modified(request, etag):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    key = RESPONSE_KEY.format(etag=etag)
+    body = cache.lookup(cache.CATALOGUE, key)
+    if body is None:
+        data = build()
+        if hasattr(data, "status_code"):
+            if data.status_code != 200:
+                return data
+            data = data.data
+        body = JSONRenderer().render(data)
+        caches[cache.CATALOGUE].set(key, body, timeout)
+
+    return json_response(body, etag)
+
+
+class CatalogueCacheMixin:
+    """Serve GET from a response cached under the catalogue versions, with ETag/304"""
+    catalogue_versions = (CATALOGUE,)
+    # set on listings that show live counters, see STATS_BUCKET_SECONDS
+    live_stats = False
+
+    def get(self, request, *args, **kwargs):
+        build = super().get
+        if self.live_stats:
+            etag = etag_for(request, self.catalogue_versions, variant=stats_bucket())
+            timeout = 2 * STATS_BUCKET_SECONDS
+        else:
+            etag = etag_for(request, self.catalogue_versions)
+            timeout = DEFAULT_TIMEOUT
+        return cached_response(request, etag, lambda: build(request, *args, **kwargs), timeout)
@@ -0,0 +1,155 @@
+import json
+import random
+
+from django.db import transaction
+
+from core import cache
+
+from .models import Questions
+
+# question ids per module, kept in the quiz-decks cache under a content version
+# and mirrored in process memory so a warm draw never touches the database
+VERSION_NAME = "question_version:{module_id}"
+DECK_KEY = "question_deck:{module_id}:{version}"
+PAYLOAD_KEY = "question_fragments:{module_id}:{version}"
+
+_local_decks = {}
+_local_payloads = {}
+
+
+def content_version(module_id):
+    """Current content version of a module's question set"""
+    return cache.version(cache.QUIZ_DECKS, VERSION_NAME.format(module_id=module_id))
+
+
+def invalidate(module_id):
+    """Bump the module's content version once the current transaction commits"""
+    def forget():
+        _local_decks.pop(str(module_id), None)
+        _local_payloads.pop(str(module_id), None)
+
+    cache.bump(cache.QUIZ_DECKS, VERSION_NAME.format(module_id=module_id))
+    transaction.on_commit(forget)
+
+
+def get_deck(module_id):
+    """List of question ids for a module in display order"""
+    module_id = str(module_id)
+    version = content_version(module_id)
+
+    local = _local_decks.get(module_id)
+    if local and local[0] == version:
+        return local[1]
+
+    def load():
+        return [
+            str(pk) for pk in Questions.objects.filter(module_id=module_id)
+            .order_by('order')
+            .values_list('id', flat=True)
+        ]
+
+    key = DECK_KEY.format(module_id=module_id, version=version)
+    ids = cache.get_or_compute(cache.QUIZ_DECKS, key, load)
+
+    _local_decks[module_id] = (version, ids)
+    return ids
+
+
+def draw(module_ids, quantity=None):
+    """Random permutation of the combined decks, cut to ``quantity`` if given"""
+    module_ids = list(module_ids)
+    if len(module_ids) == 1:
+        # sample straight from the cached list, it is never mutated
+        ids = get_deck(module_ids[0])
+    else:
+        ids = []
+        for module_id in module_ids:
+            ids.extend(get_deck(module_id))
+
+    k = len(ids) if quantity is None else min(quantity, len(ids))
+    return random.sample(ids, k)
+
+
+def encode_question(question, with_answer=True):
+    """JSON fragment for one question, same shape as student QuestionSerializer"""
+    data = {
+        "id": str(question["id"]),
+        "question_text": question["question_text"],
+        "options": {
+            "option1": question["option1"],
+            "option2": question["option2"],
+            "option3": question["option3"],
+            "option4": question["option4"],
+        },
+    }
+    if with_answer:
+        data["correct_answer"] = question["correct_answer"]
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def get_payload(module_id):
+    """Mapping of question id to ``(fragment, fragment without the answer, correct answer)``"""
+    module_id = str(module_id)
+    version = content_version(module_id)
+
+    local = _local_payloads.get(module_id)
+    if local and local[0] == version:
+        return local[1]
+
+    def load():
+        questions = Questions.objects.filter(module_id=module_id).values(
+            "id", "question_text", "option1", "option2", "option3", "option4", "correct_answer"
+        )
+        return {
+            str(question["id"]): (
+                encode_question(question),
+                encode_question(question, with_answer=False),
+                question["correct_answer"],
+            )
+            for question in questions
+        }
+
+    key = PAYLOAD_KEY.format(module_id=module_id, version=version)
+    fragments = cache.get_or_compute(cache.QUIZ_DECKS, key, load)
+
+    _local_payloads[module_id] = (version, fragments)
+    return fragments
+
+
+def render_questions(question_ids, module_ids, with_answers=True):
+    """Stitch cached fragments into a JSON array, in the order of ``question_ids``
+
+    Returns the encoded array and the ids it contains. Ids missing from the
+    payload (deleted since the deck was drawn) are skipped.
+    """
+    payloads = [get_payload(module_id) for module_id in module_ids]
+    variant = 0 if with_answers else 1
+
+    parts = []
+    served = []
+    for pk in question_ids:
+        for fragments in payloads:
+            if pk in fragments:
+                parts.append(fragments[pk][variant])
+                served.append(pk)
+                break
+
+    return "[" + ",".join(parts) + "]", served
+
+
+def answer_key(question_ids, module_id):
+    """``{question id: correct answer}`` for ``question_ids``
+
+    Answers come from the module's cached payload; questions from other
+    modules (synoptic quizzes) are looked up in one query.
+    """
+    fragments = get_payload(module_id)
+    key = {pk: fragments[pk][2] for pk in question_ids if pk in fragments}
+
+    missing = [pk for pk in question_ids if pk not in key]
+    if missing:
+        key.update(
+            (str(pk), answer) for pk, answer in
+            Questions.objects.filter(id__in=missing).values_list("id", "correct_answer")
+        )
+    return key
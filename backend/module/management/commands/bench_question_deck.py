@@ -0,0 +1,105 @@
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import cache
+from module import decks
+from module.models import Module, Questions
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare ORDER BY random() question selection with the cached question deck"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='10000,100000,1000000',
+            help="Comma separated question counts per module"
+        )
+        parser.add_argument('--quantity', type=int, default=20, help="Questions drawn per quiz")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per measurement")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        quantity = options['quantity']
+        repeat = options['repeat']
+
+        self.stdout.write(
+            f"{'questions':>10} {'order_by(?)':>14} {'deck cold':>12} "
+            f"{'deck warm':>12} {'deck warm N':>12}"
+        )
+
+        # everything is created inside a transaction that is rolled back at the
+        # end, and the decks cached for it are deleted
+        module = None
+        try:
+            with transaction.atomic():
+                module = Module.objects.create(module_name="bench-question-deck")
+                created = 0
+                for size in sizes:
+                    self.fill(module, created, size)
+                    created = size
+                    self.stdout.write(self.measure(module, size, quantity, repeat))
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            if module is not None:
+                self.drop_cached(module)
+
+    def drop_cached(self, module):
+        """Delete the module's deck, payload and version from the cache"""
+        version = decks.content_version(module.id)
+        caches[cache.QUIZ_DECKS].delete_many([
+            decks.DECK_KEY.format(module_id=module.id, version=version),
+            decks.PAYLOAD_KEY.format(module_id=module.id, version=version),
+            cache.VERSION_KEY.format(name=decks.VERSION_NAME.format(module_id=module.id)),
+        ])
+
+    def fill(self, module, start, stop, batch_size=5000):
+        for offset in range(start, stop, batch_size):
+            Questions.objects.bulk_create([
+                Questions(
+                    module=module,
+                    question_text=f"Question {i}",
+                    option1="a",
+                    option2="b",
+                    option3="c",
+                    option4="d",
+                    correct_answer=Questions.AnswerChoice.OPTION_1,
+                    order=i + 1,
+                )
+                for i in range(offset, min(offset + batch_size, stop))
+            ])
+
+    def measure(self, module, size, quantity, repeat):
+        def timed(func):
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                func()
+                elapsed = (time.perf_counter() - started) * 1000
+                best = elapsed if best is None else min(best, elapsed)
+            return best
+
+        def legacy():
+            questions = Questions.objects.filter(module=module).order_by("?")
+            list(questions.values_list("id", flat=True))
+            questions.count()
+
+        def cold():
+            decks._local_decks.clear()
+            self.drop_cached(module)
+            decks.draw([module.id])
+
+        return (
+            f"{size:>10} {timed(legacy):>12.1f}ms {timed(cold):>10.1f}ms "
+            f"{timed(lambda: decks.draw([module.id])):>10.1f}ms "
+            f"{timed(lambda: decks.draw([module.id], quantity)):>10.1f}ms"
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from module.models import Module
+from module.stats import rebuild_module_stats
+
+
+class Command(BaseCommand):
+    help = "Reconcile ModuleStats counters with QuizAttend and Questions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', help="Only rebuild the module with this slug")
+
+    def handle(self, *args, **options):
+        module_ids = None
+        if options['module']:
+            module_ids = list(Module.objects.filter(slug=options['module']).values_list('id', flat=True))
+            if not module_ids:
+                raise CommandError(f"No module with slug {options['module']}")
+
+        rebuilt = rebuild_module_stats(module_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} modules"))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import localdate
+
+from module.rollups import rebuild_daily
+
+
+class Command(BaseCommand):
+    help = "Recompute QuizAttendDaily rollups from QuizAttend, for all history by default"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Only rebuild the last N days, today included")
+
+    def handle(self, *args, **options):
+        start_day = None
+        if options['days']:
+            start_day = localdate() - timedelta(days=options['days'] - 1)
+        rebuild_daily(start_day=start_day)
+        self.stdout.write(self.style.SUCCESS("QuizAttendDaily rebuilt"))
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily(apps, schema_editor):
+    QuizAttend = apps.get_model('module', 'QuizAttend')
+    QuizAttendDaily = apps.get_model('module', 'QuizAttendDaily')
+
+    rows = (
+        QuizAttend.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'module_id', 'student_id')
+        .annotate(
+            attempt_count=Count('id'),
+            attempted_sum=Sum('attempted_questions'),
+            correct_sum=Sum('correct_answers'),
+            score_sum=Sum('score'),
+            xp_sum=Sum('xp_gained'),
+            score_max=Max('score'),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(QuizAttendDaily(
+            day=row['day'],
+            module_id=row['module_id'],
+            student_id=row['student_id'],
+            attempts=row['attempt_count'],
+            attempted_questions=row['attempted_sum'] or 0,
+            correct_answers=row['correct_sum'] or 0,
+            score=row['score_sum'] or 0,
+            xp_gained=row['xp_sum'] or 0,
+            top_score=row['score_max'] or 0,
+        ))
+        if len(batch) >= 2000:
+            QuizAttendDaily.objects.bulk_create(batch)
+            batch = []
+    QuizAttendDaily.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0008_quizattend_attempted_questions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizAttendDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('attempted_questions', models.PositiveIntegerField(default=0)),
+                ('correct_answers', models.PositiveIntegerField(default=0)),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('xp_gained', models.PositiveIntegerField(default=0)),
+                ('top_score', models.PositiveIntegerField(default=0)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='module.module')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['module', 'day'], name='module_quiz_module__a1cad0_idx'), models.Index(fields=['student', 'day'], name='module_quiz_student_2332fb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'module', 'student'), name='unique_quiz_attend_daily')],
+            },
+        ),
+        migrations.RunPython(backfill_daily, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0009_quizattenddaily'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattend',
+            index=models.Index(fields=['student', '-created_at', '-id'], name='quizattend_student_recent'),
+        ),
+    ]
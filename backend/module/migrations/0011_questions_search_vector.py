@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:17
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({row}question_text, '')), 'A') ||
+    setweight(to_tsvector('simple', concat_ws(' ', {row}option1, {row}option2, {row}option3, {row}option4)), 'B')
+"""
+
+FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION module_questions_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := %s;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """ % VECTOR_SQL.format(row="NEW."),
+    """
+    CREATE TRIGGER module_questions_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF question_text, option1, option2, option3, option4
+    ON module_questions
+    FOR EACH ROW EXECUTE FUNCTION module_questions_search_vector_update()
+    """,
+    "UPDATE module_questions SET search_vector = %s" % VECTOR_SQL.format(row=""),
+    "CREATE INDEX module_questions_search_vector_gin ON module_questions USING gin (search_vector)",
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS module_questions_search_vector_gin",
+    "DROP TRIGGER IF EXISTS module_questions_search_vector_trigger ON module_questions",
+    "DROP FUNCTION IF EXISTS module_questions_search_vector_update()",
+]
+
+
+def run_postgres_sql(statements):
+    # the trigger and GIN index only exist on Postgres, module.search falls back elsewhere
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0010_quizattend_student_recent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='questions',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_postgres_sql(FORWARD_SQL), run_postgres_sql(BACKWARD_SQL)),
+    ]
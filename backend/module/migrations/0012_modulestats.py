@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_module_stats(apps, schema_editor):
+    Module = apps.get_model('module', 'Module')
+    ModuleStats = apps.get_model('module', 'ModuleStats')
+    Questions = apps.get_model('module', 'Questions')
+    QuizAttend = apps.get_model('module', 'QuizAttend')
+
+    questions = dict(
+        Questions.objects.values('module').annotate(count=Count('id')).values_list('module', 'count')
+    )
+    attempts = {
+        row['module']: row
+        for row in QuizAttend.objects.values('module').annotate(count=Count('id'), top=Max('score'))
+    }
+
+    ModuleStats.objects.bulk_create([
+        ModuleStats(
+            module_id=module_id,
+            question_count=questions.get(module_id, 0),
+            attempt_count=attempts.get(module_id, {}).get('count', 0),
+            top_score=attempts.get(module_id, {}).get('top') or 0,
+        )
+        for module_id in Module.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0011_questions_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModuleStats',
+            fields=[
+                ('module', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='module.module')),
+                ('question_count', models.PositiveIntegerField(default=0)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('top_score', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_module_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0012_modulestats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattend',
+            name='answers',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.AddField(
+            model_name='quizattend',
+            name='served_questions',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0013_quizattend_session'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='module.questions')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quizattend',
+            name='stats_counted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='quizattend',
+            index=models.Index(condition=models.Q(('stats_counted', False), ('grade__isnull', False), models.Q(('served_questions', b''), _negated=True)), fields=['created_at'], name='quizattend_stats_pending'),
+        ),
+        migrations.AddField(
+            model_name='questionstats',
+            name='module',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats', to='module.module'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0016_quizattend_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='is_placeholder',
+            field=models.BooleanField(default=False, help_text='Only records attempts spanning several modules, hidden from listings'),
+        ),
+    ]
@@ -1,4 +1,7 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
@@ -25,6 +28,25 @@ class QuestionQuantity(models.Model):
     quantity = models.PositiveIntegerField(unique=True)
 
 
+class ModuleQuerySet(models.QuerySet):
+    def listed(self):
+        """Modules students pick from, without the placeholders attempts are recorded against"""
+        return self.filter(is_placeholder=False)
+
+    def with_listing_stats(self):
+        """Annotate everything ModuleSerializer shows from the ModuleStats row, in the same query"""
+        pairs = OptionModulesPair.objects.filter(
+            Q(module_a=OuterRef('pk')) | Q(module_b=OuterRef('pk'))
+        )
+
+        return self.annotate(
+            questions_count=Coalesce(F('stats__question_count'), 0),
+            top_score=Coalesce(F('stats__top_score'), 0),
+            attended=Coalesce(F('stats__attempt_count'), 0),
+            is_optional=Exists(pairs),
+        )
+
+
 class Module(models.Model):
     id = models.UUIDField(
         primary_key=True,
@@ -34,6 +56,12 @@ class Module(models.Model):
     )
     module_name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True, null=True)
+    is_placeholder = models.BooleanField(
+        default=False,
+        help_text="Only records attempts spanning several modules, hidden from listings"
+    )
+
+    objects = ModuleQuerySet.as_manager()
 
     def __str__(self):
         return self.module_name
@@ -83,6 +111,8 @@ class Questions(models.Model):
         blank=True, null=True,
         help_text="Display order within the module"
     )
+    # maintained by a database trigger on Postgres, see module.search
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         constraints = [
@@ -165,7 +195,95 @@ class QuizAttend(models.Model):
     score = models.PositiveIntegerField(default=0)
     grade = models.CharField(max_length=5, blank=True, null=True)
 
+    # session quizzes, see module.answers: the served question ids as packed
+    # 16-byte UUIDs and a 2-bit result code per served question
+    served_questions = models.BinaryField(blank=True, default=b'')
+    answers = models.BinaryField(blank=True, default=b'')
+    # set once module.question_stats has counted the answers of a finished session
+    stats_counted = models.BooleanField(default=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # attempt history pages, newest first
+            models.Index(fields=['student', '-created_at', '-id'], name='quizattend_student_recent'),
+            # day ranges rebuilt by module.rollups
+            models.Index(fields=['created_at'], name='quizattend_created'),
+            models.Index(
+                fields=['created_at'],
+                condition=Q(stats_counted=False) & Q(grade__isnull=False) & ~Q(served_questions=b''),
+                name='quizattend_stats_pending',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.module}"
+
+
+class QuizAttendDaily(models.Model):
+    """QuizAttend totals per (day, module, student), maintained by module.rollups"""
+    day = models.DateField()
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='daily_rollups')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_daily_rollups')
+
+    attempts = models.PositiveIntegerField(default=0)
+    attempted_questions = models.PositiveIntegerField(default=0)
+    correct_answers = models.PositiveIntegerField(default=0)
+    score = models.PositiveIntegerField(default=0)
+    xp_gained = models.PositiveIntegerField(default=0)
+    top_score = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'module', 'student'],
+                name='unique_quiz_attend_daily'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['module', 'day']),
+            models.Index(fields=['student', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.module} ({self.day})"
+
+
+class ModuleStats(models.Model):
+    """Per-module counters behind the module list, kept up to date by module.stats"""
+    module = models.OneToOneField(
+        Module,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    question_count = models.PositiveIntegerField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)
+    top_score = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.module}"
+
+
+class QuestionStats(models.Model):
+    """Running answer counts per question, kept up to date by module.question_stats"""
+    question = models.OneToOneField(
+        Questions,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='question_stats')
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.question}"
+
+    @property
+    def difficulty(self):
+        """Share of attempts answered wrong, smoothed towards 0.5 for few attempts"""
+        return 1 - (self.correct + 1) / (self.attempts + 2)
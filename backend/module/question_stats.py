@@ -0,0 +1,82 @@
+import uuid
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import cache
+
+from . import answers
+from .models import Questions, QuestionStats, QuizAttend
+
+# QuestionStats is folded forward in batches from finished session attempts.
+# Each attempt is counted once: the batch marks it stats_counted in the same
+# transaction that adds its answers, so a crashed run is simply retried.
+
+VERSION_NAME = "question_stats:{module_id}"
+
+PENDING = Q(stats_counted=False) & Q(grade__isnull=False) & ~Q(served_questions=b"")
+
+
+def stats_version(module_id):
+    """Changes whenever the module's QuestionStats do"""
+    return cache.version(cache.QUIZ_DECKS, VERSION_NAME.format(module_id=module_id))
+
+
+def update_batch(batch_size=5000):
+    """Count the answers of up to ``batch_size`` pending attempts; returns how many were counted"""
+    with transaction.atomic():
+        quizzes = list(
+            QuizAttend.objects.select_for_update(skip_locked=True)
+            .filter(PENDING)
+            .order_by("created_at")
+            .values_list("id", "served_questions", "answers")[:batch_size]
+        )
+        if not quizzes:
+            return 0
+
+        totals = answers.tally((served, codes) for _, served, codes in quizzes)
+        question_ids = [uuid.UUID(bytes=key) for key in totals]
+        # deleted questions drop out here
+        modules = dict(Questions.objects.filter(id__in=question_ids).values_list("id", "module_id"))
+
+        existing = QuestionStats.objects.select_for_update().in_bulk(list(modules))
+        now = timezone.now()
+        created, updated = [], []
+        for key, (attempt_count, correct_count) in totals.items():
+            question_id = uuid.UUID(bytes=key)
+            if question_id not in modules:
+                continue
+            stats = existing.get(question_id)
+            if stats is None:
+                created.append(QuestionStats(
+                    question_id=question_id,
+                    module_id=modules[question_id],
+                    attempts=attempt_count,
+                    correct=correct_count,
+                ))
+            else:
+                stats.attempts += attempt_count
+                stats.correct += correct_count
+                stats.updated_at = now
+                updated.append(stats)
+
+        QuestionStats.objects.bulk_create(created, batch_size=1000)
+        QuestionStats.objects.bulk_update(updated, ["attempts", "correct", "updated_at"], batch_size=1000)
+        QuizAttend.objects.filter(id__in=[pk for pk, _, _ in quizzes]).update(stats_counted=True)
+
+        for module_id in set(modules.values()):
+            cache.bump(cache.QUIZ_DECKS, VERSION_NAME.format(module_id=module_id))
+
+    return len(quizzes)
+
+
+def update_question_stats(batch_size=5000, max_batches=20):
+    """Run batches until nothing is pending or ``max_batches`` ran; returns attempts counted"""
+    counted = 0
+    for _ in range(max_batches):
+        done = update_batch(batch_size)
+        counted += done
+        if done < batch_size:
+            break
+    return counted
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Greatest, TruncDate
+from django.utils.timezone import localdate, make_aware
+
+from .models import QuizAttend, QuizAttendDaily
+
+# QuizAttendDaily is kept in step with QuizAttend by applying deltas in the
+# transaction that changed the attempt; rebuild_daily() recomputes a range of
+# days from the raw rows and is run periodically to repair any drift.
+
+
+def apply_delta(day, module_id, student_id, top_score=0, **deltas):
+    """Add ``deltas`` (field -> change) to one rollup row, creating it if needed"""
+    QuizAttendDaily.objects.bulk_create(
+        [QuizAttendDaily(day=day, module_id=module_id, student_id=student_id)],
+        ignore_conflicts=True,
+    )
+
+    updates = {field: F(field) + change for field, change in deltas.items() if change}
+    if top_score:
+        updates['top_score'] = Greatest(F('top_score'), top_score)
+    if updates:
+        QuizAttendDaily.objects.filter(
+            day=day, module_id=module_id, student_id=student_id
+        ).update(**updates)
+
+
+def record_quiz_start(quiz):
+    apply_delta(localdate(quiz.created_at), quiz.module_id, quiz.student_id, attempts=1)
+
+
+def record_quiz_result(quiz, previous):
+    """Apply a finished attempt; ``previous`` holds its values before the finish"""
+    record_quiz_results([(quiz, previous)])
+
+
+def record_quiz_results(changes):
+    """Apply ``[(quiz, previous), ...]`` finished attempts, one update per affected rollup row"""
+    fields = ('attempted_questions', 'correct_answers', 'score', 'xp_gained')
+    totals = defaultdict(lambda: dict.fromkeys(fields, 0))
+    top_scores = defaultdict(int)
+    for quiz, previous in changes:
+        key = (localdate(quiz.created_at), quiz.module_id, quiz.student_id)
+        for field in fields:
+            totals[key][field] += getattr(quiz, field) - previous[field]
+        top_scores[key] = max(top_scores[key], quiz.score)
+
+    for (day, module_id, student_id), deltas in totals.items():
+        apply_delta(day, module_id, student_id, top_score=top_scores[(day, module_id, student_id)], **deltas)
+
+
+def record_xp_changes(changes):
+    """Apply ``[(quiz, xp_delta), ...]``, one update per affected rollup row"""
+    totals = defaultdict(int)
+    for quiz, xp_delta in changes:
+        totals[(localdate(quiz.created_at), quiz.module_id, quiz.student_id)] += xp_delta
+
+    for (day, module_id, student_id), xp_delta in totals.items():
+        apply_delta(day, module_id, student_id, xp_gained=xp_delta)
+
+
+def start_of_day(day):
+    """Aware datetime of midnight starting ``day`` in the current timezone"""
+    return make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_daily(start_day=None, end_day=None):
+    """Recompute rollup rows for days in [start_day, end_day] (all history by default)"""
+    # attempts are selected by a created_at range so the index can serve it
+    attempts = QuizAttend.objects.all()
+    rollups = QuizAttendDaily.objects.all()
+    if start_day:
+        attempts = attempts.filter(created_at__gte=start_of_day(start_day))
+        rollups = rollups.filter(day__gte=start_day)
+    if end_day:
+        attempts = attempts.filter(created_at__lt=start_of_day(end_day + timedelta(days=1)))
+        rollups = rollups.filter(day__lte=end_day)
+    attempts = attempts.annotate(day=TruncDate('created_at'))
+
+    rows = (
+        attempts
+        .values('day', 'module_id', 'student_id')
+        .annotate(
+            attempt_count=Count('id'),
+            attempted_sum=Sum('attempted_questions'),
+            correct_sum=Sum('correct_answers'),
+            score_sum=Sum('score'),
+            xp_sum=Sum('xp_gained'),
+            score_max=Max('score'),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        rollups.delete()
+
+        batch = []
+        for row in rows.iterator(chunk_size=2000):
+            batch.append(QuizAttendDaily(
+                day=row['day'],
+                module_id=row['module_id'],
+                student_id=row['student_id'],
+                attempts=row['attempt_count'],
+                attempted_questions=row['attempted_sum'] or 0,
+                correct_answers=row['correct_sum'] or 0,
+                score=row['score_sum'] or 0,
+                xp_gained=row['xp_sum'] or 0,
+                top_score=row['score_max'] or 0,
+            ))
+            if len(batch) >= 2000:
+                QuizAttendDaily.objects.bulk_create(batch)
+                batch = []
+        QuizAttendDaily.objects.bulk_create(batch)
+
+
+def repair_recent(days):
+    """Rebuild the last ``days`` days, today included"""
+    rebuild_daily(start_day=localdate() - timedelta(days=days - 1))
@@ -0,0 +1,111 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+
+from . import decks
+from .models import Questions
+
+# Postgres keeps Questions.search_vector current with a trigger (see migration
+# 0011), so saves and bulk imports are indexed without extra queries. Other
+# databases use an in-process inverted index rebuilt when the module's deck
+# content version changes. Both use the 'simple' configuration: lowercased
+# words, no stemming, and every search term matches as a prefix.
+SEARCH_CONFIG = "simple"
+TOKEN_RE = re.compile(r"\w+")
+
+# same weights as the trigger: question text 'A', options 'B'
+FIELD_WEIGHTS = {
+    "question_text": 1.0,
+    "option1": 0.4,
+    "option2": 0.4,
+    "option3": 0.4,
+    "option4": 0.4,
+}
+
+_local_indexes = {}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def search_questions(queryset, module_id, text):
+    """Filter ``queryset`` to questions matching every word of ``text``, annotated with ``rank``"""
+    terms = tokenize(text)
+    if not terms:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    if connection.vendor == "postgresql":
+        # terms are \w+ only, so they are safe to join into a raw tsquery
+        query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+
+    scores = get_index(module_id).search(terms)
+    return queryset.filter(id__in=scores).annotate(
+        rank=Case(
+            *[When(id=pk, then=Value(score)) for pk, score in scores.items()],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+class InvertedIndex:
+    """Token -> {question id: weight} for one module, with prefix lookups"""
+
+    def __init__(self, rows):
+        postings = defaultdict(lambda: defaultdict(float))
+        for row in rows:
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(row[field]):
+                    postings[token][row["id"]] += weight
+
+        self.postings = {token: dict(weights) for token, weights in postings.items()}
+        self.tokens = sorted(self.postings)
+
+    def prefix_matches(self, term):
+        """Combined weights of every token starting with ``term``"""
+        weights = defaultdict(float)
+        index = bisect_left(self.tokens, term)
+        while index < len(self.tokens) and self.tokens[index].startswith(term):
+            for pk, weight in self.postings[self.tokens[index]].items():
+                weights[pk] += weight
+            index += 1
+        return weights
+
+    def search(self, terms):
+        """Question ids matching all ``terms`` mapped to their summed weight"""
+        scores = None
+        for term in terms:
+            matches = self.prefix_matches(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {pk: scores[pk] + weight for pk, weight in matches.items() if pk in scores}
+            if not scores:
+                return {}
+        return dict(scores)
+
+
+def get_index(module_id):
+    module_id = str(module_id)
+    version = decks.content_version(module_id)
+
+    local = _local_indexes.get(module_id)
+    if local and local[0] == version:
+        return local[1]
+
+    rows = Questions.objects.filter(module_id=module_id).values("id", *FIELD_WEIGHTS)
+    index = InvertedIndex(rows)
+    _local_indexes[module_id] = (version, index)
+    return index
@@ -28,19 +28,30 @@ class ModuleSerializer(serializers.ModelSerializer):
             'attended',
         )
 
+    # Listings use Module.objects.with_listing_stats(), the queries below
+    # only run for instances that were not loaded through it
+
     def get_is_optional(self, obj):
+        if hasattr(obj, 'is_optional'):
+            return obj.is_optional
         return OptionModulesPair.objects.filter(
             Q(module_a=obj) | Q(module_b=obj)
         ).exists()
 
     def get_questions_count(self, obj):
+        if hasattr(obj, 'questions_count'):
+            return obj.questions_count
         return obj.questions.count()
 
     def get_top_score(self, obj):
+        if hasattr(obj, 'top_score'):
+            return obj.top_score
         top = QuizAttend.objects.filter(module=obj).order_by('-score').first()
         return top.score if top else 0
 
     def get_attended(self, obj):
+        if hasattr(obj, 'attended'):
+            return obj.attended
         return QuizAttend.objects.filter(module=obj).count()
 
 
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import CustomTime, Module, OptionModulesPair, QuestionQuantity, Questions, QuizAttend
+from . import cascades, catalogue, decks, stats
+
+User = get_user_model()
+
+
+@receiver(pre_delete, sender=Module)
+def start_module_cascade(sender, instance, **kwargs):
+    # the module's stats row goes with it, nothing to count per row, and its
+    # deck is dropped once rather than once per question
+    cascades.start(Module, instance.pk)
+    decks.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=Module)
+def finish_module_cascade(sender, instance, **kwargs):
+    cascades.finish(Module, instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def start_user_cascade(sender, instance, **kwargs):
+    module_ids = list(
+        QuizAttend.objects.filter(student=instance).order_by().values_list('module_id', flat=True).distinct()
+    )
+    cascades.start(User, instance.pk, module_ids)
+
+
+@receiver(post_delete, sender=User)
+def finish_user_cascade(sender, instance, **kwargs):
+    # the student's attempts are gone now, recount their modules once
+    module_ids = cascades.finish(User, instance.pk)
+    if module_ids:
+        stats.rebuild_module_stats(module_ids)
+
+
+@receiver(post_save, sender=Questions)
+def invalidate_question_deck(sender, instance, **kwargs):
+    decks.invalidate(instance.module_id)
+
+
+@receiver(post_delete, sender=Questions)
+def invalidate_deleted_question_deck(sender, instance, **kwargs):
+    if not cascades.deleting(Module, instance.module_id):
+        decks.invalidate(instance.module_id)
+
+
+@receiver(post_save, sender=Questions)
+def count_created_question(sender, instance, created, **kwargs):
+    if created:
+        stats.record_questions(instance.module_id, 1)
+
+
+@receiver(post_delete, sender=Questions)
+def count_deleted_question(sender, instance, **kwargs):
+    if not cascades.deleting(Module, instance.module_id):
+        stats.record_questions(instance.module_id, -1)
+
+
+@receiver(post_save, sender=Module)
+def create_module_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.apply_delta(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Module)
+@receiver([post_save, post_delete], sender=CustomTime)
+@receiver([post_save, post_delete], sender=QuestionQuantity)
+@receiver([post_save, post_delete], sender=OptionModulesPair)
+def bump_catalogue_version(sender, instance, **kwargs):
+    catalogue.bump()
+
+
+@receiver(post_delete, sender=QuizAttend)
+def count_deleted_attempt(sender, instance, **kwargs):
+    if not (cascades.deleting(Module, instance.module_id) or cascades.deleting(User, instance.student_id)):
+        stats.record_quiz_deleted(instance)
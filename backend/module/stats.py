@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from . import catalogue
+from .models import Module, ModuleStats, QuizAttend, Questions
+
+# ModuleStats is kept in step by applying deltas in the transaction that
+# created the attempt or question; rebuild_module_stats() recomputes rows
+# from QuizAttend and Questions and is run by the rebuild_module_stats command,
+# and for the modules a deleted student had attempted.
+
+
+# moved by quiz traffic, these reach listings through catalogue.stats_bucket
+# rather than a MODULE_STATS bump
+LIVE_COUNTERS = ('attempt_count', 'top_score')
+
+
+def apply_delta(module_id, top_score=0, create=True, **deltas):
+    """Add ``deltas`` (field -> change) to a module's stats row, creating it if needed
+
+    Deletions pass ``create=False``: during a cascade the row may already be
+    gone along with its module, and decrements never go below zero.
+    """
+    if create:
+        ModuleStats.objects.bulk_create([ModuleStats(module_id=module_id)], ignore_conflicts=True)
+
+    updates = {
+        field: F(field) + change if change > 0 else Greatest(F(field) + change, 0)
+        for field, change in deltas.items() if change
+    }
+    if top_score:
+        updates['top_score'] = Greatest(F('top_score'), top_score)
+    if not updates:
+        return
+
+    rows = ModuleStats.objects.filter(module_id=module_id)
+    if set(updates) == {'top_score'}:
+        # nothing to write unless it is a new top score
+        rows = rows.filter(top_score__lt=top_score)
+    if rows.update(**updates) and any(field not in LIVE_COUNTERS for field in updates):
+        catalogue.bump(catalogue.MODULE_STATS)
+
+
+def record_quiz_start(quiz):
+    apply_delta(quiz.module_id, attempt_count=1)
+
+
+def record_quiz_result(quiz):
+    apply_delta(quiz.module_id, top_score=quiz.score)
+
+
+def record_quiz_results(quizzes):
+    """Apply many finished attempts, one update per module"""
+    top_scores = {}
+    for quiz in quizzes:
+        top_scores[quiz.module_id] = max(top_scores.get(quiz.module_id, 0), quiz.score)
+    for module_id, top_score in top_scores.items():
+        apply_delta(module_id, top_score=top_score)
+
+
+def record_quiz_deleted(quiz):
+    # top_score is left as is, the reconcile command recomputes it
+    apply_delta(quiz.module_id, create=False, attempt_count=-1)
+
+
+def record_questions(module_id, count):
+    """Account for ``count`` questions added to (or removed from, if negative) a module"""
+    apply_delta(module_id, create=count > 0, question_count=count)
+
+
+def rebuild_module_stats(module_ids=None):
+    """Recompute ModuleStats from QuizAttend and Questions, for every module by default"""
+    questions = Questions.objects.filter(module=OuterRef('pk')).order_by().values('module')
+    attempts = QuizAttend.objects.filter(module=OuterRef('pk')).order_by().values('module')
+
+    modules = Module.objects.annotate(
+        question_total=Coalesce(Subquery(questions.annotate(count=Count('id')).values('count')), 0),
+        attempt_total=Coalesce(Subquery(attempts.annotate(count=Count('id')).values('count')), 0),
+        score_max=Coalesce(Subquery(attempts.annotate(top=Max('score')).values('top')), 0),
+    )
+    if module_ids is not None:
+        modules = modules.filter(id__in=module_ids)
+
+    rows = [
+        ModuleStats(
+            module_id=module.id,
+            question_count=module.question_total,
+            attempt_count=module.attempt_total,
+            top_score=module.score_max,
+        )
+        for module in modules.only('id')
+    ]
+    with transaction.atomic():
+        ModuleStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['module'],
+            update_fields=['question_count', 'attempt_count', 'top_score', 'updated_at'],
+        )
+        catalogue.bump(catalogue.MODULE_STATS)
+    return len(rows)
@@ -0,0 +1,102 @@
+import heapq
+import random
+import threading
+import time
+
+from django.core.cache import caches
+from django.db.models import Max, Sum
+from django.utils.timezone import localdate
+
+from core import cache
+
+from . import catalogue
+from .models import Module, QuizAttendDaily
+from .serializers import ModuleSerializer
+
+# Next-module suggestions after a finished quiz. Module ids and their listing
+# representations are held in process memory per catalogue version, so
+# picking k suggestions costs O(k) plus the student's own modules. Those are
+# ranked from a briefly cached per-module aggregate of the daily rollups.
+
+SUGGESTIONS = 3
+
+# the listing counters shown in suggestions may lag by this many seconds
+CARDS_TTL = 60
+
+AGGREGATES_KEY = "suggestion_aggregates:{student_id}"
+
+# a module is suggested back to the student below this smoothed accuracy,
+# or once it has not been attempted for IDLE_DAYS
+WEAK_ACCURACY = 0.7
+IDLE_DAYS = 7
+
+_local = None
+_local_lock = threading.Lock()
+
+
+def _catalogue():
+    """``(ids, cards)``: every module id and its ModuleSerializer data, for the current catalogue"""
+    global _local
+    version = catalogue.version()
+    local = _local
+    if local and local[0] == version and local[1] > time.monotonic():
+        return local[2], local[3]
+
+    with _local_lock:
+        local = _local
+        if local and local[0] == version and local[1] > time.monotonic():
+            return local[2], local[3]
+
+        modules = Module.objects.listed().with_listing_stats().order_by('module_name')
+        cards = {data['id']: dict(data) for data in ModuleSerializer(modules, many=True).data}
+        ids = tuple(cards)
+        _local = (version, time.monotonic() + CARDS_TTL, ids, cards)
+        return ids, cards
+
+
+def student_aggregates(student_id):
+    """``{module_id: (attempted, correct, last_day)}`` over the student's rollups, cached in the stats alias"""
+    key = AGGREGATES_KEY.format(student_id=student_id)
+    aggregates = cache.lookup(cache.STATS, key)
+    if aggregates is None:
+        aggregates = {
+            str(row['module_id']): (row['attempted'] or 0, row['correct'] or 0, row['last_day'])
+            for row in QuizAttendDaily.objects.filter(student_id=student_id)
+            .values('module_id')
+            .annotate(attempted=Sum('attempted_questions'), correct=Sum('correct_answers'), last_day=Max('day'))
+            .order_by()
+        }
+        caches[cache.STATS].set(key, aggregates)
+    return aggregates
+
+
+def suggest(student_id, exclude_module_id=None, k=SUGGESTIONS, rng=random, today=None):
+    """Listing data of up to ``k`` modules for the student to attempt next
+
+    Modules the student is weak at or has left idle come first, weakest and
+    then least recent; the rest are drawn at random from the catalogue.
+    """
+    ids, cards = _catalogue()
+    exclude = str(exclude_module_id)
+    today = today or localdate()
+
+    due = []
+    for module_id, (attempted, correct, last_day) in student_aggregates(student_id).items():
+        if module_id == exclude or module_id not in cards:
+            continue
+        accuracy = (correct + 1) / (attempted + 2)
+        if accuracy < WEAK_ACCURACY or (today - last_day).days >= IDLE_DAYS:
+            due.append((accuracy, last_day, module_id))
+    picked = [module_id for _, _, module_id in heapq.nsmallest(k, due)]
+
+    # drawing as many extra ids as could be rejected still leaves k to choose from
+    taken = set(picked)
+    taken.add(exclude)
+    for module_id in rng.sample(ids, min(len(ids), k + len(taken))):
+        if len(picked) >= k:
+            break
+        if module_id not in taken:
+            picked.append(module_id)
+            taken.add(module_id)
+
+    return [cards[module_id] for module_id in picked]
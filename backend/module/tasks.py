@@ -0,0 +1,26 @@
+from celery import shared_task
+
+import logging
+
+from . import question_stats
+from .rollups import rebuild_daily, repair_recent
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def repair_quiz_attend_daily(days=3):
+    repair_recent(days)
+    logger.info(f"QuizAttendDaily rebuilt for the last {days} days")
+
+
+@shared_task
+def backfill_quiz_attend_daily():
+    rebuild_daily()
+    logger.info("QuizAttendDaily rebuilt from full QuizAttend history")
+
+
+@shared_task
+def update_question_stats(batch_size=5000):
+    counted = question_stats.update_question_stats(batch_size=batch_size)
+    logger.info(f"QuestionStats updated from {counted} finished attempts")
@@ -1,3 +1,517 @@
-from django.test import TestCase
+import random
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.timezone import localdate
+from rest_framework.test import APIClient
+
+from core.testing import QueryProfileAssertionsMixin
+
+from . import adaptive, answers as codes
+from . import decks, question_stats, rollups, search, stats, suggestions
+from .models import (
+    Module, ModuleStats, Questions, OptionModulesPair, QuestionStats, QuizAttend, QuizAttendDaily,
+)
+
+User = get_user_model()
+
+
+class ModuleListQueryCountTest(QueryProfileAssertionsMixin, TestCase):
+    def setUp(self):
+        # catalogue responses and versions live in the cache, not the test database
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_module(self, name, questions=2, attempts=2):
+        # run the on_commit version bumps a real request would trigger
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.create_module(name, questions, attempts)
+
+    def create_module(self, name, questions, attempts):
+        module = Module.objects.create(module_name=name)
+        for i in range(questions):
+            Questions.objects.create(
+                module=module,
+                question_text=f"{name} question {i}",
+                option1='a', option2='b', option3='c', option4='d',
+                correct_answer='option1',
+            )
+        self.add_attempts(module, [score * 10 for score in range(attempts)])
+        return module
+
+    def add_attempts(self, module, scores):
+        with self.captureOnCommitCallbacks(execute=True):
+            for score in scores:
+                # record like the quiz views do, the listing reads the maintained counters
+                quiz = QuizAttend.objects.create(
+                    student=self.user, module=module, total_questions=1, score=score
+                )
+                stats.record_quiz_start(quiz)
+                stats.record_quiz_result(quiz)
+
+    def list_modules(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/student/module-list/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results'], len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_modules(self):
+        first = self.add_module('Algebra')
+        _, single_module_queries = self.list_modules()
+
+        second = self.add_module('Biology', questions=3, attempts=1)
+        for i in range(3):
+            self.add_module(f'Chemistry {i}')
+        with self.captureOnCommitCallbacks(execute=True):
+            OptionModulesPair.objects.create(module_a=first, module_b=second, pair_number=1)
+
+        results, many_module_queries = self.list_modules()
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(single_module_queries, many_module_queries)
+
+    def test_listing_stats_values(self):
+        algebra = self.add_module('Algebra', questions=3, attempts=2)
+        biology = self.add_module('Biology', questions=0, attempts=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            OptionModulesPair.objects.create(module_a=algebra, module_b=biology, pair_number=1)
+        self.add_module('Chemistry', questions=1, attempts=0)
+
+        results, _ = self.list_modules()
+        by_name = {row['module_name']: row for row in results}
+
+        self.assertEqual(by_name['Algebra']['questions_count'], 3)
+        self.assertEqual(by_name['Algebra']['top_score'], 10)
+        self.assertEqual(by_name['Algebra']['attended'], 2)
+        self.assertTrue(by_name['Algebra']['is_optional'])
+        self.assertTrue(by_name['Biology']['is_optional'])
+        self.assertEqual(by_name['Biology']['top_score'], 0)
+        self.assertFalse(by_name['Chemistry']['is_optional'])
+
+    def test_listing_does_not_repeat_queries_per_module(self):
+        for name in ('Algebra', 'Biology', 'Chemistry'):
+            self.add_module(name)
+
+        with self.assertQueryProfile(max_similar=1):
+            self.list_modules()
+
+    def test_unchanged_catalogue_returns_not_modified(self):
+        self.add_module('Algebra')
+        response = self.client.get('/student/module-list/')
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/student/module-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 0)
+
+        self.add_module('Biology')
+        response = self.client.get('/student/module-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    @mock.patch('module.catalogue.stats_bucket', return_value=1)
+    def test_quiz_traffic_keeps_listing_cached(self, _):
+        algebra = self.add_module('Algebra')
+        etag = self.client.get('/student/module-list/')['ETag']
+
+        self.add_attempts(algebra, [50, 0])
+        response = self.client.get('/student/module-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Questions.objects.create(
+                module=algebra, question_text="new", option1='a', option2='b',
+                option3='c', option4='d', correct_answer='option1',
+            )
+        response = self.client.get('/student/module-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['top_score'], 50)
+
+    @override_settings(QUERY_PROFILER={'ENABLED': True})
+    def test_profiler_reports_server_timing(self):
+        self.add_module('Algebra')
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertLogs('core.queries', level='INFO') as logs:
+            response = client.get('/student/module-list/')
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('queries', response['Server-Timing'])
+        self.assertEqual(logs.records[0].query_profile['view'], 'module.views.CreateModuleView')
+
+
+class SuggestionTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.modules = [Module.objects.create(module_name=name) for name in ('A', 'B', 'C', 'D', 'E')]
+
+    def test_weak_modules_first_and_current_excluded(self):
+        today = localdate()
+        current, strong, weak = self.modules[:3]
+        for module, correct in ((current, 2), (strong, 10), (weak, 3)):
+            QuizAttendDaily.objects.create(
+                day=today, module=module, student=self.user, attempts=1,
+                attempted_questions=10, correct_answers=correct,
+            )
+
+        suggested = [card['id'] for card in suggestions.suggest(self.user.id, current.id)]
+
+        self.assertEqual(len(suggested), 3)
+        self.assertEqual(suggested[0], str(weak.id))
+        self.assertNotIn(str(current.id), suggested)
+        self.assertEqual(len(set(suggested)), 3)
+
+        with CaptureQueriesContext(connection) as context:
+            suggestions.suggest(self.user.id, current.id)
+        self.assertEqual(len(context.captured_queries), 0)
+
+
+class RollupTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.modules = [Module.objects.create(module_name=name) for name in ('A', 'B')]
+        for module in self.modules:
+            for i in range(4):
+                Questions.objects.create(
+                    module=module, question_text=f"question {i}",
+                    option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+                )
+
+    def play(self, module, correct, refinish=None):
+        quiz_id = self.client.post(
+            '/student/quiz-start/', {'module_id': str(module.id)}, format='json'
+        ).json()['quiz_id']
+        self.client.post('/student/quiz-finish/', {'quiz_id': quiz_id, 'correct': correct, 'attempted': 4}, format='json')
+        if refinish is not None:
+            self.client.post('/student/quiz-finish/', {'quiz_id': quiz_id, 'correct': refinish, 'attempted': 4}, format='json')
+        return quiz_id
+
+    def snapshot(self):
+        return sorted(QuizAttendDaily.objects.values_list(
+            'day', 'module_id', 'student_id', 'attempts', 'attempted_questions',
+            'correct_answers', 'score', 'xp_gained', 'top_score',
+        ))
+
+    def test_incremental_deltas_match_rebuild(self):
+        self.play(self.modules[0], 3)
+        self.play(self.modules[0], 1, refinish=4)
+        self.play(self.modules[1], 2)
+        self.client.post('/student/quiz-start/', {'module_id': str(self.modules[1].id)}, format='json')
+
+        incremental = self.snapshot()
+        rollups.rebuild_daily()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_rebuild_range_keeps_other_days(self):
+        old = self.play(self.modules[0], 3)
+        QuizAttend.objects.filter(id=old).update(created_at=timezone.now() - timedelta(days=3))
+        rollups.rebuild_daily()
+        self.play(self.modules[0], 2)
+        before = self.snapshot()
+
+        QuizAttendDaily.objects.filter(day=localdate()).update(score=0)
+        rollups.rebuild_daily(start_day=localdate(), end_day=localdate())
+        self.assertEqual(before, self.snapshot())
+
+
+class ModuleStatsCascadeTest(TestCase):
+    """Cascading deletes leave ModuleStats as a rebuild would, in work that does not grow per row"""
+
+    def setUp(self):
+        self.modules = [Module.objects.create(module_name=name) for name in ('A', 'B')]
+
+    def populate(self, attempts):
+        student = User.objects.create_user(email=f'student{attempts}@example.com', password='pass', is_active=True)
+        for module in self.modules:
+            for i in range(attempts):
+                Questions.objects.create(
+                    module=module, question_text=f"question {i}",
+                    option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+                )
+                QuizAttend.objects.create(
+                    student=student, module=module, total_questions=4, attempted_questions=4,
+                    correct_answers=i % 5, score=i,
+                )
+        stats.rebuild_module_stats()
+        return student
+
+    def snapshot(self):
+        return sorted(ModuleStats.objects.values_list('module_id', 'question_count', 'attempt_count', 'top_score'))
+
+    def count_queries(self, instance):
+        """Queries and on_commit callbacks a delete takes"""
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            instance.delete()
+        return len(queries), len(callbacks)
+
+    def test_user_delete(self):
+        few = self.count_queries(self.populate(2))
+        many = self.count_queries(self.populate(20))
+        self.assertEqual(few, many)
+
+        after = self.snapshot()
+        stats.rebuild_module_stats()
+        self.assertEqual(after, self.snapshot())
+        self.assertEqual({row[2] for row in after}, {0})
+
+    def test_module_delete(self):
+        self.populate(2)
+        few = self.count_queries(self.modules.pop())
+        self.populate(20)
+        module = self.modules.pop(0)
+        version = decks.content_version(module.id)
+        many = self.count_queries(module)
+        self.assertEqual(few, many)
+        self.assertFalse(ModuleStats.objects.exists())
+        # the deck is still invalidated, once
+        self.assertNotEqual(decks.content_version(module.id), version)
+
+
+class AnswerCodesTest(SimpleTestCase):
+    """Packed question ids and 2-bit result codes"""
+
+    IDS = ['0b6f0f1e-8f0a-4c55-9a3e-1d2c3b4a5f60', '1c7a2e3f-4b5d-4e6f-8a9b-0c1d2e3f4a5b',
+           '2d8b3f40-5c6e-4f70-9bac-1d2e3f405b6c', '3e9c4051-6d7f-4081-acbd-2e3f40516c7d',
+           '4fad5162-7e80-4192-bdce-3f4051627d8e']
+
+    def test_ids_round_trip(self):
+        blob = codes.pack_ids(self.IDS)
+        self.assertEqual(len(blob), len(self.IDS) * codes.ID_SIZE)
+        self.assertEqual(codes.id_count(blob), len(self.IDS))
+        self.assertEqual(codes.unpack_ids(memoryview(blob)), self.IDS)
+        self.assertEqual(codes.unpack_ids(b''), [])
+
+    def test_codes_round_trip(self):
+        results = [codes.CORRECT, codes.WRONG, codes.SKIPPED, codes.UNANSWERED, codes.CORRECT]
+        packed = bytearray(codes.empty_codes(len(results)))
+        self.assertEqual(len(packed), 2)
+        self.assertEqual(codes.unpack_codes(packed, len(results)), [codes.UNANSWERED] * len(results))
+
+        for index, code in enumerate(results):
+            codes.set_code(packed, index, code)
+        self.assertEqual(codes.unpack_codes(bytes(packed), len(results)), results)
+        # the first question sits in the low bits
+        self.assertEqual(packed[0], 0b00_11_10_01)
+
+        # overwriting a code leaves its neighbours alone
+        codes.set_code(packed, 1, codes.CORRECT)
+        codes.set_code(packed, 4, codes.SKIPPED)
+        self.assertEqual(
+            codes.unpack_codes(packed, len(results)),
+            [codes.CORRECT, codes.CORRECT, codes.SKIPPED, codes.UNANSWERED, codes.SKIPPED],
+        )
+        self.assertEqual(codes.count_codes(packed, len(results)), (2, 0, 2))
+
+    def test_tally(self):
+        first = bytearray(codes.empty_codes(3))
+        for index, code in enumerate([codes.CORRECT, codes.WRONG, codes.SKIPPED]):
+            codes.set_code(first, index, code)
+        second = bytearray(codes.empty_codes(2))
+        codes.set_code(second, 0, codes.WRONG)
+
+        rows = [
+            (codes.pack_ids(self.IDS[:3]), bytes(first)),
+            # the last question was never answered
+            (memoryview(codes.pack_ids(self.IDS[:2])), bytes(second)),
+        ]
+        totals = codes.tally(rows)
+        self.assertEqual(
+            {str(uuid.UUID(bytes=key)): counts for key, counts in totals.items()},
+            {self.IDS[0]: [2, 1], self.IDS[1]: [1, 0]},
+        )
+        # folding more rows into existing totals
+        self.assertEqual(codes.tally(rows[:1], totals)[uuid.UUID(self.IDS[0]).bytes], [3, 2])
+
+
+class AdaptiveSamplingTest(SimpleTestCase):
+    def test_fenwick_find(self):
+        tree = adaptive.FenwickTree([3, 0, 2, 5])
+        self.assertEqual(tree.total(), 10)
+        # a zero weight is never found
+        self.assertEqual([tree.find(value) for value in range(10)], [0, 0, 0, 2, 2, 3, 3, 3, 3, 3])
+
+        tree.add(3, -5)
+        self.assertEqual(tree.total(), 5)
+        self.assertEqual(tree.find(4), 2)
+        self.assertEqual(adaptive.FenwickTree([]).total(), 0)
+
+    def test_sample_without_replacement(self):
+        sampler = adaptive.ModuleSampler(['a', 'b', 'c', 'd'], [1, 2, 3, 4])
+        tree = list(sampler.tree.tree)
+        rng = random.Random(1)
+        for k in (1, 3, 4, 10):
+            picked = sampler.sample(k, rng)
+            self.assertEqual(len(picked), min(k, 4))
+            self.assertEqual(len(set(picked)), len(picked))
+            # the shared tree is restored after every draw
+            self.assertEqual(sampler.tree.tree, tree)
+
+    def test_sample_follows_weights(self):
+        sampler = adaptive.ModuleSampler(['easy', 'hard'], [adaptive.question_weight(0), 20 * adaptive.WEIGHT_SCALE])
+        rng = random.Random(2)
+        draws = [sampler.sample(1, rng)[0] for _ in range(1000)]
+        self.assertGreater(draws.count('hard'), 950)
+        self.assertGreater(draws.count('easy'), 0)
+
+    def test_draw_splits_by_module_weight(self):
+        samplers = {
+            'strong': adaptive.ModuleSampler(['s1', 's2', 's3'], [500] * 3),
+            'weak': adaptive.ModuleSampler(['w1', 'w2'], [500] * 2),
+        }
+        with mock.patch('module.adaptive.get_sampler', side_effect=samplers.get):
+            picked = adaptive.draw(
+                ['strong', 'weak'], 3, module_weights={'strong': 0.01, 'weak': 100}, rng=random.Random(3)
+            )
+            # every weak question is taken before the strong module is drawn from
+            self.assertTrue({'w1', 'w2'} <= set(picked))
+            self.assertEqual(len(set(picked)), 3)
+            self.assertEqual(sorted(adaptive.draw(['strong', 'weak'], None)), ['s1', 's2', 's3', 'w1', 'w2'])
+
+
+class QuestionStatsTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.student = User.objects.create_user(email='student@example.com', password='pass', is_active=True)
+        self.module = Module.objects.create(module_name='Algebra')
+        self.questions = [
+            str(Questions.objects.create(
+                module=self.module, question_text=f"question {i}",
+                option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+            ).id)
+            for i in range(3)
+        ]
+
+    def finished(self, results, grade='A'):
+        packed = bytearray(codes.empty_codes(len(results)))
+        for index, code in enumerate(results):
+            codes.set_code(packed, index, code)
+        return QuizAttend.objects.create(
+            student=self.student, module=self.module, total_questions=len(results), grade=grade,
+            served_questions=codes.pack_ids(self.questions[:len(results)]), answers=bytes(packed),
+        )
+
+    def test_update_batch_counts_each_attempt_once(self):
+        self.finished([codes.CORRECT, codes.WRONG, codes.SKIPPED])
+        self.finished([codes.WRONG, codes.CORRECT])
+        # not finished yet
+        self.finished([codes.CORRECT], grade=None)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(question_stats.update_batch(batch_size=1), 1)
+            self.assertEqual(question_stats.update_batch(), 1)
+            self.assertEqual(question_stats.update_batch(), 0)
+
+        counts = {
+            str(row.question_id): (row.attempts, row.correct) for row in QuestionStats.objects.all()
+        }
+        self.assertEqual(counts, {self.questions[0]: (2, 1), self.questions[1]: (2, 1)})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.finished([codes.CORRECT])
+            self.assertEqual(question_stats.update_question_stats(), 1)
+        first = QuestionStats.objects.get(question_id=self.questions[0])
+        self.assertEqual((first.attempts, first.correct), (3, 2))
+
+    def test_sampler_weights_follow_stats(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(4):
+                self.finished([codes.CORRECT, codes.WRONG])
+            question_stats.update_batch()
+
+        sampler = adaptive.get_sampler(self.module.id)
+        weights = dict(zip(sampler.question_ids, sampler.weights))
+        stats = {str(row.question_id): row for row in QuestionStats.objects.all()}
+        self.assertEqual(weights[self.questions[0]], adaptive.question_weight(stats[self.questions[0]].difficulty))
+        self.assertLess(weights[self.questions[0]], weights[self.questions[2]])
+        self.assertLess(weights[self.questions[2]], weights[self.questions[1]])
+
+
+class InvertedIndexTest(SimpleTestCase):
+    ROWS = [
+        {'id': 1, 'question_text': 'Longest river in Africa', 'option1': 'Nile', 'option2': 'Congo',
+         'option3': 'Niger', 'option4': 'Zambezi'},
+        {'id': 2, 'question_text': 'Capital of Niger', 'option1': 'Niamey', 'option2': 'Abuja',
+         'option3': 'Accra', 'option4': 'Dakar'},
+        {'id': 3, 'question_text': 'Which river flows through Cairo', 'option1': 'Nile', 'option2': 'Tigris',
+         'option3': 'Jordan', 'option4': 'Euphrates'},
+    ]
+
+    def test_every_term_matches_as_a_prefix(self):
+        index = search.InvertedIndex(self.ROWS)
+        self.assertEqual(set(index.search(['riv'])), {1, 3})
+        self.assertEqual(set(index.search(['riv', 'nil'])), {1, 3})
+        self.assertEqual(set(index.search(['riv', 'cai'])), {3})
+        self.assertEqual(index.search(['riv', 'dakar']), {})
+        self.assertEqual(index.search(['zzz']), {})
+
+    def test_question_text_outranks_options(self):
+        scores = search.InvertedIndex(self.ROWS).search(search.tokenize('NIGER'))
+        self.assertEqual(set(scores), {1, 2})
+        self.assertGreater(scores[2], scores[1])
+        # 'ni' also matches Nile and Niamey in the options
+        scores = search.InvertedIndex(self.ROWS).search(['ni'])
+        self.assertAlmostEqual(scores[2], 1.0 + 0.4)
+        self.assertAlmostEqual(scores[1], 0.4 * 2)
+
+
+class QuestionSearchTest(TestCase):
+    """Search on the question list, through the trigger on Postgres and the inverted index elsewhere"""
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        admin = User.objects.create_user(email='admin@example.com', password='pass', is_active=True, is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+        self.module = Module.objects.create(module_name='Rivers')
+        with self.captureOnCommitCallbacks(execute=True):
+            for row in InvertedIndexTest.ROWS:
+                Questions.objects.create(
+                    module=self.module, correct_answer='option2' if row['id'] == 2 else 'option1',
+                    **{field: row[field] for field in search.FIELD_WEIGHTS},
+                )
+
+    def search(self, text):
+        response = self.client.get('/module/question/', {'module': str(self.module.id), 'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [question['question_text'] for question in response.json()['results']]
+
+    def test_ranked_prefix_search(self):
+        self.assertEqual(self.search('niger'), ['Capital of Niger', 'Longest river in Africa'])
+        self.assertEqual(self.search('riv cai'), ['Which river flows through Cairo'])
+        self.assertEqual(self.search('!!'), [])
+
+    def test_answer_key_search(self):
+        self.assertEqual(self.search('option2'), ['Capital of Niger'])
+
+    def test_index_follows_edits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.search('tigris'), ['Which river flows through Cairo'])
+            Questions.objects.filter(question_text__startswith='Which').first().delete()
+        self.assertEqual(self.search('tigris'), [])
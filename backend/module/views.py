@@ -3,7 +3,7 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import generics, status, permissions
 
-from django.db.models import Q
+from core.pagination import KeysetPagination, KeysetPaginationMixin
 
 from .models import (
     Module,
@@ -19,11 +19,16 @@ from .serializers import (
     QuestionQuantitySerializer,
     OptionModulesPairSerializer,
 )
+from .catalogue import CATALOGUE, MODULE_STATS, CatalogueCacheMixin
+from .search import search_questions
 
-class CreateModuleView(generics.ListCreateAPIView):
+class CreateModuleView(CatalogueCacheMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ModuleSerializer
-    queryset = Module.objects.all().order_by('module_name')
+    # the listing shows question and attempt counters as well
+    catalogue_versions = (CATALOGUE, MODULE_STATS)
+    live_stats = True
+    queryset = Module.objects.listed().with_listing_stats().order_by('module_name')
 
 class DeleteModuleView(generics.DestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
@@ -37,28 +42,28 @@ class DeleteModuleView(generics.DestroyAPIView):
         return Response({"msg": "module deleted"}, status=status.HTTP_200_OK)
 
     
-class CreateQuestionView(generics.ListCreateAPIView):
+class CreateQuestionView(KeysetPaginationMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     serializer_class = QuestionSerializer
+    keyset_ordering = ('order', 'id')
     
     def get_queryset(self):
         module_id = self.request.query_params.get('module')
         if not module_id:
             raise ValidationError({"module": "This query parameter is required."})
 
-        search = self.request.query_params.get('search', '')
+        search = self.request.query_params.get('search', '').strip()
 
-        queryset = Questions.objects.filter(module_id=module_id)
+        queryset = Questions.objects.filter(module_id=module_id).defer('search_vector')
+
+        if search in Questions.AnswerChoice.values:
+            return queryset.filter(correct_answer=search).order_by('order')
 
         if search:
-            queryset = queryset.filter(
-                Q(question_text__icontains=search) |
-                Q(option1__icontains=search) |
-                Q(option2__icontains=search) |
-                Q(option3__icontains=search) |
-                Q(option4__icontains=search) |
-                Q(correct_answer__icontains=search)
-            )
+            if isinstance(self.paginator, KeysetPagination):
+                # the cursor would re-sort by keyset_ordering and lose the relevance ranking
+                raise ValidationError({"search": "Text search cannot be combined with cursor pagination."})
+            return search_questions(queryset, module_id, search).order_by('-rank', 'order')
 
         return queryset.order_by('order')
     # def get_queryset(self):
@@ -80,17 +85,17 @@ class CreateQuestionView(generics.ListCreateAPIView):
         serializer.save(module=module)
 
 
-class CustomTimeView(generics.ListCreateAPIView):
+class CustomTimeView(CatalogueCacheMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = CustomTimeSerializer
     queryset = CustomTime.objects.all()
 
-class QuestionQuantityView(generics.ListCreateAPIView):
+class QuestionQuantityView(CatalogueCacheMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     serializer_class = QuestionQuantitySerializer
     queryset = QuestionQuantity.objects.all()
 
-class OptionModulesPairView(generics.ListCreateAPIView):
+class OptionModulesPairView(CatalogueCacheMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     serializer_class = OptionModulesPairSerializer
     queryset = OptionModulesPair.objects.all()
@@ -1,3 +1,5 @@
 from django.contrib import admin
+from .models import StudentStats, ReviewItem
 
-# Register your models here.
+admin.site.register(StudentStats)
+admin.site.register(ReviewItem)
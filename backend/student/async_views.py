@@ -0,0 +1,163 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from core import cache
+from core.authentication import async_jwt_required
+from module import adaptive, catalogue, decks, suggestions
+from module.models import Module, QuestionQuantity
+from module.serializers import ModuleSerializer
+from module.views import CreateModuleView
+
+from . import stats
+from .models import StudentStats
+from .serializers import QuizAttendSerializer
+from .views import (
+    SESSION_MODES,
+    QuizFinishError,
+    create_attempt,
+    finish_quiz,
+    parse_question_quantity,
+    quiz_start_response,
+    student_stats_data,
+)
+
+# ASGI-native versions of the hot student endpoints, mounted under
+# student/async/ next to the DRF views they mirror. Single-row reads go
+# through the async ORM; transactional writes, the cache-backed deck helpers
+# and the listing's DRF paginator are shared with the sync views and run
+# through sync_to_async, since Django transactions are not available in
+# async code.
+
+NOT_FOUND = {"detail": "Not found."}
+
+
+def read_json(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def render(data, status=200):
+    """JSON response rendered the way DRF renders the sync views"""
+    return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=status)
+
+
+def bad_request(body):
+    return render(body, status=400)
+
+
+async def get_question_quantity(data):
+    """Async counterpart of student.views.get_question_quantity"""
+    quantity = parse_question_quantity(data.get("quantity"))
+    if quantity is not None and not await QuestionQuantity.objects.filter(quantity=quantity).aexists():
+        raise ValidationError({"quantity": "Invalid question quantity"})
+    return quantity
+
+
+@require_POST
+@async_jwt_required
+async def quiz_start(request):
+    """Start a quiz on one module, see QuizStartView"""
+    data = read_json(request)
+    if data is None:
+        return bad_request({"detail": "JSON object body required."})
+    if data.get("mode") == "review":
+        return bad_request({"error": "Review quizzes are started from student/quiz-start/"})
+
+    try:
+        module = await Module.objects.aget(id=data.get("module_id"))
+        quantity = await get_question_quantity(data)
+    except (Module.DoesNotExist, DjangoValidationError):
+        return render(NOT_FOUND, status=404)
+    except ValidationError as e:
+        return bad_request(e.detail)
+
+    if data.get("mode") == "adaptive":
+        question_ids = await sync_to_async(adaptive.draw)([module.id], quantity)
+    else:
+        question_ids = await sync_to_async(decks.draw)([module.id], quantity)
+
+    session = data.get("mode") in SESSION_MODES
+    questions_json, served = await sync_to_async(decks.render_questions)(
+        question_ids, [module.id], with_answers=not session
+    )
+    quiz = await sync_to_async(create_attempt)(request.user, module, served, session)
+    return quiz_start_response(quiz, False, questions_json)
+
+
+@require_POST
+@async_jwt_required
+async def quiz_finish(request):
+    """Grade an attempt and suggest modules to attend next, see QuizFinishView"""
+    data = read_json(request)
+    if data is None:
+        return bad_request({"detail": "JSON object body required."})
+
+    try:
+        quiz = await sync_to_async(finish_quiz)(request.user, data)
+    except (Http404, DjangoValidationError):
+        return render(NOT_FOUND, status=404)
+    except QuizFinishError as e:
+        return bad_request(e.body)
+
+    body = QuizAttendSerializer(quiz).data
+    body["attend_another_quiz"] = await sync_to_async(suggestions.suggest)(request.user.id, quiz.module_id)
+    return render(body)
+
+
+def module_page(request):
+    """The page of the module listing CreateModuleView would return, from the same paginator
+
+    Raises NotFound if the page is out of range.
+    """
+    paginator = CreateModuleView.pagination_class()
+    page = paginator.paginate_queryset(CreateModuleView.queryset.all(), Request(request))
+    return paginator.get_paginated_response(ModuleSerializer(page, many=True).data).data
+
+
+@require_GET
+@async_jwt_required
+async def module_list(request):
+    """Module listing with the catalogue ETag/304 handling of CreateModuleView"""
+    etag = await sync_to_async(catalogue.etag_for)(
+        request, (catalogue.CATALOGUE, catalogue.MODULE_STATS), variant=catalogue.stats_bucket()
+    )
+    if catalogue.not_modified(request, etag):
+        response = HttpResponseNotModified()
+        response["ETag"] = etag
+        return response
+
+    key = catalogue.RESPONSE_KEY.format(etag=etag)
+    body = await sync_to_async(cache.lookup)(cache.CATALOGUE, key)
+    if body is None:
+        try:
+            data = await sync_to_async(module_page)(request)
+        except NotFound as e:
+            return render({"detail": e.detail}, status=404)
+        body = JSONRenderer().render(data)
+        await caches[cache.CATALOGUE].aset(key, body, 2 * catalogue.STATS_BUCKET_SECONDS)
+
+    return catalogue.json_response(body, etag)
+
+
+@require_GET
+@async_jwt_required
+async def student_stats(request):
+    """The student's dashboard counters, see StudentStatsView"""
+    try:
+        student_stats = await StudentStats.objects.select_related("best_module").aget(student=request.user)
+    except StudentStats.DoesNotExist:
+        # no row yet, computed from the full history without saving one
+        student_stats = await sync_to_async(stats.compute_student_stats)(request.user)
+        return render(await sync_to_async(student_stats_data)(student_stats))
+    return render(student_stats_data(student_stats))
@@ -0,0 +1,244 @@
+from bisect import bisect_left, insort
+from functools import lru_cache
+import logging
+import threading
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+# Ranks follow the dashboard's long-standing rule: 1 + the number of
+# students with strictly more XP, so tied students share a rank.
+#
+# Reads go through read(), which answers from StudentStats while the
+# configured backend is unreachable or has not been loaded yet (deploy runs
+# rebuild_student_stats and then rebuild_leaderboard).
+
+logger = logging.getLogger(__name__)
+
+
+class BaseLeaderboard:
+    # exceptions meaning the backend is unavailable
+    errors = ()
+
+    def set_score(self, user_id, xp):
+        raise NotImplementedError
+
+    def set_many(self, scores):
+        for user_id, xp in scores:
+            self.set_score(user_id, xp)
+
+    def remove(self, user_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def score(self, user_id):
+        raise NotImplementedError
+
+    def rank_for_score(self, xp):
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def slice(self, start, stop):
+        """(user_id, xp) pairs at positions start..stop-1, highest XP first"""
+        raise NotImplementedError
+
+    def position(self, user_id):
+        """0-based position of the user in the ordering, None if absent"""
+        raise NotImplementedError
+
+    def rank(self, user_id):
+        xp = self.score(user_id)
+        if xp is None:
+            return None
+        return self.rank_for_score(xp)
+
+    def top(self, limit):
+        return self._ranked(self.slice(0, limit), start=0)
+
+    def around(self, user_id, radius):
+        """The user and up to ``radius`` neighbours on each side"""
+        position = self.position(user_id)
+        if position is None:
+            return []
+        start = max(0, position - radius)
+        return self._ranked(self.slice(start, position + radius + 1), start=start)
+
+    def _ranked(self, entries, start):
+        ranked = []
+        for index, (user_id, xp) in enumerate(entries):
+            if index == 0:
+                # ties may continue from before the slice
+                rank = 1 if start == 0 else self.rank_for_score(xp)
+            elif xp != entries[index - 1][1]:
+                # everything ahead of this position has strictly more XP
+                rank = start + index + 1
+            ranked.append({"rank": rank, "user_id": user_id, "xp": xp})
+        return ranked
+
+
+class RedisLeaderboard(BaseLeaderboard):
+    """Sorted set keyed by user id, every lookup is O(log n)"""
+
+    def __init__(self, url, key="leaderboard:xp"):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.key = key
+        self.errors = (redis.RedisError,)
+
+    def set_score(self, user_id, xp):
+        self.client.zadd(self.key, {str(user_id): xp})
+
+    def set_many(self, scores, batch_size=10000):
+        pipe = self.client.pipeline(transaction=False)
+        batch = {}
+        for user_id, xp in scores:
+            batch[str(user_id)] = xp
+            if len(batch) >= batch_size:
+                pipe.zadd(self.key, batch)
+                pipe.execute()
+                batch = {}
+        if batch:
+            pipe.zadd(self.key, batch)
+            pipe.execute()
+
+    def remove(self, user_id):
+        self.client.zrem(self.key, str(user_id))
+
+    def clear(self):
+        self.client.delete(self.key)
+
+    def score(self, user_id):
+        xp = self.client.zscore(self.key, str(user_id))
+        return None if xp is None else int(xp)
+
+    def rank_for_score(self, xp):
+        return self.client.zcount(self.key, f"({xp}", "+inf") + 1
+
+    def count(self):
+        return self.client.zcard(self.key)
+
+    def slice(self, start, stop):
+        if stop <= start:
+            return []
+        entries = self.client.zrevrange(self.key, start, stop - 1, withscores=True)
+        return [(user_id, int(xp)) for user_id, xp in entries]
+
+    def position(self, user_id):
+        return self.client.zrevrank(self.key, str(user_id))
+
+
+class MemoryLeaderboard(BaseLeaderboard):
+    """In-process fallback for tests and single-process development"""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._scores = {}
+        self._order = []  # sorted (-xp, user_id)
+
+    def set_score(self, user_id, xp):
+        user_id = str(user_id)
+        with self._lock:
+            self._discard(user_id)
+            self._scores[user_id] = xp
+            insort(self._order, (-xp, user_id))
+
+    def set_many(self, scores):
+        with self._lock:
+            self._scores.update((str(user_id), xp) for user_id, xp in scores)
+            self._order = sorted((-xp, user_id) for user_id, xp in self._scores.items())
+
+    def remove(self, user_id):
+        with self._lock:
+            self._discard(str(user_id))
+
+    def _discard(self, user_id):
+        xp = self._scores.pop(user_id, None)
+        if xp is not None:
+            index = bisect_left(self._order, (-xp, user_id))
+            del self._order[index]
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+            self._order.clear()
+
+    def score(self, user_id):
+        return self._scores.get(str(user_id))
+
+    def rank_for_score(self, xp):
+        return bisect_left(self._order, (-xp,)) + 1
+
+    def count(self):
+        return len(self._order)
+
+    def slice(self, start, stop):
+        return [(user_id, -xp) for xp, user_id in self._order[start:stop]]
+
+    def position(self, user_id):
+        user_id = str(user_id)
+        xp = self._scores.get(user_id)
+        if xp is None:
+            return None
+        return bisect_left(self._order, (-xp, user_id))
+
+
+class DatabaseLeaderboard(BaseLeaderboard):
+    """Read-only view of StudentStats, the fallback of read()"""
+
+    def __init__(self):
+        from .models import StudentStats
+
+        self.stats = StudentStats.objects.all()
+
+    def set_score(self, user_id, xp):
+        pass
+
+    def remove(self, user_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def score(self, user_id):
+        return self.stats.filter(student_id=user_id).values_list('total_xp', flat=True).first()
+
+    def rank_for_score(self, xp):
+        return self.stats.filter(total_xp__gt=xp).count() + 1
+
+    def count(self):
+        return self.stats.count()
+
+    def slice(self, start, stop):
+        if stop <= start:
+            return []
+        entries = self.stats.order_by('-total_xp', 'student_id').values_list('student_id', 'total_xp')
+        return [(str(user_id), xp) for user_id, xp in entries[start:stop]]
+
+    def position(self, user_id):
+        xp = self.score(user_id)
+        if xp is None:
+            return None
+        return self.stats.filter(Q(total_xp__gt=xp) | Q(total_xp=xp, student_id__lt=user_id)).count()
+
+
+@lru_cache(maxsize=None)
+def get_leaderboard():
+    config = settings.LEADERBOARD
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def read(lookup):
+    """``lookup(leaderboard)``, answered from StudentStats if the leaderboard is down or empty"""
+    leaderboard = get_leaderboard()
+    try:
+        if leaderboard.count():
+            return lookup(leaderboard)
+    except leaderboard.errors:
+        logger.warning("Leaderboard unavailable, ranking from StudentStats", exc_info=True)
+    return lookup(DatabaseLeaderboard())
@@ -0,0 +1,122 @@
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from module.models import Module
+
+User = get_user_model()
+
+
+def percentile(latencies, fraction):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the student endpoints against running servers, comparing the "
+        "DRF views with their async versions under student/async/. Run the sync "
+        "views under a WSGI server (e.g. gunicorn core.wsgi) and the async ones "
+        "under ASGI (e.g. uvicorn core.asgi:application), or both under one server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--async-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--email', required=True, help="Student to send the requests as")
+        parser.add_argument('--module', help="Slug of the module to start quizzes on, defaults to the first")
+        parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint and server")
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            student = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+        modules = Module.objects.order_by('module_name')
+        if options['module']:
+            modules = modules.filter(slug=options['module'])
+        module = modules.first()
+        if module is None:
+            raise CommandError("No module to start quizzes on")
+
+        self.token = str(AccessToken.for_user(student))
+        self.module_id = str(module.id)
+        self.local = threading.local()
+
+        self.stdout.write(f"{'endpoint':<14} {'server':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name, prefix in (('module-list', 'module-list/'), ('student-state', 'student-state/'), ('quiz', None)):
+            for server, base, path in (
+                ('sync', options['sync_url'], '/student/'),
+                ('async', options['async_url'], '/student/async/'),
+            ):
+                if prefix:
+                    request = lambda conn, url=path + prefix: self.call(conn, 'GET', url)
+                else:
+                    request = lambda conn, path=path: self.quiz(conn, path)
+                self.run(name, server, base, request, options['requests'], options['concurrency'])
+
+    def connection(self, base):
+        """One keep-alive connection per worker thread and server"""
+        connections = getattr(self.local, 'connections', None)
+        if connections is None:
+            connections = self.local.connections = {}
+        if base not in connections:
+            parts = urlsplit(base)
+            connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+            connections[base] = connection_class(parts.hostname, parts.port, timeout=30)
+        return connections[base]
+
+    def call(self, conn, method, url, body=None):
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        conn.request(method, url, body=body, headers=headers)
+        response = conn.getresponse()
+        content = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{method} {url} returned {response.status}")
+        return content
+
+    def quiz(self, conn, path):
+        """Start a 10 question session quiz and finish it with every answer"""
+        started = json.loads(self.call(conn, 'POST', path + 'quiz-start/', {
+            'module_id': self.module_id, 'quantity': 10, 'mode': 'session',
+        }))
+        self.call(conn, 'POST', path + 'quiz-finish/', {
+            'quiz_id': started['quiz_id'],
+            'answers': [{'question_id': q['id'], 'answer': 'option1'} for q in started['questions']],
+        })
+
+    def run(self, name, server, base, request, count, concurrency):
+        def timed(_):
+            started = time.perf_counter()
+            try:
+                request(self.connection(base))
+            except (OSError, http.client.HTTPException, RuntimeError):
+                self.local.connections.pop(base).close()
+                return None
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(count)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency in results if latency is not None]
+        errors = count - len(latencies)
+        if not latencies:
+            self.stdout.write(f"{name:<14} {server:<6} {'-':>9} {'-':>9} {'-':>9} {errors:>7}")
+            return
+        self.stdout.write(
+            f"{name:<14} {server:<6} {len(latencies) / elapsed:>9.1f} "
+            f"{percentile(latencies, 0.5) * 1000:>9.2f} {percentile(latencies, 0.99) * 1000:>9.2f} {errors:>7}"
+        )
@@ -0,0 +1,53 @@
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+
+class Command(BaseCommand):
+    help = "Time leaderboard updates and lookups against a synthetic population"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000000)
+        parser.add_argument('--lookups', type=int, default=1000)
+        parser.add_argument(
+            '--backend',
+            default=settings.LEADERBOARD['BACKEND'],
+            help="Leaderboard class to benchmark"
+        )
+        parser.add_argument(
+            '--key',
+            default='leaderboard:bench',
+            help="Sorted set key used by the Redis backend, deleted afterwards"
+        )
+
+    def handle(self, *args, **options):
+        options_for_backend = dict(settings.LEADERBOARD.get('OPTIONS', {}))
+        options_for_backend['key'] = options['key']
+        leaderboard = import_string(options['backend'])(**options_for_backend)
+        leaderboard.clear()
+
+        students = [str(uuid.uuid4()) for _ in range(options['students'])]
+        sample = random.sample(students, min(options['lookups'], len(students)))
+
+        def timed(label, func, repeat=1):
+            started = time.perf_counter()
+            for i in range(repeat):
+                func(i)
+            elapsed = time.perf_counter() - started
+            per_op = elapsed / repeat * 1000
+            self.stdout.write(f"{label:<24} {elapsed:>9.2f}s total {per_op:>9.3f}ms/op")
+
+        try:
+            timed("load", lambda _: leaderboard.set_many(
+                (student, random.randint(0, 50000)) for student in students
+            ))
+            timed("set_score", lambda i: leaderboard.set_score(sample[i], random.randint(0, 50000)), len(sample))
+            timed("rank", lambda i: leaderboard.rank(sample[i]), len(sample))
+            timed("top 10", lambda _: leaderboard.top(10), len(sample))
+            timed("around +/-2", lambda i: leaderboard.around(sample[i], 2), len(sample))
+        finally:
+            leaderboard.clear()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from student.leaderboard import get_leaderboard
+from student.models import StudentStats
+
+
+class Command(BaseCommand):
+    help = "Reload the XP leaderboard from StudentStats"
+
+    def handle(self, *args, **options):
+        leaderboard = get_leaderboard()
+        leaderboard.clear()
+        leaderboard.set_many(
+            StudentStats.objects.values_list('student_id', 'total_xp').iterator(chunk_size=5000)
+        )
+        self.stdout.write(self.style.SUCCESS(f"Leaderboard holds {leaderboard.count()} students"))
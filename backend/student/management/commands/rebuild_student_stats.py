@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from student.stats import rebuild_student_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild StudentStats rows from the QuizAttend history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help="Only rebuild this student")
+
+    def handle(self, *args, **options):
+        students = User.objects.all()
+        if options['email']:
+            students = students.filter(email=options['email'])
+            if not students.exists():
+                raise CommandError(f"No user with email {options['email']}")
+
+        rebuilt = 0
+        for student in students.iterator(chunk_size=500):
+            rebuild_student_stats(student)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {rebuilt} students"))
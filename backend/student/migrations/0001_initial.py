@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('module', '0008_quizattend_attempted_questions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentStats',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_xp', models.IntegerField(default=0)),
+                ('attempt_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.PositiveBigIntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+                ('current_streak', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('best_module', models.ForeignKey(blank=True, help_text='Module the student attempted the most', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='module.module')),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0015_questionstats'),
+        ('student', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('interval_days', models.PositiveIntegerField(default=0)),
+                ('ease', models.FloatField(default=2.5)),
+                ('due_at', models.DateTimeField()),
+                ('last_reviewed_at', models.DateTimeField()),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='module.module')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='module.questions')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'due_at'], name='student_rev_student_dc841e_idx'), models.Index(fields=['student', 'module', 'due_at'], name='student_rev_student_7980b1_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'question'), name='unique_review_item')],
+            },
+        ),
+    ]
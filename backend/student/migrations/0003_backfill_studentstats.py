@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_stats(apps, schema_editor):
+    """Fill StudentStats the way student.stats.compute_student_stats() does, a few queries for all students"""
+    QuizAttend = apps.get_model('module', 'QuizAttend')
+    StudentStats = apps.get_model('student', 'StudentStats')
+
+    # the module each student attempted most
+    best = {}
+    counts = (
+        QuizAttend.objects.values('student_id', 'module_id')
+        .annotate(attempt_count=Count('id'))
+        .order_by('student_id', '-attempt_count')
+    )
+    for row in counts.iterator(chunk_size=2000):
+        best.setdefault(row['student_id'], row['module_id'])
+
+    # consecutive days ending at each student's most recent active day
+    streaks, expected = {}, {}
+    days = (
+        QuizAttend.objects.annotate(day=TruncDate('created_at'))
+        .values_list('student_id', 'day')
+        .distinct()
+        .order_by('student_id', '-day')
+    )
+    for student_id, day in days.iterator(chunk_size=2000):
+        if student_id not in streaks:
+            streaks[student_id] = 0
+        elif expected[student_id] != day:
+            continue
+        streaks[student_id] += 1
+        expected[student_id] = day - timedelta(days=1)
+
+    totals = (
+        QuizAttend.objects.values('student_id')
+        .annotate(
+            xp_sum=Sum('xp_gained'),
+            score_total=Sum('score'),
+            attempts=Count('id'),
+            latest=Max('created_at'),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in totals.iterator(chunk_size=2000):
+        batch.append(StudentStats(
+            student_id=row['student_id'],
+            total_xp=row['xp_sum'] or 0,
+            score_sum=row['score_total'] or 0,
+            attempt_count=row['attempts'],
+            last_activity=row['latest'],
+            current_streak=streaks.get(row['student_id'], 0),
+            best_module_id=best.get(row['student_id']),
+        ))
+        if len(batch) >= 2000:
+            # rows created on demand since 0001 are already current
+            StudentStats.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    StudentStats.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0017_module_is_placeholder'),
+        ('student', '0002_reviewitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
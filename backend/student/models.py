@@ -1,3 +1,65 @@
 from django.db import models
+from django.contrib.auth import get_user_model
+from module.models import Module, Questions
 
-# Create your models here.
+User = get_user_model()
+
+
+class StudentStats(models.Model):
+    """Per-student rollup of QuizAttend, kept up to date by student.stats"""
+    student = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    total_xp = models.IntegerField(default=0)
+    attempt_count = models.PositiveIntegerField(default=0)
+    score_sum = models.PositiveBigIntegerField(default=0)
+    last_activity = models.DateTimeField(blank=True, null=True)
+    current_streak = models.PositiveIntegerField(default=0)
+    best_module = models.ForeignKey(
+        Module,
+        on_delete=models.SET_NULL,
+        blank=True, null=True,
+        related_name='+',
+        help_text="Module the student attempted the most"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.student}"
+
+    @property
+    def average_score(self):
+        if not self.attempt_count:
+            return 0.0
+        return round(self.score_sum / self.attempt_count, 2)
+
+
+class ReviewItem(models.Model):
+    """Spaced-repetition state of one question for one student, scheduled by student.reviews"""
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='review_items')
+    question = models.ForeignKey(Questions, on_delete=models.CASCADE, related_name='+')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='+')
+
+    repetitions = models.PositiveIntegerField(default=0)
+    interval_days = models.PositiveIntegerField(default=0)
+    ease = models.FloatField(default=2.5)
+    due_at = models.DateTimeField()
+    last_reviewed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'question'],
+                name='unique_review_item'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['student', 'due_at']),
+            models.Index(fields=['student', 'module', 'due_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.question} (due {self.due_at})"
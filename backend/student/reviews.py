@@ -0,0 +1,131 @@
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+from module import answers as codes
+from module.models import Module, Questions
+
+from .models import ReviewItem
+
+# SM-2 scheduling of every question a student answered in a session quiz.
+# A finished attempt updates all of its questions with one read and two bulk
+# writes; review quizzes take the earliest due items from the
+# (student, due_at) index.
+
+REVIEW_SIZE = 20
+
+# cross-module review attempts are recorded against this placeholder module
+REVIEW_MODULE_ID = uuid.UUID('5e7f0c1a-2b4d-4c8e-9a61-3f0d2b7c9e15')
+
+# SM-2 response quality for the 2-bit result codes, skips are not scheduled
+QUALITY = {codes.CORRECT: 4, codes.WRONG: 1}
+
+
+def review_module():
+    return Module.objects.get_or_create(
+        id=REVIEW_MODULE_ID, defaults={'module_name': 'review', 'is_placeholder': True}
+    )[0]
+
+
+def next_state(repetitions, interval_days, ease, quality):
+    """SM-2 step: ``(repetitions, interval_days, ease)`` after an answer of ``quality`` (0-5)"""
+    if quality < 3:
+        repetitions, interval_days = 0, 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval_days = 1
+        elif repetitions == 2:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease)
+    ease = max(1.3, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return repetitions, interval_days, ease
+
+
+def schedule_attempt(quiz, now=None):
+    """Reschedule every answered question of a finished session quiz"""
+    schedule_attempts([quiz], now)
+
+
+def schedule_attempts(quizzes, now=None):
+    """Reschedule the answered questions of finished session quizzes, in order
+
+    A question answered in several of the quizzes takes one SM-2 step per
+    answer. All quizzes are read and written together.
+    """
+    now = now or timezone.now()
+    answered = []
+    for quiz in quizzes:
+        question_ids = codes.unpack_ids(quiz.served_questions)
+        results = codes.unpack_codes(quiz.answers, len(question_ids))
+        answered.extend(
+            (quiz.student_id, question_id, QUALITY[code])
+            for question_id, code in zip(question_ids, results) if code in QUALITY
+        )
+    if not answered:
+        return
+
+    items = {
+        (item.student_id, str(item.question_id)): item
+        for item in ReviewItem.objects.select_for_update().filter(
+            student_id__in={student_id for student_id, _, _ in answered},
+            question_id__in=list({question_id for _, question_id, _ in answered}),
+        )
+    }
+    # deleted questions are dropped, synoptic questions keep their own module
+    modules = {
+        str(pk): module_id
+        for pk, module_id in Questions.objects.filter(
+            id__in=list({question_id for student_id, question_id, _ in answered
+                         if (student_id, question_id) not in items})
+        ).values_list('id', 'module_id')
+    }
+
+    created, updated = {}, {}
+    for student_id, question_id, quality in answered:
+        key = (student_id, question_id)
+        item = items.get(key)
+        if item is None:
+            if question_id not in modules:
+                continue
+            item = items[key] = ReviewItem(
+                student_id=student_id,
+                question_id=question_id,
+                module_id=modules[question_id],
+            )
+            created[key] = item
+        elif key not in created:
+            updated[key] = item
+
+        item.repetitions, item.interval_days, item.ease = next_state(
+            item.repetitions, item.interval_days, item.ease, quality
+        )
+        item.due_at = now + timedelta(days=item.interval_days)
+        item.last_reviewed_at = now
+
+    ReviewItem.objects.bulk_create(created.values(), batch_size=500)
+    ReviewItem.objects.bulk_update(
+        updated.values(), ['repetitions', 'interval_days', 'ease', 'due_at', 'last_reviewed_at'], batch_size=500
+    )
+
+
+def due_items(student, limit, module_id=None, now=None):
+    """``[(question_id, module_id), ...]`` of the earliest due items, at most ``limit``"""
+    items = ReviewItem.objects.filter(student=student, due_at__lte=now or timezone.now())
+    if module_id:
+        items = items.filter(module_id=module_id)
+    return [
+        (str(question_id), item_module_id)
+        for question_id, item_module_id in items.order_by('due_at').values_list(
+            'question_id', 'module_id'
+        )[:limit]
+    ]
+
+
+def next_due(student, module_id=None):
+    items = ReviewItem.objects.filter(student=student)
+    if module_id:
+        items = items.filter(module_id=module_id)
+    return items.order_by('due_at').values_list('due_at', flat=True).first()
@@ -2,8 +2,9 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import Avg, Sum
+from django.db.models import Avg
 from module.models import Questions, QuizAttend, Module
+from .stats import get_student_stats
 
 User = get_user_model()
 
@@ -26,7 +27,7 @@ class QuestionSerializer(serializers.ModelSerializer):
 class QuizAttendSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizAttend
-        fields = "__all__"
+        exclude = ("served_questions", "answers", "stats_counted")
 
 
 class SubjectPerformanceSerializer(serializers.ModelSerializer):
@@ -76,8 +77,13 @@ class UserPerformanceSerializer(serializers.ModelSerializer):
             'subject_covered',  # include new field
         )
 
+    def get_student_stats(self, obj):
+        if not hasattr(self, '_student_stats'):
+            self._student_stats = get_student_stats(obj)
+        return self._student_stats
+
     def get_total_xp(self, obj):
-        return QuizAttend.objects.filter(student=obj).aggregate(total=Sum('xp_gained'))['total'] or 0
+        return self.get_student_stats(obj).total_xp
 
     def get_profile_pic(self, obj):
         if obj.profile_pic:
@@ -91,11 +97,10 @@ class UserPerformanceSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_quiz_attempted(self, obj):
-        return QuizAttend.objects.filter(student=obj).count()
+        return self.get_student_stats(obj).attempt_count
 
     def get_average_score(self, obj):
-        avg_score = QuizAttend.objects.filter(student=obj).aggregate(Avg('score'))['score__avg']
-        return round(avg_score, 2) if avg_score else 0.0
+        return self.get_student_stats(obj).average_score
 
     # NEW FIELD: total unique subjects attempted
     def get_subject_covered(self, obj):
@@ -0,0 +1,98 @@
+from module import answers as codes
+from module import decks
+
+# A session quiz stores the questions it served and the result of each answer
+# on the QuizAttend row itself, packed as described in module.answers. Answers
+# arrive in batches and are graded against the cached answer key as they are
+# recorded, so finishing only counts the codes.
+
+ANSWER_CHOICES = ("option1", "option2", "option3", "option4")
+
+
+class AnswerError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def is_session(quiz):
+    return bool(quiz.served_questions)
+
+
+def start_session(quiz, question_ids):
+    """Record the served questions on an unsaved QuizAttend"""
+    quiz.served_questions = codes.pack_ids(question_ids)
+    quiz.answers = codes.empty_codes(len(question_ids))
+    quiz.total_questions = len(question_ids)
+
+
+def record_answers(quiz, answers):
+    """Grade ``[{"question_id": ..., "answer": "option1".."option4" or null}, ...]`` into ``quiz.answers``
+
+    A null answer marks the question skipped. Later answers to the same
+    question replace earlier ones. Raises AnswerError, leaving the quiz
+    untouched, if any entry is invalid.
+    """
+    question_ids = codes.unpack_ids(quiz.served_questions)
+    positions = {pk: index for index, pk in enumerate(question_ids)}
+    key = decks.answer_key(question_ids, quiz.module_id)
+    packed = bytearray(quiz.answers)
+
+    errors = {}
+    for item in answers:
+        if not isinstance(item, dict):
+            errors["answers"] = "Each answer needs a question_id and an answer"
+            continue
+        question_id = str(item.get("question_id"))
+        answer = item.get("answer")
+        if question_id not in positions:
+            errors[question_id] = "Question was not served in this quiz"
+        elif answer is not None and answer not in ANSWER_CHOICES:
+            errors[question_id] = "Answer must be one of option1, option2, option3, option4 or null"
+        else:
+            if answer is None or question_id not in key:
+                # skipped, or the question was deleted and cannot be graded
+                code = codes.SKIPPED
+            elif answer == key[question_id]:
+                code = codes.CORRECT
+            else:
+                code = codes.WRONG
+            codes.set_code(packed, positions[question_id], code)
+
+    if errors:
+        raise AnswerError(errors)
+    quiz.answers = bytes(packed)
+
+
+def answered_count(quiz):
+    correct, wrong, skipped = codes.count_codes(quiz.answers, codes.id_count(quiz.served_questions))
+    return correct + wrong + skipped
+
+
+def grade_answers(quiz):
+    """``(correct, attempted)`` for a session quiz from its recorded codes"""
+    correct, wrong, _ = codes.count_codes(quiz.answers, codes.id_count(quiz.served_questions))
+    return correct, correct + wrong
+
+
+def grade_for(correct, attempted):
+    """Letter grade for an attempt"""
+    if attempted == 0:
+        return "F"
+    accuracy = correct / attempted
+    if accuracy == 1.0:
+        return "A+"
+    if accuracy >= 0.7:
+        return "A"
+    if accuracy >= 0.5:
+        return "B"
+    return "F"
+
+
+def apply_result(quiz, correct, attempted):
+    """Set counts, score, XP and grade on ``quiz`` (not saved)"""
+    quiz.correct_answers = correct
+    quiz.attempted_questions = attempted
+    quiz.score = correct * 10
+    quiz.xp_gained = correct * 5
+    quiz.grade = grade_for(correct, attempted)
@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+
+from module import cascades
+from module.models import Module, QuizAttend
+
+from . import stats
+from .leaderboard import get_leaderboard
+from .models import StudentStats
+
+
+@receiver(post_delete, sender=StudentStats)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    # like the score pushes, an unreachable leaderboard must not fail the delete
+    transaction.on_commit(lambda: get_leaderboard().remove(instance.student_id), robust=True)
+
+
+@receiver(pre_delete, sender=Module)
+def count_deleted_module(sender, instance, **kwargs):
+    stats.record_module_deleted(instance.pk)
+
+
+@receiver(post_delete, sender=QuizAttend)
+def count_deleted_attempt(sender, instance, **kwargs):
+    # a deleted module was accounted for as a whole, a deleted student's
+    # stats row goes with them
+    if cascades.deleting(Module, instance.module_id) or cascades.deleting(get_user_model(), instance.student_id):
+        return
+    stats.record_quiz_deleted(instance)
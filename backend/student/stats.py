@@ -0,0 +1,237 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.timezone import localdate
+
+from module.models import QuizAttend, QuizAttendDaily
+
+from .leaderboard import get_leaderboard
+from .models import StudentStats
+
+# Every QuizAttend write goes through one of the record_* helpers below,
+# called inside the transaction that changed the attempt; deletes are counted
+# by the QuizAttend and Module delete signals, a whole module at once. A student without a StudentStats row
+# yet is rebuilt from history instead of incremented.
+
+REBUILT_FIELDS = (
+    'total_xp', 'score_sum', 'attempt_count', 'last_activity', 'current_streak', 'best_module_id',
+)
+
+
+def get_student_stats(student):
+    """StudentStats for a student; computed from history, and not saved, if there is no row yet"""
+    try:
+        return StudentStats.objects.select_related('best_module').get(student=student)
+    except StudentStats.DoesNotExist:
+        return compute_student_stats(student)
+
+
+def daily_streak(stats, today=None):
+    """Consecutive active days, reported the way StudentStatsView always has"""
+    if not stats.last_activity:
+        return 0
+    today = today or localdate()
+    if localdate(stats.last_activity) >= today - timedelta(days=1):
+        return stats.current_streak
+    return 1
+
+
+def _publish(stats):
+    """Push the committed XP total to the leaderboard"""
+    student_id, total_xp = stats.student_id, stats.total_xp
+    transaction.on_commit(
+        lambda: get_leaderboard().set_score(student_id, total_xp), robust=True
+    )
+
+
+def _publish_many(rows):
+    """Push several committed XP totals to the leaderboard at once"""
+    scores = [(stats.student_id, stats.total_xp) for stats in rows]
+    transaction.on_commit(lambda: get_leaderboard().set_many(scores), robust=True)
+
+
+def _locked_stats(student):
+    try:
+        return StudentStats.objects.select_for_update().get(student=student)
+    except StudentStats.DoesNotExist:
+        rebuild_student_stats(student)
+        return None
+
+
+def _attempt_counts(student, module_ids):
+    """``{module_id: attempts}`` of the student, from the daily rollups"""
+    return dict(
+        QuizAttendDaily.objects.filter(student=student, module_id__in=module_ids)
+        .values('module_id')
+        .annotate(attempts=Sum('attempts'))
+        .order_by()
+        .values_list('module_id', 'attempts')
+    )
+
+
+def record_quiz_start(quiz):
+    """Account for a newly created QuizAttend, after module.rollups has counted it"""
+    with transaction.atomic():
+        stats = _locked_stats(quiz.student)
+        if stats is None:
+            return
+
+        day = localdate(quiz.created_at)
+        if stats.last_activity is None:
+            stats.current_streak = 1
+        else:
+            last_day = localdate(stats.last_activity)
+            if last_day == day - timedelta(days=1):
+                stats.current_streak += 1
+            elif last_day != day:
+                stats.current_streak = 1
+
+        stats.attempt_count += 1
+        stats.last_activity = max(stats.last_activity or quiz.created_at, quiz.created_at)
+
+        # only the new attempt's module gained an attempt, so it is the only challenger
+        if stats.best_module_id is None:
+            stats.best_module_id = quiz.module_id
+        elif stats.best_module_id != quiz.module_id:
+            counts = _attempt_counts(quiz.student, [quiz.module_id, stats.best_module_id])
+            if counts.get(quiz.module_id, 0) > counts.get(stats.best_module_id, 0):
+                stats.best_module_id = quiz.module_id
+
+        stats.save()
+
+
+def record_quiz_result(quiz, xp_delta, score_delta):
+    """Apply the change in xp/score of a finished (or re-finished) QuizAttend"""
+    record_results(quiz.student, xp_delta, score_delta)
+
+
+def record_results(student, xp_delta, score_delta):
+    """Apply the total change in xp/score of any number of the student's finished attempts"""
+    with transaction.atomic():
+        stats = _locked_stats(student)
+        if stats is None:
+            return
+
+        stats.total_xp += xp_delta
+        stats.score_sum += score_delta
+        stats.save(update_fields=['total_xp', 'score_sum', 'updated_at'])
+        _publish(stats)
+
+
+def record_xp_deduction(student, amount):
+    with transaction.atomic():
+        stats = _locked_stats(student)
+        if stats is None:
+            return
+
+        stats.total_xp -= amount
+        stats.save(update_fields=['total_xp', 'updated_at'])
+        _publish(stats)
+
+
+def record_quiz_deleted(quiz):
+    """Take a deleted QuizAttend out of the totals
+
+    last_activity, current_streak and best_module are left as they are,
+    rebuild_student_stats recomputes them.
+    """
+    with transaction.atomic():
+        # no rebuild here: the student may be going away in the same delete
+        stats = StudentStats.objects.select_for_update().filter(student_id=quiz.student_id).first()
+        if stats is None:
+            return
+
+        stats.total_xp -= quiz.xp_gained
+        stats.score_sum = max(0, stats.score_sum - quiz.score)
+        stats.attempt_count = max(0, stats.attempt_count - 1)
+        stats.save(update_fields=['total_xp', 'score_sum', 'attempt_count', 'updated_at'])
+        _publish(stats)
+
+
+def record_module_deleted(module_id):
+    """Take all attempts at a module about to be deleted out of its students' totals
+
+    Like record_quiz_deleted, the rest is left to rebuild_student_stats;
+    best_module is cleared by the foreign key.
+    """
+    totals = {
+        row['student_id']: row
+        for row in QuizAttend.objects.filter(module_id=module_id)
+        .values('student_id')
+        .annotate(xp=Sum('xp_gained'), score=Sum('score'), count=Count('id'))
+        .order_by()
+    }
+    if not totals:
+        return
+
+    with transaction.atomic():
+        rows = list(StudentStats.objects.select_for_update().filter(student_id__in=totals))
+        now = timezone.now()
+        for stats in rows:
+            row = totals[stats.student_id]
+            stats.total_xp -= row['xp'] or 0
+            stats.score_sum = max(0, stats.score_sum - (row['score'] or 0))
+            stats.attempt_count = max(0, stats.attempt_count - row['count'])
+            stats.updated_at = now
+        StudentStats.objects.bulk_update(
+            rows, ['total_xp', 'score_sum', 'attempt_count', 'updated_at'], batch_size=500
+        )
+        _publish_many(rows)
+
+
+def compute_student_stats(student):
+    """An unsaved StudentStats computed from the student's full QuizAttend history"""
+    attempts = QuizAttend.objects.filter(student=student)
+
+    totals = attempts.aggregate(
+        total_xp=Sum('xp_gained'),
+        score_sum=Sum('score'),
+        attempt_count=Count('id'),
+        last_activity=Max('created_at'),
+    )
+
+    best = (
+        attempts.values('module')
+        .annotate(count=Count('id'))
+        .order_by('-count')
+        .first()
+    )
+
+    # consecutive days ending at the most recent active day
+    days = (
+        attempts.annotate(day=TruncDate('created_at'))
+        .values_list('day', flat=True)
+        .distinct()
+        .order_by('-day')
+    )
+    streak = 0
+    expected = None
+    for day in days:
+        if expected is not None and day != expected:
+            break
+        streak += 1
+        expected = day - timedelta(days=1)
+
+    return StudentStats(
+        student=student,
+        total_xp=totals['total_xp'] or 0,
+        score_sum=totals['score_sum'] or 0,
+        attempt_count=totals['attempt_count'],
+        last_activity=totals['last_activity'],
+        current_streak=streak,
+        best_module_id=best['module'] if best else None,
+    )
+
+
+def rebuild_student_stats(student):
+    """Recompute and save a student's StudentStats from the full QuizAttend history"""
+    computed = compute_student_stats(student)
+    stats, _ = StudentStats.objects.update_or_create(
+        student=student,
+        defaults={field: getattr(computed, field) for field in REBUILT_FIELDS},
+    )
+    _publish(stats)
+    return stats
@@ -1,3 +1,489 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from module import answers as codes
+from module.models import Module, Questions, QuestionQuantity, QuizAttend
+
+from . import leaderboard, reviews, sessions, stats
+from .leaderboard import DatabaseLeaderboard, MemoryLeaderboard
+from .models import ReviewItem, StudentStats
+from .serializers import QuestionSerializer
+
+User = get_user_model()
+
+
+class AsyncEndpointsTest(TestCase):
+    """The student/async/ views answer like the DRF views they mirror"""
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.sync_client = APIClient()
+        self.sync_client.force_authenticate(self.user)
+
+        self.module = Module.objects.create(module_name='Algebra')
+        for i in range(5):
+            Questions.objects.create(
+                module=self.module, question_text=f"question {i}",
+                option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+            )
+        QuestionQuantity.objects.create(quantity=3)
+
+    async def test_requires_token(self):
+        response = await self.async_client.get('/student/async/student-state/')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_module_list_matches_sync_view(self):
+        response = await self.async_client.get('/student/async/module-list/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        expected = await self.sync_get('/student/module-list/')
+        self.assertEqual(response.json()['results'], expected['results'])
+
+    async def test_module_list_pages(self):
+        for i in range(10):
+            await Module.objects.acreate(module_name=f'Module {i}')
+
+        response = await self.async_client.get('/student/async/module-list/?page=2', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        body, expected = response.json(), await self.sync_get('/student/module-list/?page=2')
+        self.assertEqual(body['count'], 11)
+        self.assertEqual(body['results'], expected['results'])
+        self.assertIsNone(body['next'])
+        self.assertTrue(body['previous'].endswith('/student/async/module-list/'))
+
+        response = await self.async_client.get('/student/async/module-list/?page=3', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), await self.sync_get('/student/module-list/?page=3'))
+
+    async def test_user_lookup_is_cached(self):
+        with mock.patch.object(
+            JWTAuthentication, 'get_user', autospec=True, side_effect=JWTAuthentication.get_user
+        ) as get_user:
+            for _ in range(2):
+                response = await self.async_client.get('/student/async/student-state/', headers=self.headers)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_user.call_count, 1)
+
+        # a ban applies to the next request
+        self.user.is_active = False
+        await sync_to_async(self.save_user)()
+        response = await self.async_client.get('/student/async/student-state/', headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+
+    def save_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+    @override_settings(QUERY_PROFILER={'ENABLED': True})
+    async def test_profiler_records_async_views(self):
+        with self.assertLogs('core.queries', level='INFO') as logs:
+            response = await self.async_client.get('/student/async/student-state/', headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        profile = logs.records[0].query_profile
+        self.assertEqual(profile['view'], 'student.async_views.student_stats')
+        self.assertGreater(profile['queries'], 0)
+
+    async def test_quiz_start_and_finish(self):
+        response = await self.async_client.post(
+            '/student/async/quiz-start/',
+            {'module_id': str(self.module.id), 'quantity': 3, 'mode': 'session'},
+            content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        started = response.json()
+        self.assertEqual(len(started['questions']), 3)
+
+        response = await self.async_client.post(
+            '/student/async/quiz-finish/',
+            {
+                'quiz_id': started['quiz_id'],
+                'answers': [{'question_id': q['id'], 'answer': 'option1'} for q in started['questions']],
+            },
+            content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['grade'], 'A+')
+
+        response = await self.async_client.get('/student/async/student-state/', headers=self.headers)
+        self.assertEqual(response.json(), await self.sync_get('/student/student-state/'))
+
+    async def sync_get(self, path):
+        return (await sync_to_async(self.sync_client.get)(path)).json()
+
+
+class QuizFinishBatchTest(TestCase):
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.module = Module.objects.create(module_name='Algebra')
+        for i in range(4):
+            Questions.objects.create(
+                module=self.module, question_text=f"question {i}",
+                option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+            )
+
+    def start(self, mode):
+        return self.client.post(
+            '/student/quiz-start/', {'module_id': str(self.module.id), 'mode': mode}, format='json'
+        ).json()
+
+    def test_outcome_per_item(self):
+        session, legacy = self.start('session'), self.start('legacy')
+        response = self.client.post('/student/quiz-finish-batch/', {'results': [
+            {
+                'quiz_id': session['quiz_id'],
+                'answers': [{'question_id': q['id'], 'answer': 'option1'} for q in session['questions']],
+            },
+            {'quiz_id': legacy['quiz_id'], 'correct': 1, 'attempted': 4},
+            {'quiz_id': legacy['quiz_id'], 'correct': 2, 'attempted': 4},
+            {'quiz_id': 'missing'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['finished'], 2)
+        self.assertEqual(
+            [item['status'] for item in body['results']], ['finished', 'finished', 'error', 'error']
+        )
+        self.assertEqual(body['results'][0]['result']['grade'], 'A+')
+        # bookkeeping columns stay internal
+        self.assertFalse({'served_questions', 'answers', 'stats_counted'} & set(body['results'][0]['result']))
+        self.assertEqual(self.client.get('/student/student-state/').json()['total_xp'], 25)
+
+
+class QuestionDeckTest(TestCase):
+    """Quiz starts are stitched from cached question fragments"""
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(email='student@example.com', password='pass', is_active=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.module = Module.objects.create(module_name='Algebra')
+        self.questions = [
+            Questions.objects.create(
+                module=self.module, question_text=f"question {i}",
+                option1='a', option2='b', option3='c', option4='d', correct_answer='option2',
+            )
+            for i in range(3)
+        ]
+
+    def start(self, mode='legacy'):
+        response = self.client.post(
+            '/student/quiz-start/', {'module_id': str(self.module.id), 'mode': mode}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return {question['id']: question for question in response.json()['questions']}
+
+    def test_fragments_match_serializer(self):
+        expected = {
+            str(question.id): dict(QuestionSerializer(question).data, id=str(question.id))
+            for question in self.questions
+        }
+        self.assertEqual(self.start(), expected)
+
+        for question in expected.values():
+            del question['correct_answer']
+        self.assertEqual(self.start('session'), expected)
+
+    def test_edit_is_served_next_start(self):
+        self.start()
+        question = self.questions[0]
+        question.question_text = "edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertEqual(self.start()[str(question.id)]['question_text'], "edited")
+
+    def test_delete_is_not_served(self):
+        self.start()
+        question = self.questions.pop()
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        self.assertEqual(set(self.start()), {str(question.id) for question in self.questions})
+
+
+class BrokenLeaderboard(MemoryLeaderboard):
+    errors = (ConnectionError,)
+
+    def count(self):
+        raise ConnectionError
+
+
+class LeaderboardTest(TestCase):
+    """Ties share a rank, and every backend orders them the same way"""
+
+    SCORES = [50, 30, 30, 30, 10]
+
+    def setUp(self):
+        leaderboard.get_leaderboard().clear()
+        self.users = [
+            User.objects.create_user(email=f'student{i}@example.com', password='pass', is_active=True)
+            for i in range(len(self.SCORES))
+        ]
+        self.users.sort(key=lambda user: str(user.id))
+        for user, xp in zip(self.users, self.SCORES):
+            StudentStats.objects.create(student=user, total_xp=xp)
+        self.ids = [str(user.id) for user in self.users]
+
+    def memory(self):
+        board = MemoryLeaderboard()
+        board.set_many(zip(self.ids, self.SCORES))
+        return board
+
+    def test_ties_share_a_rank(self):
+        board = self.memory()
+        self.assertEqual([board.rank(user_id) for user_id in self.ids], [1, 2, 2, 2, 5])
+        self.assertIsNone(board.rank('missing'))
+        self.assertEqual(board.rank_for_score(40), 2)
+
+        self.assertEqual(
+            [(entry['user_id'], entry['rank']) for entry in board.top(3)],
+            [(self.ids[0], 1), (self.ids[1], 2), (self.ids[2], 2)],
+        )
+        # a window starting inside a tie keeps the tie's rank
+        self.assertEqual([entry['rank'] for entry in board.around(self.ids[3], 1)], [2, 2, 5])
+        self.assertEqual([entry['rank'] for entry in board.around(self.ids[0], 2)], [1, 2, 2])
+        self.assertEqual(board.around('missing', 2), [])
+
+        board.set_score(self.ids[4], 60)
+        self.assertEqual(board.top(1)[0], {'rank': 1, 'user_id': self.ids[4], 'xp': 60})
+        self.assertEqual(board.rank(self.ids[0]), 2)
+
+    def test_database_matches_memory(self):
+        memory, database = self.memory(), DatabaseLeaderboard()
+        self.assertEqual(database.count(), memory.count())
+        self.assertEqual(database.top(4), memory.top(4))
+        for user_id in self.ids:
+            self.assertEqual(database.rank(user_id), memory.rank(user_id))
+            self.assertEqual(database.around(user_id, 1), memory.around(user_id, 1))
+
+    def test_view_ranks_from_stats_when_backend_fails(self):
+        client = APIClient()
+        client.force_authenticate(self.users[2])
+
+        # the configured leaderboard was never loaded
+        expected = client.get('/student/leaderboard/', {'limit': 3, 'radius': 1}).json()
+        self.assertEqual(expected['total'], 5)
+        self.assertEqual(expected['me'], {'rank': 2, 'xp': 30})
+        self.assertEqual([entry['rank'] for entry in expected['top']], [1, 2, 2])
+
+        with mock.patch('student.leaderboard.get_leaderboard', return_value=BrokenLeaderboard()):
+            response = client.get('/student/leaderboard/', {'limit': 3, 'radius': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
+
+    def test_view_clamps_negative_sizes(self):
+        client = APIClient()
+        client.force_authenticate(self.users[2])
+        leaderboard.get_leaderboard().set_many(zip(self.ids, self.SCORES))
+
+        body = client.get('/student/leaderboard/', {'limit': -3, 'radius': -1}).json()
+        self.assertEqual(body['top'], [])
+        self.assertEqual([entry['user_id'] for entry in body['around_me']], [self.ids[2]])
+
+
+class StudentStatsTest(TestCase):
+    """The incrementally kept StudentStats agree with a rebuild from history"""
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.modules = {}
+        for name in ('Algebra', 'Biology'):
+            module = self.modules[name] = Module.objects.create(module_name=name)
+            for i in range(4):
+                Questions.objects.create(
+                    module=module, question_text=f"{name} {i}",
+                    option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+                )
+
+    def play(self, name, days_ago, correct, mode='legacy'):
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() - timedelta(days=days_ago)):
+            quiz = self.client.post('/student/quiz-start/', {
+                'module_id': str(self.modules[name].id), 'mode': mode,
+            }, format='json').json()
+            if mode == 'session':
+                body = {'answers': [
+                    {'question_id': q['id'], 'answer': 'option1' if i < correct else 'option2'}
+                    for i, q in enumerate(quiz['questions'])
+                ]}
+            else:
+                body = {'correct': correct, 'attempted': 4}
+            response = self.client.post('/student/quiz-finish/', {'quiz_id': quiz['quiz_id'], **body}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def assertMatchesRebuild(self, fields=stats.REBUILT_FIELDS):
+        kept = StudentStats.objects.get(student=self.user)
+        rebuilt = stats.compute_student_stats(self.user)
+        for field in fields:
+            self.assertEqual(getattr(kept, field), getattr(rebuilt, field), field)
+
+    def test_incremental_matches_rebuild(self):
+        self.play('Algebra', 3, correct=3)
+        self.play('Biology', 2, correct=4, mode='session')
+        self.play('Biology', 1, correct=1)
+        self.play('Biology', 1, correct=2)
+        self.play('Algebra', 0, correct=4)
+        self.assertMatchesRebuild()
+
+        kept = StudentStats.objects.get(student=self.user)
+        self.assertEqual(kept.attempt_count, 5)
+        self.assertEqual(kept.current_streak, 4)
+        self.assertEqual(kept.best_module_id, self.modules['Biology'].id)
+
+        self.assertEqual(self.client.post('/student/delete-xp/').status_code, 200)
+        self.assertMatchesRebuild()
+
+        QuizAttend.objects.filter(module=self.modules['Algebra']).first().delete()
+        self.assertMatchesRebuild(('total_xp', 'score_sum', 'attempt_count'))
+
+    def test_module_delete_counted_once(self):
+        self.play('Algebra', 1, correct=3)
+        self.play('Biology', 0, correct=4)
+        self.play('Algebra', 0, correct=2)
+
+        self.modules['Algebra'].delete()
+        self.assertMatchesRebuild(('total_xp', 'score_sum', 'attempt_count'))
+
+        # the student's own cascade never touches their stats row
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(StudentStats.objects.exists())
+        self.assertIsNone(leaderboard.get_leaderboard().score(self.user.id))
+
+    def test_read_does_not_write(self):
+        self.assertEqual(self.client.get('/student/student-state/').json()['total_attempted_quizzes'], 0)
+        self.assertFalse(StudentStats.objects.filter(student=self.user).exists())
+
+
+class ReviewTest(TestCase):
+    """SM-2 scheduling and review quizzes"""
+
+    def setUp(self):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(
+            email='student@example.com', password='pass', full_name='Student', is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.questions = {}
+        for name in ('Algebra', 'Biology'):
+            module = Module.objects.create(module_name=name)
+            self.questions[name] = [
+                str(Questions.objects.create(
+                    module=module, question_text=f"{name} {i}",
+                    option1='a', option2='b', option3='c', option4='d', correct_answer='option1',
+                ).id)
+                for i in range(3)
+            ]
+        self.now = timezone.now()
+
+    def answered(self, question_ids, results):
+        quiz = QuizAttend(student=self.user, module_id=Questions.objects.get(id=question_ids[0]).module_id)
+        sessions.start_session(quiz, question_ids)
+        packed = bytearray(quiz.answers)
+        for index, code in enumerate(results):
+            codes.set_code(packed, index, code)
+        quiz.answers = bytes(packed)
+        return quiz
+
+    def test_next_state(self):
+        self.assertEqual(reviews.next_state(0, 0, 2.5, 4), (1, 1, 2.5))
+        self.assertEqual(reviews.next_state(1, 1, 2.5, 4), (2, 6, 2.5))
+        repetitions, interval_days, ease = reviews.next_state(2, 6, 2.5, 5)
+        self.assertEqual((repetitions, interval_days), (3, 15))
+        self.assertAlmostEqual(ease, 2.6)
+
+        # a failed answer starts over and lowers the ease, never below 1.3
+        repetitions, interval_days, ease = reviews.next_state(3, 15, 2.6, 1)
+        self.assertEqual((repetitions, interval_days), (0, 1))
+        self.assertAlmostEqual(ease, 2.06)
+        self.assertEqual(reviews.next_state(0, 1, 1.3, 0), (0, 1, 1.3))
+
+    def test_schedule_attempts(self):
+        algebra = self.questions['Algebra']
+        reviews.schedule_attempts([
+            self.answered(algebra, [codes.CORRECT, codes.WRONG, codes.SKIPPED]),
+            self.answered(algebra[:1], [codes.CORRECT]),
+        ], now=self.now)
+
+        items = {str(item.question_id): item for item in ReviewItem.objects.filter(student=self.user)}
+        self.assertEqual(set(items), set(algebra[:2]))
+        # answered in both quizzes, so two SM-2 steps
+        self.assertEqual((items[algebra[0]].repetitions, items[algebra[0]].interval_days), (2, 6))
+        self.assertEqual(items[algebra[0]].due_at, self.now + timedelta(days=6))
+        self.assertEqual(items[algebra[1]].repetitions, 0)
+        self.assertAlmostEqual(items[algebra[1]].ease, 1.96)
+        self.assertEqual(items[algebra[1]].due_at, self.now + timedelta(days=1))
+
+        # an existing item takes another step
+        reviews.schedule_attempts([self.answered(algebra[1:2], [codes.CORRECT])], now=self.now)
+        self.assertEqual(ReviewItem.objects.get(question_id=algebra[1]).repetitions, 1)
+
+    def test_due_items(self):
+        algebra, biology = self.questions['Algebra'], self.questions['Biology']
+        reviews.schedule_attempts([self.answered(biology, [codes.WRONG] * 3)], now=self.now - timedelta(days=3))
+        reviews.schedule_attempts([self.answered(algebra, [codes.WRONG] * 3)], now=self.now - timedelta(days=2))
+
+        due = reviews.due_items(self.user, 4, now=self.now)
+        self.assertEqual([question_id for question_id, _ in due], biology + algebra[:1])
+        module_id = Questions.objects.get(id=algebra[0]).module_id
+        self.assertEqual(
+            reviews.due_items(self.user, 10, module_id=module_id, now=self.now),
+            [(question_id, module_id) for question_id in algebra],
+        )
+        self.assertEqual(reviews.due_items(self.user, 10, now=self.now - timedelta(days=3)), [])
+        self.assertEqual(reviews.next_due(self.user), self.now - timedelta(days=2))
+
+    def test_review_start(self):
+        response = self.client.post('/student/quiz-start/', {'mode': 'review'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(response.json()['next_due'])
+
+        # a real module named "review" is not taken over
+        real = Module.objects.create(module_name='review')
+        algebra, biology = self.questions['Algebra'], self.questions['Biology']
+        reviews.schedule_attempts(
+            [self.answered(algebra[:1], [codes.WRONG]), self.answered(biology[:1], [codes.WRONG])],
+            now=self.now - timedelta(days=2),
+        )
+
+        for _ in range(2):
+            response = self.client.post('/student/quiz-start/', {'mode': 'review'}, format='json')
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertEqual({q['id'] for q in body['questions']}, {algebra[0], biology[0]})
+            self.assertEqual(QuizAttend.objects.get(id=body['quiz_id']).module_id, reviews.REVIEW_MODULE_ID)
+        self.assertEqual(Module.objects.filter(module_name='review').count(), 2)
+
+        listed = {module['id'] for module in self.client.get('/student/module-list/').json()['results']}
+        self.assertIn(str(real.id), listed)
+        self.assertNotIn(str(reviews.REVIEW_MODULE_ID), listed)
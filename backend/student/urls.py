@@ -7,13 +7,18 @@ from module.views import (
 from account.views import (
     OptionalModulesView,
 )
+from . import async_views
 from .views import (
     QuizStartView, 
     SynopticQuizStartView,
     QuizFinishView, 
+    QuizFinishBatchView,
+    QuizAnswerView,
+    QuizHistoryView,
     StudentStatsView, 
     DeductQuizXPView, 
     UserPerformanceView,
+    LeaderboardView,
 )
 
 urlpatterns = [
@@ -22,8 +27,17 @@ urlpatterns = [
     path('optional-module/', OptionalModulesView.as_view()),
     path("quiz-start/", QuizStartView.as_view()),
     path("synoptic-quiz-start/", SynopticQuizStartView.as_view()),
+    path("quiz-answer/", QuizAnswerView.as_view()),
     path("quiz-finish/", QuizFinishView.as_view()),
+    path("quiz-finish-batch/", QuizFinishBatchView.as_view()),
+    path("attempts/", QuizHistoryView.as_view()),
     path("student-state/", StudentStatsView.as_view()),
     path("delete-xp/", DeductQuizXPView.as_view()),
     path("user-performance/", UserPerformanceView.as_view()),
+    path("leaderboard/", LeaderboardView.as_view()),
+    # ASGI-native versions of the hot endpoints above
+    path("async/module-list/", async_views.module_list),
+    path("async/quiz-start/", async_views.quiz_start),
+    path("async/quiz-finish/", async_views.quiz_finish),
+    path("async/student-state/", async_views.student_stats),
 ]
@@ -1,38 +1,122 @@
 # module/views.py
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import permissions, status
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg, Sum, Count
-from django.utils.timezone import localdate
-from datetime import timedelta
-from module.models import Module, Questions, QuizAttend
+from django.http import HttpResponse
+from django.db import transaction
+from module.models import Module, QuizAttend, QuestionQuantity
+from module import adaptive, decks, rollups, suggestions, stats as module_stats
 from administration.models import SynopticModule
-from module.serializers import ModuleSerializer
-from .serializers import QuestionSerializer, QuizAttendSerializer, SubjectPerformanceSerializer, UserPerformanceSerializer
-import random
+from core.pagination import KeysetPagination
+from . import leaderboard, reviews, sessions, stats
+from .serializers import QuizAttendSerializer, SubjectPerformanceSerializer, UserPerformanceSerializer
+import json
+import uuid
+
+User = get_user_model()
+
+SESSION_MODES = ("session", "adaptive", "review")
+
+
+def parse_question_quantity(quantity):
+    """``quantity`` as an int, or None when not given"""
+    if quantity in (None, ""):
+        return None
+
+    try:
+        return int(quantity)
+    except (TypeError, ValueError):
+        raise ValidationError({"quantity": "quantity must be a number"})
+
+
+def get_question_quantity(request):
+    """Validated ``quantity`` from the request, must match a configured QuestionQuantity"""
+    quantity = parse_question_quantity(request.data.get("quantity"))
+    if quantity is not None and not QuestionQuantity.objects.filter(quantity=quantity).exists():
+        raise ValidationError({"quantity": "Invalid question quantity"})
+    return quantity
+
+
+def quiz_start_response(quiz, is_synoptic, questions_json):
+    """Response body built around the pre-encoded questions array"""
+    body = '{"quiz_id":%s,"is_synoptic":%s,"questions":%s}' % (
+        json.dumps(str(quiz.id)),
+        json.dumps(is_synoptic),
+        questions_json,
+    )
+    return HttpResponse(body.encode("utf-8"), content_type="application/json", status=status.HTTP_200_OK)
+
+
+def create_attempt(student, module, served, session):
+    """Save a new attempt at the ``served`` questions and count it"""
+    quiz = QuizAttend(student=student, module=module, total_questions=len(served))
+    if session:
+        sessions.start_session(quiz, served)
+
+    with transaction.atomic():
+        quiz.save()
+        rollups.record_quiz_start(quiz)
+        stats.record_quiz_start(quiz)
+        module_stats.record_quiz_start(quiz)
+    return quiz
+
+
+def start_quiz(request, module, question_ids, module_ids, is_synoptic):
+    """Create the attempt for the drawn questions and build the start response
+
+    With ``"mode": "session"`` the questions are sent without their answers
+    and the attempt is graded on the server, see student.sessions. Adaptive
+    quizzes always run as sessions so their answers feed QuestionStats, and
+    review quizzes so they can be rescheduled.
+    """
+    session = request.data.get("mode") in SESSION_MODES
+    questions_json, served = decks.render_questions(question_ids, module_ids, with_answers=not session)
+    quiz = create_attempt(request.user, module, served, session)
+    return quiz_start_response(quiz, is_synoptic, questions_json)
+
+
+def start_review_quiz(request):
+    """Quiz of the student's earliest due review items, in one module if ``module_id`` is given"""
+    module_id = request.data.get("module_id")
+    if module_id:
+        module = get_object_or_404(Module, id=module_id)
+    else:
+        # cross-module reviews are recorded against a placeholder, like synoptic quizzes
+        module = reviews.review_module()
+    quantity = get_question_quantity(request) or reviews.REVIEW_SIZE
+
+    due = reviews.due_items(request.user, quantity, module_id=module_id)
+    if not due:
+        return Response({
+            "error": "No questions are due for review",
+            "next_due": reviews.next_due(request.user, module_id=module_id),
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    question_ids = [question_id for question_id, _ in due]
+    module_ids = list(dict.fromkeys(due_module_id for _, due_module_id in due))
+    return start_quiz(request, module, question_ids, module_ids, False)
+
 
 class QuizStartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
+        if request.data.get("mode") == "review":
+            return start_review_quiz(request)
+
         module_id = request.data.get("module_id")
         module = get_object_or_404(Module, id=module_id)
+        quantity = get_question_quantity(request)
 
-        questions = Questions.objects.filter(module=module).order_by("?")  # all questions in random order
-
-        # Create quiz attempt
-        quiz = QuizAttend.objects.create(
-            student=request.user,
-            module=module,
-            total_questions=questions.count(),  # total questions = all questions in module
-        )
-
-        return Response({
-            "quiz_id": quiz.id,
-            "is_synoptic": False,
-            "questions": QuestionSerializer(questions, many=True).data
-        }, status=status.HTTP_200_OK)
+        # random sample from the cached question deck, rendered from cached fragments
+        if request.data.get("mode") == "adaptive":
+            question_ids = adaptive.draw([module.id], quantity)
+        else:
+            question_ids = decks.draw([module.id], quantity)
+        return start_quiz(request, module, question_ids, [module.id], False)
 
 
 class SynopticQuizStartView(APIView):
@@ -45,159 +129,311 @@ class SynopticQuizStartView(APIView):
                 {"error": "Synoptic module is not configured"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        quantity = get_question_quantity(request)
 
         # Load underlying modules
-        underlying_modules = synoptic.modules.all()
+        module_ids = list(synoptic.modules.values_list("id", flat=True))
 
-        # Get all combined questions
-        questions = Questions.objects.filter(
-            module__in=underlying_modules
-        ).order_by("?")
+        # Combined random sample over every underlying deck
+        if request.data.get("mode") == "adaptive":
+            weights = adaptive.weak_module_weights(request.user, module_ids)
+            question_ids = adaptive.draw(module_ids, quantity, module_weights=weights)
+        else:
+            question_ids = decks.draw(module_ids, quantity)
 
         # Ensure Synoptic placeholder module exists
         synoptic_main_module = synoptic.get_main_module()
 
-        quiz = QuizAttend.objects.create(
-            student=request.user,
-            module=synoptic_main_module,
-            total_questions=questions.count()
-        )
-
-        return Response({
-            "quiz_id": quiz.id,
-            "is_synoptic": True,
-            "questions": QuestionSerializer(questions, many=True).data
-        }, status=status.HTTP_200_OK)
+        return start_quiz(request, synoptic_main_module, question_ids, module_ids, True)
 
 
-class QuizFinishView(APIView):
+class QuizAnswerView(APIView):
+    """Submit a batch of answers to a session quiz"""
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
         quiz_id = request.data.get("quiz_id")
-        correct = int(request.data.get("correct", 0))
-        attempted = int(request.data.get("attempted", 0))
+        answers = request.data.get("answers")
 
-        if not attempted:
+        if not isinstance(answers, list) or not answers:
             return Response({
-                "error": "attempted field needed"
+                "error": "answers must be a non-empty list"
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        quiz = get_object_or_404(QuizAttend, id=quiz_id, student=request.user)
+        with transaction.atomic():
+            quiz = get_object_or_404(
+                QuizAttend.objects.select_for_update(), id=quiz_id, student=request.user
+            )
+            if not sessions.is_session(quiz):
+                return Response({
+                    "error": "Quiz was not started in session mode"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if quiz.grade:
+                return Response({
+                    "error": "Quiz is already finished"
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                sessions.record_answers(quiz, answers)
+            except sessions.AnswerError as e:
+                return Response({
+                    "error": "Invalid answers", "errors": e.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            quiz.save(update_fields=["answers"])
 
-        # Save results
-        quiz.correct_answers = correct
-        quiz.attempted_questions = attempted
-        quiz.score = correct * 10
-        quiz.xp_gained = correct * 5
-
-        # Grade based on accuracy
-        if attempted == 0:
-            quiz.grade = "F"
-        else:
-            accuracy = correct / attempted
-            if accuracy == 1.0:
-                quiz.grade = "A+"
-            elif accuracy >= 0.7:
-                quiz.grade = "A"
-            elif accuracy >= 0.5:
-                quiz.grade = "B"
-            else:
-                quiz.grade = "F"
+        return Response({
+            "quiz_id": str(quiz.id),
+            "answered": sessions.answered_count(quiz),
+            "total_questions": quiz.total_questions,
+        }, status=status.HTTP_200_OK)
+
+
+class QuizFinishError(Exception):
+    def __init__(self, body):
+        super().__init__(body)
+        self.body = body
+
+
+def grade_submission(quiz, data):
+    """Grade ``quiz`` (not saved) from a finish submission; returns the values it had before
+
+    Raises QuizFinishError with the response body when the submission is invalid.
+    """
+    previous = {
+        field: getattr(quiz, field)
+        for field in ('attempted_questions', 'correct_answers', 'score', 'xp_gained')
+    }
+
+    if sessions.is_session(quiz):
+        # graded here from the recorded answers, plus any sent with the finish
+        answers = data.get("answers")
+        if answers:
+            if quiz.grade:
+                raise QuizFinishError({"error": "Quiz is already finished"})
+            try:
+                sessions.record_answers(quiz, answers)
+            except sessions.AnswerError as e:
+                raise QuizFinishError({"error": "Invalid answers", "errors": e.errors})
+        correct, attempted = sessions.grade_answers(quiz)
+    else:
+        try:
+            correct = int(data.get("correct", 0))
+            attempted = int(data.get("attempted", 0))
+        except (TypeError, ValueError):
+            raise QuizFinishError({"error": "correct and attempted must be numbers"})
+
+        if not attempted:
+            raise QuizFinishError({"error": "attempted field needed"})
+
+    sessions.apply_result(quiz, correct, attempted)
+    return previous
 
+
+def finish_quiz(student, data):
+    """Grade and save the student's attempt ``data["quiz_id"]``
+
+    Raises Http404 for an unknown attempt and QuizFinishError with the
+    response body when the submission is invalid.
+    """
+    with transaction.atomic():
+        quiz = get_object_or_404(
+            QuizAttend.objects.select_for_update(), id=data.get("quiz_id"), student=student
+        )
+        first_finish = quiz.grade is None
+        previous = grade_submission(quiz, data)
+
+        # Save results
         quiz.save()
+        if first_finish and sessions.is_session(quiz):
+            reviews.schedule_attempt(quiz)
+        stats.record_quiz_result(
+            quiz, quiz.xp_gained - previous['xp_gained'], quiz.score - previous['score']
+        )
+        rollups.record_quiz_result(quiz, previous)
+        module_stats.record_quiz_result(quiz)
+    return quiz
+
+
+def finish_quizzes(student, items):
+    """Grade and save many of the student's attempts at once
+
+    Returns ``(outcomes, finished)``: one outcome per item, in order, and
+    the attempts that were saved. Invalid items are reported in their
+    outcome and do not stop the rest. The attempts are written with one
+    bulk_update and the derived stats are updated once for the batch.
+    """
+    quiz_ids = []
+    for item in items:
+        try:
+            quiz_ids.append(uuid.UUID(str(item.get("quiz_id"))) if isinstance(item, dict) else None)
+        except ValueError:
+            quiz_ids.append(None)
+
+    with transaction.atomic():
+        # locked in id order so concurrent batches cannot deadlock
+        quizzes = {
+            quiz.id: quiz
+            for quiz in QuizAttend.objects.select_for_update()
+            .filter(student=student, id__in=[pk for pk in quiz_ids if pk])
+            .order_by('id')
+        }
+
+        outcomes, finished, changes = [], [], []
+        for item, quiz_id in zip(items, quiz_ids):
+            outcome = {"quiz_id": str(quiz_id) if quiz_id else None}
+            outcomes.append(outcome)
+            quiz = quizzes.pop(quiz_id, None)
+            if quiz is None:
+                # unknown, not the student's, or already taken by an earlier item
+                outcome.update(status="error", error="Quiz not found or repeated in the batch")
+                continue
+
+            first_finish = quiz.grade is None
+            try:
+                previous = grade_submission(quiz, item)
+            except QuizFinishError as e:
+                outcome.update(status="error", **e.body)
+                continue
+
+            finished.append(quiz)
+            changes.append((quiz, previous, first_finish))
+            outcome.update(status="finished", result=quiz)
+
+        QuizAttend.objects.bulk_update(
+            finished, ['answers', 'attempted_questions', 'correct_answers', 'score', 'xp_gained', 'grade']
+        )
+        reviews.schedule_attempts([
+            quiz for quiz, _, first_finish in changes if first_finish and sessions.is_session(quiz)
+        ])
+        stats.record_results(
+            student,
+            sum(quiz.xp_gained - previous['xp_gained'] for quiz, previous, _ in changes),
+            sum(quiz.score - previous['score'] for quiz, previous, _ in changes),
+        )
+        rollups.record_quiz_results([(quiz, previous) for quiz, previous, _ in changes])
+        module_stats.record_quiz_results(finished)
+
+    for outcome in outcomes:
+        if "result" in outcome:
+            outcome["result"] = QuizAttendSerializer(outcome["result"]).data
+    return outcomes, finished
 
-        # Suggest random modules to attend next
-        all_modules = list(Module.objects.exclude(id=quiz.module.id))
-        random_modules = random.sample(all_modules, min(len(all_modules), 3))
-        modules_data = ModuleSerializer(random_modules, many=True).data
+
+class QuizFinishView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            quiz = finish_quiz(request.user, request.data)
+        except QuizFinishError as e:
+            return Response(e.body, status=status.HTTP_400_BAD_REQUEST)
 
         response_data = QuizAttendSerializer(quiz).data
-        response_data["attend_another_quiz"] = modules_data
+        response_data["attend_another_quiz"] = suggestions.suggest(request.user.id, quiz.module_id)
 
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class StudentStatsView(APIView):
+class QuizFinishBatchView(APIView):
+    """Finish many attempts in one request, for clients that played offline"""
     permission_classes = [permissions.IsAuthenticated]
+    max_batch_size = 200
 
-    def get(self, request):
-        student = request.user
-
-        stats = QuizAttend.objects.filter(student=student)
-
-        if not stats.exists():
+    def post(self, request):
+        items = request.data.get("results")
+        if not isinstance(items, list) or not items:
             return Response({
-                "average_score": 0,
-                "total_attempted_quizzes": 0,
-                "total_xp": 0,
-                "daily_streak": 0,
-                "last_activity": None,
-                "strongest_module": None
-            })
-
-        # Total XP
-        total_xp = stats.aggregate(Sum("xp_gained"))["xp_gained__sum"]
-
-        # Total quiz attempts
-        total_attempted = stats.count()
-
-        # Average score
-        avg_score = stats.aggregate(Avg("score"))["score__avg"]
-
-        # Last activity
-        last_activity = stats.latest("created_at").created_at
-
-        # Strongest module (module attempted the most)
-        strongest_module_data = (
-            stats.values("module__module_name")
-            .annotate(count=Count("id"))
-            .order_by("-count")
-            .first()
-        )
-        strongest_module = strongest_module_data["module__module_name"]
+                "error": "results must be a non-empty list"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_batch_size:
+            return Response({
+                "error": f"At most {self.max_batch_size} results per request"
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Daily streak calculation
-        dates = list(stats.order_by("-created_at").values_list("created_at", flat=True))
-        streak = 1
-        today = localdate()
+        outcomes, finished = finish_quizzes(request.user, items)
 
-        for d in dates[1:]:
-            if localdate(d) == today - timedelta(days=streak):
-                streak += 1
-            else:
-                break
+        # one set of suggestions for the whole batch, away from its last module
+        suggested = suggestions.suggest(request.user.id, finished[-1].module_id) if finished else []
 
         return Response({
-            "average_score": round(avg_score, 2),
-            "total_attempted_quizzes": total_attempted,
-            "total_xp": total_xp,
-            "daily_streak": streak,
-            "last_activity": last_activity,
-            "strongest_module": strongest_module,
-        })
+            "finished": len(finished),
+            "results": outcomes,
+            "attend_another_quiz": suggested,
+        }, status=status.HTTP_200_OK)
 
-class DeductQuizXPView(APIView):
+
+class QuizHistoryView(generics.ListAPIView):
+    """The student's quiz attempts, newest first, paged by cursor"""
     permission_classes = [permissions.IsAuthenticated]
+    serializer_class = QuizAttendSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        queryset = QuizAttend.objects.filter(student=self.request.user)
+        module_id = self.request.query_params.get('module')
+        if module_id:
+            queryset = queryset.filter(module_id=module_id)
+        return queryset
+
+
+def student_stats_data(student_stats):
+    if not student_stats.attempt_count:
+        return {
+            "average_score": 0,
+            "total_attempted_quizzes": 0,
+            "total_xp": 0,
+            "daily_streak": 0,
+            "last_activity": None,
+            "strongest_module": None
+        }
+
+    best_module = student_stats.best_module
+
+    return {
+        "average_score": student_stats.average_score,
+        "total_attempted_quizzes": student_stats.attempt_count,
+        "total_xp": student_stats.total_xp,
+        "daily_streak": stats.daily_streak(student_stats),
+        "last_activity": student_stats.last_activity,
+        "strongest_module": best_module.module_name if best_module else None,
+    }
 
-    def post(self, request):
-        quizzes = QuizAttend.objects.filter(student=request.user).order_by('created_at')
-        if not quizzes.exists():
-            return Response({"error": "No quiz records found."}, status=status.HTTP_404_NOT_FOUND)
 
-        xp_to_deduct = 200
-        for quiz in quizzes:
-            if xp_to_deduct <= 0:
-                break
+class StudentStatsView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-            if quiz.xp_gained >= xp_to_deduct:
-                quiz.xp_gained -= xp_to_deduct
-                xp_to_deduct = 0
-            else:
-                xp_to_deduct -= quiz.xp_gained
-                quiz.xp_gained = 0
+    def get(self, request):
+        return Response(student_stats_data(stats.get_student_stats(request.user)))
 
-            quiz.save()
+class DeductQuizXPView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        with transaction.atomic():
+            quizzes = QuizAttend.objects.select_for_update().filter(student=request.user).order_by('created_at')
+            if not quizzes.exists():
+                return Response({"error": "No quiz records found."}, status=status.HTTP_404_NOT_FOUND)
+
+            xp_to_deduct = 200
+            changes = []
+            for quiz in quizzes:
+                if xp_to_deduct <= 0:
+                    break
+
+                previous_xp = quiz.xp_gained
+                if quiz.xp_gained >= xp_to_deduct:
+                    quiz.xp_gained -= xp_to_deduct
+                    xp_to_deduct = 0
+                else:
+                    xp_to_deduct -= quiz.xp_gained
+                    quiz.xp_gained = 0
+
+                quiz.save()
+                changes.append((quiz, quiz.xp_gained - previous_xp))
+
+            stats.record_xp_deduction(request.user, 200 - xp_to_deduct)
+            rollups.record_xp_changes(changes)
 
         return Response({
             "message": "200 XP deducted from student's quizzes",
@@ -210,3 +446,50 @@ class UserPerformanceView(APIView):
     def get(self, request):
         serializer = UserPerformanceSerializer(request.user)
         return Response(serializer.data)
+
+
+class LeaderboardView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = max(0, min(int(request.query_params.get("limit", 10)), 100))
+            radius = max(0, min(int(request.query_params.get("radius", 2)), 25))
+        except ValueError:
+            raise ValidationError({"limit": "limit and radius must be numbers"})
+
+        def lookup(board):
+            return {
+                "total": board.count(),
+                "me": {
+                    "rank": board.rank(request.user.id),
+                    "xp": board.score(request.user.id) or 0,
+                },
+                "top": board.top(limit),
+                "around_me": board.around(request.user.id, radius),
+            }
+
+        ranking = leaderboard.read(lookup)
+        top, around = ranking["top"], ranking["around_me"]
+
+        # one query for the names and pictures of everyone shown
+        user_ids = {entry["user_id"] for entry in top + around}
+        users = {
+            str(user.id): user
+            for user in User.objects.filter(id__in=user_ids).only("id", "full_name", "profile_pic")
+        }
+
+        def entry_data(entry):
+            user = users.get(entry["user_id"])
+            return {
+                **entry,
+                "full_name": user.full_name if user else None,
+                "profile_pic": user.profile_pic.url if user and user.profile_pic else None,
+            }
+
+        return Response({
+            "total": ranking["total"],
+            "me": ranking["me"],
+            "top": [entry_data(entry) for entry in top],
+            "around_me": [entry_data(entry) for entry in around],
+        }, status=status.HTTP_200_OK)